@@ -0,0 +1,198 @@
+"""
+Decoder benchmarks over a reproducible synthetic frame corpus.
+
+python bench.py --frames 20000 --mix position=4,velocity=3,ident=1
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+from lib import *
+from lib.synth import FrameGenerator
+
+
+def parse_mix(mix_str):
+    """
+    Parse a kind=weight,... frame mix.
+    """
+
+    mix = {}
+
+    for item in mix_str.split(","):
+        kind, weight = item.split("=")
+        mix[kind.strip()] = float(weight)
+
+    return mix
+
+
+def bench(label, func, items, repeat=3):
+    """
+    Time func over every item, printing the best rate over a few runs.
+    """
+
+    best = None
+
+    for i in range(0, repeat):
+        start = time.perf_counter()
+
+        for item in items:
+            func(item)
+
+        elapsed = time.perf_counter() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    rate = len(items) / best if best > 0 else 0
+    print("  %-40s %12.0f /s %10.2f us" %(label, rate, (best / max(len(items), 1)) * 1e6))
+
+    return rate
+
+
+def bench_batch(label, func, batches, frame_ct, repeat=3):
+    """
+    Time func over batches of frames, printing the best per-frame rate.
+    """
+
+    best = None
+
+    for i in range(0, repeat):
+        start = time.perf_counter()
+
+        for batch in batches:
+            func(batch)
+
+        elapsed = time.perf_counter() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    rate = frame_ct / best if best > 0 else 0
+    print("  %-40s %12.0f /s %10.2f us" %(label, rate, (best / max(frame_ct, 1)) * 1e6))
+
+    return rate
+
+
+def allocations(label, func, items):
+    """
+    Print retained and peak bytes, and retained memory blocks, per item.
+    """
+
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+
+    kept = [func(item) for item in items]
+
+    blocks_after = sys.getallocatedblocks()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    item_ct = max(len(items), 1)
+    print("  %-40s %8.0f B kept %8.0f B peak %6.1f blocks" %(label, current / item_ct,
+        peak / item_ct, (blocks_after - blocks_before) / item_ct))
+
+    del kept
+
+
+parser = argparse.ArgumentParser(description="Benchmark the Mode S decoders.")
+parser.add_argument("--frames", type=int, default=20000, help="Number of frames to generate.")
+parser.add_argument("--aircraft", type=int, default=200, help="Number of aircraft.")
+parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+parser.add_argument("--mix", type=parse_mix, default=None,
+    help="Frame mix as kind=weight,... Kinds: %s." %", ".join(FrameGenerator.default_mix))
+parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark, best is kept.")
+args = parser.parse_args()
+
+generator = FrameGenerator(aircraft=args.aircraft, mix=args.mix, seed=args.seed)
+frames = [bytearray(frame) for frame in generator.frames(args.frames)]
+ext_frames = [frame for frame in frames if len(frame) == 14]
+short_frames = [frame for frame in frames if len(frame) == 7]
+
+print("%s frames, %s extended, %s short" %(len(frames), len(ext_frames), len(short_frames)))
+print()
+
+print("Full decode")
+bench("ADSBFrame", ADSBFrame, frames, args.repeat)
+bench("FrameRecord", FrameRecord, frames, args.repeat)
+bench("LazyADSBFrame icao", lambda frame: LazyADSBFrame(frame).get('icao'), frames, args.repeat)
+
+try:
+    ext_buffer = b"".join(ext_frames)
+    bench_batch("ADSBBatch (extended)", ADSBBatch, [ext_buffer], len(ext_frames), args.repeat)
+except RuntimeError:
+    print("  ADSBBatch skipped, NumPy isn't installed.")
+
+print()
+
+print("Frame input")
+byte_frames = [bytes(frame) for frame in frames]
+int_frames = [int.from_bytes(frame, 'big') for frame in frames]
+hex_text = ("\n".join([frame.hex() for frame in frames]) + "\n").encode()
+bench("ADSBFrame bytearray", ADSBFrame, frames, args.repeat)
+bench("ADSBFrame bytes", ADSBFrame, byte_frames, args.repeat)
+bench("ADSBFrame memoryview", ADSBFrame, [memoryview(frame) for frame in byte_frames],
+    args.repeat)
+bench("ADSBFrame int", ADSBFrame, int_frames, args.repeat)
+bench("ADSBFrame hex str", ADSBFrame, [frame.hex() for frame in frames], args.repeat)
+bench_batch("HexLineReader", lambda text: list(HexLineReader().frames([text])), [hex_text],
+    len(frames), args.repeat)
+bench_batch("bytes.fromhex per line", lambda text: [(bytes.fromhex(line.decode('ascii')), None,
+    None) for line in text.split()], [hex_text], len(frames), args.repeat)
+print()
+
+print("CRC")
+bench("Crc", Crc, frames, args.repeat)
+bench("AdsbCrc.crc", lambda frame: AdsbCrc.crc(frame[:-3]), frames, args.repeat)
+bench("AdsbCrc.crc_sliced", lambda frame: AdsbCrc.crc_sliced(frame[:-3]), frames, args.repeat)
+
+try:
+    bench_batch("ADSBBatch.crc_match (extended)", ADSBBatch.crc_match, [ext_buffer],
+        len(ext_frames), args.repeat)
+except RuntimeError:
+    pass
+
+print()
+
+ext_boundaries = [[1, 5], [6, 8], [9, 32], [33, 88]]
+
+print("Slicer (extended header fields)")
+bench("Slicer.slice_bin", lambda frame: Slicer.slice_bin(frame, ext_boundaries), ext_frames,
+    args.repeat)
+bench("Slicer.old_slice_bin", lambda frame: Slicer.old_slice_bin(frame, ext_boundaries),
+    ext_frames, args.repeat)
+bench("CompiledDescriptor.unpack", ADSBFrame.ext_frame_descriptor.unpack, ext_frames,
+    args.repeat)
+bench("CompiledDescriptor.values", ADSBFrame.ext_frame_descriptor.values, ext_frames,
+    args.repeat)
+print()
+
+# Group ME fields by what decodes them.
+me_fields = {}
+
+for frame in ext_frames:
+    if frame[0] >> 3 != 17:
+        continue
+
+    me_type = frame[4] >> 3
+    me = int.from_bytes(frame[4:11], 'big')
+
+    if me_type >= 1 and me_type <= 4:
+        me_fields.setdefault(IdAndCategory, []).append(me)
+    elif (me_type >= 9 and me_type <= 18) or (me_type >= 20 and me_type <= 22):
+        me_fields.setdefault(AirbornePosition, []).append(me)
+    elif me_type == 19:
+        me_fields.setdefault(AirborneVelocity, []).append(me)
+
+    me_fields.setdefault(MessageField, []).append(me)
+
+print("Sub-decoders")
+for decoder, fields in me_fields.items():
+    bench(decoder.__name__, decoder, fields, args.repeat)
+print()
+
+print("Allocations per frame")
+allocations("ADSBFrame", ADSBFrame, frames)
+allocations("FrameRecord", FrameRecord, frames)
+allocations("LazyADSBFrame icao", lambda frame: LazyADSBFrame(frame).get('icao'), frames)
@@ -1,2 +1,16 @@
 from .adsb import *
-from .util import *
\ No newline at end of file
+from .batch import *
+from .cache import *
+from .commb import *
+from .capture import *
+from .cpr import *
+from .history import *
+from .metrics import *
+from .pool import *
+from .push import *
+from .spatial import *
+from .stream import *
+from .subscribe import *
+from .tracker import *
+from .util import *
+from .wire import *
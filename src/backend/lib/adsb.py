@@ -2,63 +2,93 @@
 This file is part of Flextelem. Its purpose is to support decoding ADS-B frames.
 https://mode-s.org/decode/index.html
 """
+import functools
 import math
+from collections.abc import Mapping
 from pprint import pprint
 
 from .util import Slicer
 from .util import AdsbCrc
+from .util import CompiledDescriptor
+from .util import IcaoIndex
+from .util import NullMetrics
+from .util import Record
 
 
-class AirbornePosition(dict):
+class AddressParity(dict):
     """
-    ADS-B airborne position
+    Address recovered from the address/parity field of a Mode S reply.
     """
 
-    def __new__(cls, bin_data):
-        decoded = cls.__decode(bin_data)
+    # Downlink formats that overlay the aircraft address on the CRC.
+    dfs = [0, 4, 5, 16, 20, 21]
+
+    def __new__(cls, bin_data, icao_index):
+        decoded = cls.__decode(bin_data, icao_index)
 
         return decoded
 
 
-    def __decode(bin_data):
+    def __decode(bin_data, icao_index):
         """
-        Decode airborne position data.
+        Recover the address from the CRC remainder, returning None if it isn't a confirmed
+        address in the index.
         """
-        decoded = {}
 
-        field_descriptor = {
-            "boundaries": [[1, 5], [6, 7], [8, 8], [9, 20], [21, 21], [22, 22], [23, 39], [40, 56]],
-            "labels": ["me_type", "surveillance_status", "single_antenna_flag", "altitude",
-                        "time", "cpr-format", "lat-cpr", "lon-cpr"],
-            "types": [BinInt, AirbornePositionSurveillanceStatus, bool, bytearray, bool, BinInt,
-                        BinInt, BinInt]
+        crc = AdsbCrc.crc_sliced(bin_data[:-3])
+        address = crc ^ int.from_bytes(bin_data[-3:], 'big')
+
+        if icao_index.check(address) is False:
+            return None
+
+        decoded = {
+            "crc_match": True,
+            "crc_hex": hex(crc)[2:], # CRC in hex without the 0x
+            "icao": IcaoAA(address)
         }
 
-        unwrapped_fields = Slicer.slice_bin(bin_data, field_descriptor['boundaries'])
+        return decoded
 
-        # Process all fields.
-        for field_index in range(0, len(unwrapped_fields)):
-            this_field_content = unwrapped_fields[field_index]
-            decoded.update({
-                field_descriptor['labels'][field_index]:
-                    field_descriptor['types'][field_index](this_field_content)
-            })
-        
-        altitude = decoded.pop('altitude')
+
+class AirbornePosition(Record):
+    """
+    ADS-B airborne position
+    """
+
+    __slots__ = ('me_type', 'surveillance_status', 'single_antenna_flag', 'altitude', 'time',
+        'cpr_format', 'lat_cpr', 'lon_cpr', 'altitude_type', 'altitude_unit')
+
+    dict_keys = {
+        'cpr_format': 'cpr-format',
+        'lat_cpr': 'lat-cpr',
+        'lon_cpr': 'lon-cpr'
+    }
+
+    def __new__(cls, bin_data):
+        decoded = cls.__decode(Record.__new__(cls), bin_data)
+
+        return decoded
+
+
+    def __decode(decoded, bin_data):
+        """
+        Decode airborne position data.
+        """
+        AirbornePosition.field_descriptor.unpack_into(decoded, bin_data)
+
+        altitude = decoded.altitude
 
         # Barometric altitude based on message type code.
-        if decoded['me_type'] >= 9 and decoded['me_type'] <= 18:
-            decoded.update({
-                'altitude_type': 'barometric',
-                'altitude_unit': 'ft',
-                'altitude': BaroAlt(altitude)
-            })
-        elif decoded['me_type'] >= 20 and decoded['me_type'] <= 22:
-            decoded.update({
-                'altitude_type': 'gnss',
-                'altitude_unit': 'm',
-                'altitude': BinInt(altitude)
-            })
+        if decoded.me_type >= 9 and decoded.me_type <= 18:
+            decoded.altitude_type = 'barometric'
+            decoded.altitude_unit = 'ft'
+            decoded.altitude = BaroAlt.altitude_table[altitude]
+        elif decoded.me_type >= 20 and decoded.me_type <= 22:
+            decoded.altitude_type = 'gnss'
+            decoded.altitude_unit = 'm'
+            decoded.altitude = BinInt(altitude)
+        else:
+            decoded.altitude = None
 
         return decoded
 
@@ -72,7 +102,10 @@ class AirbornePositionSurveillanceStatus(str):
         ss_str = ""
         ss_map = ["no condition", "permanent alert", "temporary alert", "spi"]
 
-        ss_int = int.from_bytes(ss, 'big')
+        if type(ss) is int:
+            ss_int = ss
+        else:
+            ss_int = int.from_bytes(ss, 'big')
 
         try:
             ss_str = ss_map[ss_int]
@@ -82,50 +115,93 @@ class AirbornePositionSurveillanceStatus(str):
         return ss_str
 
 
-class AirborneVelocity(dict):
+class AirborneVelocity(Record):
     """
     Airborne velocity data
     """
 
+    __slots__ = ('me_type', 'sub_type', 'intent_change', 'ifr_capability',
+        'velociy_uncertainty_catgoery', 'velocity_ew', 'velocity_ns', 'ground_speed', 'track',
+        'heading', 'airspeed_type', 'airspeed', 'vert_rate_source', 'vert_rate',
+        'gnss_baro_alt_diff')
+
     def __new__(cls, bin_data):
-        decoded = cls.__decode(bin_data)
+        decoded = cls.__decode(Record.__new__(cls), bin_data)
 
         return decoded
 
 
-    def __decode(bin_data):
+    def __decode(decoded, bin_data):
         """
         Decode airborne position frames
         """
 
-        descriptor = {
-            "boundaries": [[1, 5], [6, 8], [9, 9], [10, 10], [11, 13], [14, 35], [36, 36],
-                        [37, 37], [38, 46], [47, 48], [49, 49], [50, 56]],
-            "labels": ["me_type", "sub_type", "intent_change", "ifr_capability",
-                        "velociy_uncertainty_catgoery", "sub_field", "source_bit",
-                        "vert_rate_sign", "vert_rate_raw", "reserved", "gnss_baro_alt_diff_sign",
-                        "gnss_baro_alt_diff"],
-            "types": [BinInt, BinInt, bool, BinInt, BinInt, bytearray, BinInt, BinInt,
-                        BinInt, BinInt, BinInt, BinInt]
-        }
+        (decoded.me_type, sub_type, decoded.intent_change, decoded.ifr_capability,
+            decoded.velociy_uncertainty_catgoery, sign_1, value_1, sign_2, value_2, source_bit,
+            vert_rate_sign, vert_rate_raw, alt_diff_sign,
+            alt_diff_raw) = AirborneVelocity.field_descriptor.values(bin_data)
+
+        decoded.sub_type = sub_type
+
+        # Ground speed subtypes, where 0 means no velocity and supersonic is in 4 kt units.
+        if sub_type == 1 or sub_type == 2:
+            if value_1 != 0 and value_2 != 0:
+                units = 4 if sub_type == 2 else 1
+                velocity_ew = value_1 - 1
+                velocity_ns = value_2 - 1
+
+                # Negative is west and south.
+                if sign_1:
+                    velocity_ew = -velocity_ew
+                if sign_2:
+                    velocity_ns = -velocity_ns
+
+                decoded.velocity_ew = velocity_ew * units
+                decoded.velocity_ns = velocity_ns * units
+                decoded.ground_speed, decoded.track = AirborneVelocity.speed_track(velocity_ew,
+                    velocity_ns, units)
+
+        # Airspeed subtypes carry a heading, w/ a status bit, and IAS or TAS.
+        elif sub_type == 3 or sub_type == 4:
+            if sign_1:
+                decoded.heading = value_1 * 0.3515625
+
+            if value_2 != 0:
+                decoded.airspeed_type = "tas" if sign_2 else "ias"
+                decoded.airspeed = (value_2 - 1) * (4 if sub_type == 4 else 1)
+
+        # Vertical rate in 64 ft/min units, negative is down.
+        if vert_rate_raw != 0:
+            decoded.vert_rate_source = "barometric" if source_bit else "gnss"
+            decoded.vert_rate = (vert_rate_raw - 1) * (-64 if vert_rate_sign else 64)
+
+        # GNSS altitude relative to barometric in 25 ft units.
+        if alt_diff_raw != 0:
+            decoded.gnss_baro_alt_diff = (alt_diff_raw - 1) * (-25 if alt_diff_sign else 25)
 
-        decoded = {}
+        return decoded
 
-        unwrapped_fields = Slicer.slice_bin(bin_data, descriptor['boundaries'])
 
-        for field_index in range(0, len(unwrapped_fields)):
-            this_field_content = unwrapped_fields[field_index]
-            decoded.update({
-                descriptor['labels'][field_index]:
-                    descriptor['types'][field_index](this_field_content)
-            })
+    @staticmethod
+    def speed_track(velocity_ew, velocity_ns, units=1):
+        """
+        Ground speed and track in degrees from signed E/W and N/S velocities in units of 1 or 4
+        kt.
 
-        return decoded
+        Returns a (speed, track) tuple where track is None when the speed is 0.
+        """
+
+        speed = math.hypot(velocity_ew, velocity_ns) * units
+
+        if speed == 0:
+            return (speed, None)
+
+        return (speed, math.degrees(math.atan2(velocity_ew, velocity_ns)) % 360)
 
 
 class AisStr(str):
     """
-    AIS string from bytearray.
+    AIS string from bytearray or an int.
     """
 
     ais_charset = [
@@ -135,25 +211,91 @@ class AisStr(str):
         "3", "4", "5", "6", "7", "8", "9", ":", ";", "<", "=", ">", "?"
     ]
 
-    def __new__(cls, bin_data):
-        value = ""
+    # Decoded 8 character idents kept by the ident cache.
+    cache_size = 4096
 
-        # Each char is 6 bits.
-        bitmask = 0x3f
+    def __new__(cls, bin_data, char_ct=8):
+        # Integers are taken as-is, defaulting to an 8 character ident.
+        if type(bin_data) is int:
+            bytes_as_int = bin_data
+        else:
+            # How many 6 bit characters do we have?
+            char_ct = math.floor((len(bin_data) * 8) / 6)
 
-        # How many 6 bit characters do we have?
-        char_ct = math.floor((len(bin_data) * 8) / 6)
+            # Convert our bytes to a big int...
+            bytes_as_int = int.from_bytes(bin_data, 'big')
 
-        # Convert our bytes to a big int...
-        bytes_as_int = int.from_bytes(bin_data, 'big')
+        # Idents repeat every few seconds, so share the decoded string.
+        if char_ct == 8 and cls is AisStr:
+            return AisStr.decode_ident(bytes_as_int & 0xffffffffffff)
 
-        # Decode each character.
-        for cursor in range(0, char_ct):
-            char_idx = (bytes_as_int >> (cursor * 6)) & bitmask
-            value = cls.ais_charset[char_idx] + value
+        # Decode two characters at a time, padding odd counts w/ one extra character.
+        pair_table = cls.pair_table
+        pair_ct = (char_ct + 1) // 2
+
+        value = "".join([pair_table[(bytes_as_int >> (cursor * 12)) & 0xfff]
+            for cursor in range(pair_ct - 1, -1, -1)])
 
         # Return as a string object.
-        return str.__new__(cls, value)
+        return str.__new__(cls, value[char_ct & 0x1:])
+
+
+    def compute_pair_table():
+        """
+        Create the table of two character strings for every 12 bit value.
+        """
+
+        charset = AisStr.ais_charset
+
+        return [charset[pair >> 6] + charset[pair & 0x3f] for pair in range(0, 4096)]
+
+
+    @staticmethod
+    def decode_ident(ident):
+        """
+        Decode a 48 bit ident to a shared AisStr. Wrapped in an LRU cache at import time.
+        """
+
+        pair_table = AisStr.pair_table
+
+        return str.__new__(AisStr, pair_table[ident >> 36] + pair_table[(ident >> 24) & 0xfff] +
+            pair_table[(ident >> 12) & 0xfff] + pair_table[ident & 0xfff])
+
+
+    def __reduce__(self):
+        # Rebuild from the decoded string rather than decoding again.
+        return (str.__new__, (type(self), str(self)))
+
+
+class AltitudeCode(int):
+    """
+    Altitude from the 13 bit AC field of a Mode S reply
+    """
+
+    def __new__(cls, ac):
+        if (ac >> 6) & 0x1:
+            raise RuntimeWarning("Altitude encoded in meters.")
+
+        altitude = BaroAlt.altitude_table[AltitudeCode.altitude_index(ac)]
+
+        if altitude is None:
+            raise ValueError("AC field doesn't carry an altitude.")
+
+        return int.__new__(cls, altitude)
+
+
+    @staticmethod
+    def altitude_index(ac):
+        """
+        Index into the 12 bit altitude table for an AC field, which is the AC field w/o the M bit.
+        """
+
+        return ((ac >> 7) << 6) | (ac & 0x3f)
+
+
+    def __reduce__(self):
+        # Rebuild from the decoded altitude rather than decoding again.
+        return (int.__new__, (type(self), int(self)))
 
 
 class BinInt(int):
@@ -162,6 +304,13 @@ class BinInt(int):
     """
 
     def __new__(cls, bin_data):
+        if type(bin_data) is int:
+            # Small values are shared rather than allocated per field.
+            if bin_data >= 0 and bin_data < 256 and cls is BinInt:
+                return BinInt.small_values[bin_data]
+
+            return int.__new__(cls, bin_data)
+
         value = int.from_bytes(bin_data, 'big')
         return int.__new__(cls, value)
 
@@ -172,132 +321,310 @@ class BaroAlt(int):
     """
 
     def __new__(self, bin_data):
-        altitude = 0
+        if not isinstance(bin_data, int):
+            bin_data = int.from_bytes(bin_data, 'big')
 
-        decoded = {}
+        # Altitude in feet or None.
+        return BaroAlt.altitude_table[bin_data & 0xfff]
 
-        field_descriptor = {
-            # Bits 1-4 are padding all 12 bits are big endian.
-            "boundaries": [[5, 11], [12, 12], [13, 16]],
-            "labels": ["alt_1", "q_bit", "alt_2"],
-            "types": [BinInt, bool, BinInt]
-        }
 
-        unwrapped_fields = Slicer.slice_bin(bin_data, field_descriptor['boundaries'])
+    def compute_altitude_table():
+        """
+        Create the table of altitudes for every 12 bit altitude code. Codes w/ the Q bit set are in
+        25 ft increments, the rest are Gillham Gray code in 100 ft increments.
 
-        for field_index in range(0, len(unwrapped_fields)):
-            this_field_content = unwrapped_fields[field_index]
-            decoded.update({
-                field_descriptor['labels'][field_index]:
-                    field_descriptor['types'][field_index](this_field_content)
-            })
+        Returns a list of altitudes in feet w/ None for codes that don't carry an altitude.
+        """
 
-        alt_combined = (decoded['alt_1'] * 4) + (decoded['alt_2'])
-        
-        # Q bit sets 25 ft increments w/ a 1K ft offset.
-        if decoded["q_bit"] is True:
-            altitude = (alt_combined * 25) - 1000
-        else:
-            raise RuntimeWarning("Altitude encoded w/gray code.")
+        altitude_table = []
+
+        for code in range(0, 4096):
+            # Q bit sets 25 ft increments w/ a 1K ft offset.
+            if code & 0x10:
+                altitude = ((((code >> 5) << 4) | (code & 0xf)) * 25) - 1000
+            else:
+                altitude = BaroAlt.gray_altitude(code)
+
+            altitude_table.append(altitude)
+
+        return altitude_table
+
+
+    @staticmethod
+    def gray_altitude(code):
+        """
+        Altitude from a 12 bit Gillham Gray code, C1 A1 C2 A2 C4 A4 B1 D1 B2 D2 B4 D4.
+
+        Returns the altitude in feet or None if the code isn't valid.
+        """
+
+        c1, a1, c2, a2, c4, a4, b1, d1, b2, d2, b4, d4 = [(code >> bit) & 0x1
+            for bit in range(11, -1, -1)]
+
+        # 500 ft increments are Gray coded in the D, A and B bits.
+        n500 = 0
 
-        return int(altitude)
+        for bit in [d1, d2, d4, a1, a2, a4, b1, b2, b4]:
+            n500 = (n500 << 1) | (bit ^ (n500 & 0x1))
 
+        # 100 ft increments are Gray coded in the C bits.
+        n100 = 0
 
-class Crc(dict):
+        for bit in [c1, c2, c4]:
+            n100 = (n100 << 1) | (bit ^ (n100 & 0x1))
+
+        if n100 in [0, 5, 6]:
+            return None
+
+        if n100 == 7:
+            n100 = 5
+
+        # The 100 ft count runs backwards in odd 500 ft increments.
+        if n500 & 0x1:
+            n100 = 6 - n100
+
+        return (n500 * 500) + (n100 * 100) - 1300
+
+
+class Crc(Record):
     """
     ADS-B CRC field
     """
 
-    def __new__(cls, bin_data):
-        decoded = cls.__decode(bin_data)
+    __slots__ = ('crc_match', 'crc_hex', 'crc_corrected_bits', 'frame_corrected')
+
+    def __new__(cls, bin_data, fix_bits=0, frame_int=None):
+        decoded = cls.__decode(Record.__new__(cls), bin_data, fix_bits, frame_int)
 
         return decoded
 
 
-    def __decode(bin_data):
+    def __decode(decoded, bin_data, fix_bits, frame_int):
         """
-        Decode ID and category data.
+        Decode ID and category data. DF17/18 frames failing the CRC have up to fix_bits bit
+        errors corrected when possible. The frame's value as an int saves converting it again.
         """
-        decoded = {}
-
-        computed_crc_table = AdsbCrc.compute_crc_table()
-        bitmask = 0xffffff
 
         # Everything but the 3 byte CRC is data.
         data_field_len_bytes = len(bin_data) - 3
 
         # Get boundaries of
         data_field = bin_data[:data_field_len_bytes]
-        crc_field = int.from_bytes(bin_data[-3:], 'big')
+        if frame_int is None:
+            crc_field = int.from_bytes(bin_data[-3:], 'big')
+        else:
+            crc_field = frame_int & 0xffffff
 
-        crc = 0
-        
         # Compute the CRC for the data portion of the frame.
-        for i in range(0, len(data_field)):
-            crc = computed_crc_table[((crc >> 16) ^ data_field[i]) & 0xff] ^ (crc << 8)
-        
-        crc = (crc & bitmask)
-        
+        crc = AdsbCrc.crc_sliced(data_field)
+
         # Look for a match.
         crc_match = False
         if crc == crc_field:
             crc_match = True
 
-        decoded.update({
-             "crc_match": crc_match,
-             "crc_hex": hex(crc)[2:] # CRC in hex without the 0x
-         })
+        decoded.crc_match = crc_match
+        decoded.crc_hex = hex(crc)[2:] # CRC in hex without the 0x
+
+        # Try to correct extended squitters using the syndrome.
+        if crc_match is False and fix_bits > 0 and (bin_data[0] >> 3) in [17, 18]:
+            correction = AdsbCrc.correct(bin_data, crc ^ crc_field, fix_bits)
+
+            if correction is not None and (correction[0][0] >> 3) in [17, 18]:
+                decoded.crc_match = True
+
+                # The error may have been in the CRC field itself.
+                decoded.crc_hex = hex(int.from_bytes(correction[0][-3:], 'big'))[2:]
+                decoded.crc_corrected_bits = list(correction[1])
+                decoded.frame_corrected = correction[0]
 
         return decoded
 
 
-class ExtendedSquitter(dict):
+class ExtendedSquitter(Record):
     """
     Extended squitter
     """
 
+    __slots__ = ('df_name', 'raw_data', 'message')
+
     def __new__(cls, df, ca, bin_data):
-        decoded = cls.__decode(df, ca, bin_data)
+        decoded = cls.__decode(Record.__new__(cls), df, ca, bin_data)
 
         return decoded
 
 
-    def __decode(df, ca, bin_data):
-        decoded = {}
+    def __decode(decoded, df, ca, bin_data):
+        df_name, decoder = ExtendedSquitter.df_table[df]
+
+        if decoder is not None:
+            decoded.df_name = df_name
+            decoded.message = decoder(bin_data)
+
+        elif type(bin_data) is int:
+            decoded.raw_data = "%014x" %bin_data
+
+        else:
+            decoded.raw_data = bin_data.hex()
+
+        return decoded
+
+
+class FrameRecord(Record):
+    """
+    Decoded Mode S frame. Frames a frame filter doesn't accept return None before any decoding,
+    other than the CRC check of DF11/17/18 frames that confirms their address in an ICAO index.
+    """
+
+    __slots__ = ('frame_bytes', 'frame_mode', 'crc_match', 'crc_hex', 'crc_corrected_bits', 'df',
+        'ca', 'icao', 'aa', 'message')
+
+    def __new__(cls, frame, fix_bits=0, icao_index=None, frame_filter=None, bds_inference=None):
+        # Comm-B replies are only decoded once their address checks out.
+        if bds_inference is not None and icao_index is None:
+            raise ValueError("BDS inference needs an ICAO index to check reply addresses.")
+
+        # The frame's value is converted once and shared by the CRC and field decoders.
+        if type(frame) is int:
+            frame_int = frame
+            frame = ADSBFrame.check_frame(frame)
+        else:
+            frame = ADSBFrame.check_frame(frame)
+            frame_int = int.from_bytes(frame, 'big')
+
+        # Leave before decoding anything a filter doesn't want.
+        if frame_filter is not None and not frame_filter.accepts(frame):
+            # Replies the filter does want may still need this frame to confirm their address.
+            if icao_index is not None and (frame[0] >> 3) in [11, 17, 18]:
+                FrameRecord.__confirm_address(Crc(frame, fix_bits, frame_int), frame, frame_int,
+                    icao_index)
+
+            return None
+
+        decoded = cls.__decode(Record.__new__(cls), frame, frame_int, fix_bits, icao_index,
+            bds_inference)
+
+        FrameRecord.metrics.frame(decoded)
+
+        return decoded
+
+
+    def __confirm_address(crc_object, frame, frame_int, icao_index):
+        """
+        Confirm the address of an all-call reply or extended squitter w/ a clean CRC in an ICAO
+        index, if there is one.
+
+        Returns the frame and its int, corrected if the CRC check fixed bit errors.
+        """
+
+        frame_corrected = getattr(crc_object, 'frame_corrected', None)
+
+        if frame_corrected is not None:
+            frame = frame_corrected
+            frame_int = int.from_bytes(frame, 'big')
+
+        if icao_index is not None and crc_object.crc_match is True and \
+            (frame[0] >> 3) in [11, 17, 18]:
+            icao_index.confirm((frame_int >> ((len(frame) * 8) - 32)) & 0xffffff)
+
+        return (frame, frame_int)
+
+
+    def __decode(decoded, frame, frame_int, fix_bits, icao_index, bds_inference):
+        """
+        Decode a frame, returning None if it can't be decoded. With an ICAO index, address/parity
+        replies are dropped unless their address has been confirmed by a DF11/17/18 frame, and
+        Comm-B replies have their BDS register inferred if there's a BDS inference engine.
+        """
+
+        frame_bytes = len(frame)
+        decoded.frame_bytes = frame_bytes
+
+        df = frame[0] >> 3
+
+        # Address/parity replies.
+        if icao_index is not None and df in AddressParity.dfs:
+            address_parity = AddressParity(frame, icao_index)
+
+            # Drop replies from addresses we haven't confirmed.
+            if address_parity is None:
+                return None
+
+            decoded.crc_match = address_parity['crc_match']
+            decoded.crc_hex = address_parity['crc_hex']
+            decoded.icao = address_parity['icao']
+            decoded.df = BinInt(df)
+            decoded.frame_mode = "s short?" if frame_bytes == 7 else "s extended"
+            decoded.message = SurveillanceReply(df, frame)
 
-        if df == 17:
-            decoded.update({"df_name": "extended squitter"})
-            decoded.update(MessageField(bin_data))
+            if bds_inference is not None and df in [20, 21] and frame_bytes == 14:
+                decoded.message.update(bds_inference.decode(int(decoded.icao),
+                    (frame_int >> 24) & 0xffffffffffffff))
 
+            return decoded
+
+        # Build CRC object.
+        crc_object = Crc(frame, fix_bits, frame_int)
+        decoded.crc_match = crc_object.crc_match
+        decoded.crc_hex = crc_object.crc_hex
+
+        if getattr(crc_object, 'frame_corrected', None) is not None:
+            decoded.crc_corrected_bits = crc_object.crc_corrected_bits
+
+        # Carry on with the corrected frame if we fixed bit errors.
+        frame, frame_int = FrameRecord.__confirm_address(crc_object, frame, frame_int,
+            icao_index)
+
+        # 56 bit / 7 byte short squitter frame
+        if frame_bytes == 7:
+            decoded.frame_mode = "s short?"
+
+            # Break the frame down.
+            decoded.df, decoded.ca, decoded.aa, data = \
+                ADSBFrame.short_frame_descriptor.values(frame_int)
+
+            decoded.message = ShortSquitter(decoded.df, decoded.ca, data)
+
+        # 112 bit / 14 byte extended squitter frame
         else:
-            decoded.update({"raw_data": bin_data.hex()})
+            # Set frame type.
+            decoded.frame_mode = "s extended"
+
+            # Break the ES frame down.
+            decoded.df, decoded.ca, decoded.icao, data = \
+                ADSBFrame.ext_frame_descriptor.values(frame_int)
+
+            decoded.message = ExtendedSquitter(decoded.df, decoded.ca, data)
 
         return decoded
 
 
-class ShortSquitter(dict):
+class ShortSquitter(Record):
     """
     Short (7 byte) frame data.
     """
 
+    __slots__ = ('raw_data',)
+
     def __new__(cls, df, ca, bin_data):
-        decoded = cls.__decode(df, ca, bin_data)
+        decoded = cls.__decode(Record.__new__(cls), df, ca, bin_data)
 
         return decoded
 
 
-    def __decode(df, ca, bin_data):
+    def __decode(decoded, df, ca, bin_data):
         """
         Decode a 7 byte squitter
         """
 
-        decoded = {}
-
         if False:
             pass
 
+        elif type(bin_data) is int:
+            decoded.raw_data = "%06x" %bin_data
+
         else:
-            decoded.update({"raw_data": bin_data.hex()})
+            decoded.raw_data = bin_data.hex()
 
         return decoded
 
@@ -306,157 +633,231 @@ class IcaoAA(str):
     """
     ICAO Aircraft Address
     """
+
+    # The integer address lives on each instance.
+    __slots__ = ('__icao_int',)
+
     def __new__(cls, icao_aa):
         # Handle ICAO AA based on incoming type.
         incoming_type = type(icao_aa)
         if incoming_type is int:
-            cls.__icao_int = icao_aa
-        elif incoming_type is bytearray:
-            cls.__icao_int = int.from_bytes(icao_aa, 'big')
+            icao_int = icao_aa
+        elif incoming_type is bytearray or incoming_type is bytes or incoming_type is memoryview:
+            icao_int = int.from_bytes(icao_aa, 'big')
+        elif incoming_type is cls:
+            icao_int = int(icao_aa)
         elif incoming_type is str:
             try:
                 icao_aa.replace("0x", "")
-                cls.__icao_int = int(icao_aa, 16)
+                icao_int = int(icao_aa, 16)
             except ValueError:
                 raise ValueError("An ICAO Aircraft address must be a hex string " \
                     "representing a number between >= 0 and <= ffffff.")
+        else:
+            raise TypeError("Please provide an ICAO Aircraft address as an int, bytes-like " \
+                "object or hex string.")
 
         # Post-conversion boundary check.
-        if cls.__icao_int < 0x0 and cls.__icao_int > 0xffffff:
+        if icao_int < 0x0 or icao_int > 0xffffff:
             raise ValueError("An ICAO Aircraft address must be >= 0x0 and <= 0xffffff.")
 
-        icao_hex_str = hex(cls.__icao_int)[2:]
+        icao_hex_str = hex(icao_int)[2:]
         
         # Expand ICAO AA to 6 characters.
         missing = 6 - len(icao_hex_str)
         for i in range(0, missing):
             icao_hex_str = "0" + icao_hex_str
 
-        return str.__new__(cls, icao_hex_str)
+        icao = str.__new__(cls, icao_hex_str)
+        icao.__icao_int = icao_int
 
+        return icao
 
-    def __int__(cls):
+
+    def __int__(self):
         """
         ICAO AA as integer
         """
-        return cls.__icao_int
+        return self.__icao_int
 
 
-class IdAndCategory(dict):
+class IdAndCategory(Record):
     """
     ADS-B aircraft ident and category
     """
 
+    __slots__ = ('me_type', 'aircraft_category', 'ident')
+
     def __new__(cls, bin_data):
-        decoded = cls.__decode(bin_data)
+        decoded = cls.__decode(Record.__new__(cls), bin_data)
 
         return decoded
 
 
-    def __decode(bin_data):
+    def __decode(decoded, bin_data):
         """
         Decode ID and category data.
         """
-        decoded = {}
-
-        field_descriptor = {
-            "boundaries": [[1, 5], [6, 8], [9, 56]],
-            "labels": ["me_type", "aircraft_category", "ident"],
-            "types": [BinInt, BinInt, AisStr]
-        }
-
-        unwrapped_fields = Slicer.slice_bin(bin_data, field_descriptor['boundaries'])
-
-        # Process all fields.
-        for field_index in range(0, len(unwrapped_fields)):
-            this_field_content = unwrapped_fields[field_index]
-            decoded.update({
-                field_descriptor['labels'][field_index]:
-                    field_descriptor['types'][field_index](this_field_content)
-            })
+        IdAndCategory.field_descriptor.unpack_into(decoded, bin_data)
 
         return decoded
 
 
-class MessageField(dict):
+class MessageField(Record):
     """
     ADSB Message field
     """
 
+    __slots__ = ('me_type', 'me_data', 'me_type_name', 'aircraft_category_name', 'message')
+
     def __new__(cls, me_field):
-        decoded = cls.__decode_field(me_field)
+        decoded = cls.__decode_field(Record.__new__(cls), me_field)
 
         return decoded
 
 
-    def __decode_field(me_field):
+    def __decode_field(decoded, me_field):
         """
         Decode our message field.
         """
 
-        decoded = dict()
+        MessageField.field_descriptor.unpack_into(decoded, me_field)
 
-        descriptor = {
-            "boundaries": [[1, 5], [1, 56]],
-            "labels": ["me_type", "me_data"],
-            "types": [BinInt, bytearray]
-        }
+        me_type = decoded.me_type
+        decoder, me_type_name = MessageField.tc_table[me_type]
 
-        unwrapped_fields = Slicer.slice_bin(me_field, descriptor['boundaries'])
+        # Hand back undecoded message data as bytes.
+        if me_type_name is None:
+            decoded.me_data = bytearray(decoded.me_data.to_bytes(7, 'big'))
+            return decoded
 
-        for field_index in range(0, len(unwrapped_fields)):
-            this_field_content = unwrapped_fields[field_index]
+        decoded.me_type_name = me_type_name
+
+        if decoder is not None:
+            decoded.message = decoder(decoded.me_data)
+
+            # Get our named category data.
+            if decoder is IdAndCategory:
+                decoded.aircraft_category_name = WakeVortexCategory(me_type,
+                    decoded.message.aircraft_category).get('aircraft_category_name')
+
+        decoded.me_data = None
+
+        return decoded
+
+
+    def compute_tc_table():
+        """
+        Create the table of (decoder, message type name) by type code. Type codes w/o a name keep
+        their message data.
+        """
+
+        tc_table = [(None, None)] * 32
+
+        for me_type in range(1, 5):
+            tc_table[me_type] = (IdAndCategory, "aircraft identification")
+
+        for me_type in range(9, 19):
+            tc_table[me_type] = (AirbornePosition, "airborne position (baro alt)")
+
+        tc_table[19] = (AirborneVelocity, "airborne velocity")
+
+        for me_type in range(20, 23):
+            tc_table[me_type] = (AirbornePosition, "airborne position (gnss height)")
+
+        for me_type in range(23, 28):
+            tc_table[me_type] = (None, "reserved")
+
+        tc_table[28] = (None, "aircraft status")
+        tc_table[29] = (None, "target state and status information")
+        tc_table[31] = (None, "aircraft operation status")
+
+        return tc_table
+
+
+class Squawk(str):
+    """
+    Squawk code from the 13 bit ID field of a Mode S reply
+    """
+
+    # Bit positions of each digit's 4, 2 and 1 bits counted from the right of the field.
+    digit_bits = [
+        [7, 9, 11], # A
+        [1, 3, 5], # B
+        [8, 10, 12], # C
+        [0, 2, 4] # D
+    ]
+
+    def __new__(cls, id_code):
+        squawk = ""
+
+        for bits in cls.digit_bits:
+            digit = (((id_code >> bits[0]) & 0x1) << 2) | (((id_code >> bits[1]) & 0x1) << 1) | \
+                ((id_code >> bits[2]) & 0x1)
+            squawk += str(digit)
+
+        return str.__new__(cls, squawk)
+
+
+    def __reduce__(self):
+        # Rebuild from the decoded string rather than decoding again.
+        return (str.__new__, (type(self), str(self)))
+
+
+class SurveillanceReply(dict):
+    """
+    Mode S surveillance and Comm-B replies.
+    """
+
+    df_names = {
+        0: "acas short reply",
+        4: "altitude reply",
+        5: "identity reply",
+        16: "acas long reply",
+        20: "comm-b altitude reply",
+        21: "comm-b identity reply"
+    }
+
+    def __new__(cls, df, bin_data):
+        decoded = cls.__decode(df, bin_data)
+
+        return decoded
+
+
+    def __decode(df, bin_data):
+        """
+        Decode the altitude or identity code of a reply whose address has been confirmed.
+        """
+
+        decoded = SurveillanceReply.field_descriptor.unpack(bin_data[:4])
+        decoded['df_name'] = SurveillanceReply.df_names[df]
+
+        code = decoded.pop('code')
+
+        # ACAS replies don't carry flight status, DR or UM.
+        if df in [0, 16]:
+            for label in ['flight_status', 'downlink_request', 'utility_message']:
+                decoded.pop(label)
+
+        # Identity replies.
+        if df in [5, 21]:
+            decoded['squawk'] = Squawk(code)
+
+        # Altitude replies, metric altitudes and codes w/o an altitude are left as they are.
+        elif code & 0x40 == 0 and \
+            BaroAlt.altitude_table[AltitudeCode.altitude_index(code)] is not None:
             decoded.update({
-                descriptor['labels'][field_index]:
-                    descriptor['types'][field_index](this_field_content)
+                'altitude_type': 'barometric',
+                'altitude_unit': 'ft',
+                'altitude': AltitudeCode(code)
             })
 
-        # Aircraft ID and category data.
-        if decoded['me_type'] >= 1 and decoded['me_type'] <= 4:
-            me_data = decoded.pop('me_data')
-            decoded.update(IdAndCategory(me_data))
-            decoded.update({"me_type_name": "aircraft identification"})
-        
-            # Get our named category data.
-            decoded.update(WakeVortexCategory(decoded['me_type'], decoded['aircraft_category']))
-
-        # Airborne position data.
-        elif decoded['me_type'] >= 9 and decoded['me_type'] <= 18:
-            me_data = decoded.pop('me_data')
-            decoded.update(AirbornePosition(me_data))
-            decoded.update({"me_type_name": "airborne position (baro alt)"})
-
-        # Airborne velocity data.
-        elif decoded['me_type'] == 19:
-            me_data = decoded.pop('me_data')
-            decoded.update(AirborneVelocity(me_data))
-            decoded.update({"me_type_name": "airborne velocity"})
-
-        # Airborne position data.
-        elif decoded['me_type'] >= 20 and decoded['me_type'] <= 22:
-            me_data = decoded.pop('me_data')
-            decoded.update(AirbornePosition(me_data))
-            decoded.update({"me_type_name": "airborne position (gnss height)"})
-
-        # Reseved.
-        elif decoded['me_type'] >= 23 and decoded['me_type'] <= 27:
-            me_data = decoded.pop('me_data')
-            decoded.update({"me_type_name": "reserved"})
-
-        # Aircraft status.
-        elif decoded['me_type'] == 28:
-            me_data = decoded.pop('me_data')
-            decoded.update({"me_type_name": "aircraft status"})
-
-        # Target state and status information.
-        elif decoded['me_type'] == 29:
-            me_data = decoded.pop('me_data')
-            decoded.update({"me_type_name": "target state and status information"})
-
-        # Target state and status information.
-        elif decoded['me_type'] == 31:
-            me_data = decoded.pop('me_data')
-            decoded.update({"me_type_name": "aircraft operation status"})
+        else:
+            decoded['altitude_code'] = code
+
+        # Comm-B and ACAS long replies carry 56 more bits of data.
+        if len(bin_data) == 14:
+            decoded['raw_data'] = bin_data[4:11].hex()
 
         return decoded
 
@@ -466,6 +867,42 @@ class WakeVortexCategory(dict):
     Decode wake vortex category
     """
 
+    # Category names by type code and category.
+    tc_ca_matrix = [
+        None, # TC 0, illegal
+        None, # TC 1, no info
+        [ # TC 2
+            "no category info", # CA 0
+            "surface emergency vehicle", # CA 1
+            "surface service vehicle", # CA 2
+            "ground obstruction", # CA 3
+            "ground obstruction", # CA 4
+            "ground obstruction", # CA 5
+            "ground obstruction", # CA 6
+            "ground obstruction", # CA 7
+        ],
+        [ # TC 3
+            "no category info", # CA 0
+            "glider/sailplane", # CA 1
+            "lighter-than-air", # CA 2
+            "parachutist/skydiver", # CA 3
+            "ultralight/hang-glider/paraglider", # CA 4
+            "reserved", # CA 5
+            "unmanned aerial vehicle", # CA 6
+            "space/transatmospheric vheicle", # CA 7
+        ], 
+        [ # TC 4
+            "no category info", # CA 0
+            "light aircraft", # CA 1
+            "medium 1 aircraft", # CA 2
+            "medium 2 aircraft", # CA 3
+            "high vortex aircraft", # CA 4
+            "heavy aircraft", # CA 5
+            "high performance aircraft", # CA 6
+            "rotorcraft", # CA 7
+        ] 
+    ]
+
     def __new__(cls, me_type, category):
         return cls.__decode(me_type, category)
 
@@ -476,41 +913,6 @@ class WakeVortexCategory(dict):
 
         wake_cat_data = {}
 
-        tc_ca_matrix = [
-            None, # TC 0, illegal
-            None, # TC 1, no info
-            [ # TC 2
-                "no category info", # CA 0
-                "surface emergency vehicle", # CA 1
-                "surface service vehicle", # CA 2
-                "ground obstruction", # CA 3
-                "ground obstruction", # CA 4
-                "ground obstruction", # CA 5
-                "ground obstruction", # CA 6
-                "ground obstruction", # CA 7
-            ],
-            [ # TC 3
-                "no category info", # CA 0
-                "glider/sailplane", # CA 1
-                "lighter-than-air", # CA 2
-                "parachutist/skydiver", # CA 3
-                "ultralight/hang-glider/paraglider", # CA 4
-                "reserved", # CA 5
-                "unmanned aerial vehicle", # CA 6
-                "space/transatmospheric vheicle", # CA 7
-            ], 
-            [ # TC 4
-                "no category info", # CA 0
-                "light aircraft", # CA 1
-                "medium 1 aircraft", # CA 2
-                "medium 2 aircraft", # CA 3
-                "high vortex aircraft", # CA 4
-                "heavy aircraft", # CA 5
-                "high performance aircraft", # CA 6
-                "rotorcraft", # CA 7
-            ] 
-        ]
-
         # invalid
         if me_type == 0:
             pass
@@ -521,7 +923,7 @@ class WakeVortexCategory(dict):
         # all others
         else:
             wake_cat_data.update({
-                'aircraft_category_name': tc_ca_matrix[me_type][category]})
+                'aircraft_category_name': WakeVortexCategory.tc_ca_matrix[me_type][category]})
 
         return wake_cat_data
 
@@ -531,150 +933,277 @@ class ADSBFrame(dict):
     Class representing an ADS-B frame.
     """
 
-    def __new__(cls, frame):
+    def __new__(cls, frame, fix_bits=0, icao_index=None, frame_filter=None, bds_inference=None):
+        decoded = FrameRecord(frame, fix_bits, icao_index, frame_filter, bds_inference)
+
+        # Frames that can't be decoded.
+        if decoded is None:
+            return None
+
+        return decoded.to_dict()
+
+
+    @staticmethod
+    def frame_address(frame):
+        """
+        ICAO address of a 7 or 14 byte frame as an int. Address/parity replies give the address
+        recovered from their CRC, which is only the real address if the frame is intact.
+        """
+
+        if (frame[0] >> 3) in AddressParity.dfs:
+            return AdsbCrc.crc_sliced(frame[:-3]) ^ int.from_bytes(frame[-3:], 'big')
+
+        return int.from_bytes(frame[1:4], 'big')
+
+
+    @staticmethod
+    def check_frame(frame):
+        """
+        Get a frame as a buffer of bytes, making sure it's of an expected length. Bytes,
+        bytearrays and memoryviews are used as they are, w/o copying, other than memoryviews being
+        cast to bytes. Ints are taken as 14 byte frames if they need more than 56 bits.
+        """
+
         # Handle our frame based on incoming type.
-        if type(frame) is str:
+        frame_type = type(frame)
+
+        if frame_type is bytes or frame_type is bytearray:
+            pass
+        elif frame_type is memoryview:
+            # Views of anything but single bytes would be measured and indexed in their items.
+            if frame.format != 'B' or frame.ndim != 1:
+                try:
+                    frame = frame.cast('B')
+                except TypeError:
+                    raise TypeError("Please provide a frame as a hex string, buffer or int.")
+        elif frame_type is str:
             try:
-                frame = bytearray.fromhex(frame)
+                frame = bytes.fromhex(frame)
             except ValueError:
-                raise TypeError("Please provide a frame as a hex string or bytearray.")
-        elif type(frame) is bytearray:
-            frame = frame
+                raise TypeError("Please provide a frame as a hex string, buffer or int.")
+        elif frame_type is int:
+            if frame < 0 or frame.bit_length() > 112:
+                raise ValueError("Frames must be 7 or 14 bytes in length.")
+
+            frame = frame.to_bytes(14 if frame.bit_length() > 56 else 7, 'big')
         else:
-            raise TypeError("Please provide a frame as a hex string or bytearray.")
-        
+            # Anything else that supports the buffer protocol.
+            try:
+                frame = memoryview(frame).cast('B')
+            except TypeError:
+                raise TypeError("Please provide a frame as a hex string, buffer or int.")
+
         # See if we have a frame of expected length.
         if len(frame) not in [7, 14]:
             raise ValueError("Frames must be 7 or 14 bytes in length.")
-        
-        return cls.__decode(frame)
 
+        return frame
+
+
+class LazyADSBFrame(Mapping):
+    """
+    ADS-B frame that decodes fields on first access. Header, CRC and message type fields are
+    decoded on their own, anything else decodes the whole frame through ADSBFrame.
+    """
+
+    __slots__ = ('__frame', '__fields', '__decoded')
+
+    def __init__(self, frame):
+        self.__frame = ADSBFrame.check_frame(frame)
+        self.__fields = {}
+        self.__decoded = False
+
+
+    def __getitem__(self, key):
+        fields = self.__fields
+
+        if key in fields:
+            return fields[key]
+
+        if self.__decoded is False:
+            stage = LazyADSBFrame.stages.get(key)
 
-    def __decode(frame):
+            if stage is not None:
+                fields.update(stage(self.__frame))
+
+            if key not in fields:
+                self.__decode()
+
+        return fields[key]
+
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+
+        return True
+
+
+    def __iter__(self):
+        self.__decode()
+
+        return iter(self.__fields)
+
+
+    def __len__(self):
+        self.__decode()
+
+        return len(self.__fields)
+
+
+    def __repr__(self):
+        return "%s(%s)" %(type(self).__name__, self.__frame.hex())
+
+
+    def to_dict(self):
         """
-        Decode an ADS-B frame, returning a dictionary that contains the frame's fields, or None
-        if a frame can't be decoded.
+        Fully decoded frame as a dictionary.
         """
 
-        adsb_short_frame_descriptor = {
-            "boundaries": [[1, 5], [6, 8], [9, 32], [33, 56]],
-            "labels": ["df", "ca", "aa", "data"],
-            "types": [BinInt, BinInt, IcaoAA, bytearray]
-        }
+        self.__decode()
 
-        adsb_ext_frame_descriptor = {
-            "boundaries": [[1, 5], [6, 8], [9, 32], [33, 88]],
-            "labels": ["df", "ca", "icao", "data"],
-            "types": [BinInt, BinInt, IcaoAA, bytearray]
-        }
+        return dict(self.__fields)
 
-        # Build a frame descriptor.
-        frame_parsed = {
-            "frame_hex": frame,
-            "frame_bytes": len(frame)
-        }
 
-        if frame_parsed['frame_bytes'] in [7, 14]:
-            # Build CRC object.
-            crc_object = Crc(frame_parsed['frame_hex'])
-            frame_parsed.update(crc_object)
+    def __decode(self):
+        """
+        Decode the whole frame, keeping fields we've already decoded.
+        """
 
-        # 56 bit / 7 byte short squitter frame
-        if frame_parsed['frame_bytes'] == 7:
-            frame_parsed['frame_mode'] = "s short?"
+        if self.__decoded is False:
+            decoded = ADSBFrame(self.__frame)
+            decoded.update(self.__fields)
 
-            # Get our raw binary fields.
-            frame_fields_raw = Slicer.slice_bin(
-                frame, adsb_short_frame_descriptor['boundaries'])
+            self.__fields = decoded
+            self.__decoded = True
 
-            # Break the frame down.
-            for field_cursor in range(0, len(adsb_short_frame_descriptor['labels'])):
-                type_cast = adsb_short_frame_descriptor['types'][field_cursor]
-                field_label = adsb_short_frame_descriptor['labels'][field_cursor] 
-                field_value = type_cast(frame_fields_raw[field_cursor])
-
-                # If we have a dictionary just integrate it.
-                if type(field_value) is dict:
-                    frame_parsed.update(field_value)
-                # Or else add the new field.
-                else:
-                    frame_parsed.update({
-                        field_label: field_value
-                    })
-
-            # Remove the raw frame since we know what it is.
-            frame_parsed.pop('frame_hex')
-
-            # Grab data for parsing.
-            data = frame_parsed.pop('data')
-
-            frame_parsed.update(ShortSquitter(
-                frame_parsed['df'],
-                frame_parsed['ca'],
-                data))
 
-        # 112 bit / 14 byte extended squitter frame
-        elif frame_parsed['frame_bytes'] == 14:
-            # Set frame type.
-            frame_parsed['frame_mode'] = "s extended"
+    def decode_header(frame):
+        """
+        Decode the frame length, mode and header fields.
+        """
 
-            # Get our raw binary fields.
-            frame_fields_raw = Slicer.slice_bin(
-                frame, adsb_ext_frame_descriptor['boundaries'])
+        if len(frame) == 7:
+            return {
+                "frame_bytes": 7,
+                "frame_mode": "s short?",
+                "df": BinInt(frame[0] >> 3),
+                "ca": BinInt(frame[0] & 0x7),
+                "aa": IcaoAA(int.from_bytes(frame[1:4], 'big'))
+            }
+
+        return {
+            "frame_bytes": 14,
+            "frame_mode": "s extended",
+            "df": BinInt(frame[0] >> 3),
+            "ca": BinInt(frame[0] & 0x7),
+            "icao": IcaoAA(int.from_bytes(frame[1:4], 'big'))
+        }
 
-            # Break the ES frame down.
-            for field_cursor in range(0, len(adsb_ext_frame_descriptor['labels'])):
-                type_cast = adsb_ext_frame_descriptor['types'][field_cursor]
-                field_label = adsb_ext_frame_descriptor['labels'][field_cursor] 
-                field_value = type_cast(frame_fields_raw[field_cursor])
-
-                # If we have a dictionary just integrate it.
-                if type(field_value) is dict:
-                    frame_parsed.update(field_value)
-                # Or else add the new field.
-                else:
-                    frame_parsed.update({
-                        field_label: field_value
-                    })
-
-            # Remove the raw frame since we know what it is.
-            frame_parsed.pop('frame_hex')
-
-            # Grab data for parsing.
-            data = frame_parsed.pop('data')
-
-            frame_parsed.update(ExtendedSquitter(
-                frame_parsed['df'],
-                frame_parsed['ca'],
-                data
-            ))
-
-            ## DF 0 - ACAS short reply
-            #if frame_parsed['df'] == 0:
-            #    frame_parsed.update({"df_name": "acas short reply"})
-            #    frame_parsed.update({"raw_data": data.hex()})
-
-            ## DF 4 - Altitude reply
-            #elif frame_parsed['df'] == 4:
-            #    frame_parsed.update({"df_name": "altitude reply"})
-            #    frame_parsed.update({"raw_data": data.hex()})
-
-            ## DF 5 - Identity reply
-            #elif frame_parsed['df'] == 5:
-            #    frame_parsed.update({"df_name": "identity reply"})
-            #    frame_parsed.update({"raw_data": data.hex()})
-
-            ## DF 16 - ACAS long reply
-            #elif frame_parsed['df'] == 16:
-            #    frame_parsed.update({"df_name": "acas long reply"})
-            #    frame_parsed.update({"raw_data": data.hex()})
-
-            ## DF 21 - Identity reply
-            #elif frame_parsed['df'] == 21:
-            #    frame_parsed.update({"df_name": "identity reply"})
-            #    frame_parsed.update({"raw_data": data.hex()})
-
-            #else:
-            #    frame_parsed.update({"raw_data": data.hex()})
-
-        return frame_parsed
+
+    def decode_crc(frame):
+        """
+        Decode the CRC fields.
+        """
+
+        return Crc(frame).to_dict()
+
+
+    def decode_me_type(frame):
+        """
+        Decode the message type of an extended squitter.
+        """
+
+        if len(frame) == 14 and (frame[0] >> 3) == 17:
+            return {"me_type": BinInt(frame[4] >> 3)}
+
+        return {}
+
+
+# Fields LazyADSBFrame can decode without decoding the whole frame.
+LazyADSBFrame.stages = {
+    "frame_bytes": LazyADSBFrame.decode_header,
+    "frame_mode": LazyADSBFrame.decode_header,
+    "df": LazyADSBFrame.decode_header,
+    "ca": LazyADSBFrame.decode_header,
+    "aa": LazyADSBFrame.decode_header,
+    "icao": LazyADSBFrame.decode_header,
+    "crc_match": LazyADSBFrame.decode_crc,
+    "crc_hex": LazyADSBFrame.decode_crc,
+    "me_type": LazyADSBFrame.decode_me_type
+}
+
+
+# Message decoders by downlink format and type code.
+ExtendedSquitter.df_table = [(None, None)] * 32
+ExtendedSquitter.df_table[17] = ("extended squitter", MessageField)
+MessageField.tc_table = MessageField.compute_tc_table()
+
+# Metrics are off until a collector is swapped in.
+FrameRecord.metrics = NullMetrics()
+
+# Two character AIS strings for every 12 bit value.
+AisStr.pair_table = AisStr.compute_pair_table()
+
+# Keep recently decoded idents so repeats return the same string.
+AisStr.decode_ident = staticmethod(functools.lru_cache(maxsize=AisStr.cache_size)(
+    AisStr.decode_ident))
+
+# Altitudes for every 12 bit altitude code.
+BaroAlt.altitude_table = BaroAlt.compute_altitude_table()
+
+# Shared BinInt instances for small field values.
+BinInt.small_values = tuple(int.__new__(BinInt, value) for value in range(0, 256))
+
+# Compile field descriptors once at import time.
+AirbornePosition.field_descriptor = CompiledDescriptor({
+    "boundaries": [[1, 5], [6, 7], [8, 8], [9, 20], [21, 21], [22, 22], [23, 39], [40, 56]],
+    "labels": ["me_type", "surveillance_status", "single_antenna_flag", "altitude",
+                "time", "cpr-format", "lat-cpr", "lon-cpr"],
+    "types": [BinInt, AirbornePositionSurveillanceStatus, bool, int, bool, BinInt,
+                BinInt, BinInt]
+}, 56)
+
+AirborneVelocity.field_descriptor = CompiledDescriptor({
+    # Airspeed subtypes use sign_1, value_1, sign_2 and value_2 for heading status, heading,
+    # airspeed type and airspeed.
+    "boundaries": [[1, 5], [6, 8], [9, 9], [10, 10], [11, 13], [14, 14], [15, 24], [25, 25],
+                [26, 35], [36, 36], [37, 37], [38, 46], [49, 49], [50, 56]],
+    "labels": ["me_type", "sub_type", "intent_change", "ifr_capability",
+                "velociy_uncertainty_catgoery", "sign_1", "value_1", "sign_2", "value_2",
+                "source_bit", "vert_rate_sign", "vert_rate_raw", "gnss_baro_alt_diff_sign",
+                "gnss_baro_alt_diff"],
+    "types": [BinInt, BinInt, bool, BinInt, BinInt, int, int, int, int, int, int, int, int, int]
+}, 56)
+
+IdAndCategory.field_descriptor = CompiledDescriptor({
+    "boundaries": [[1, 5], [6, 8], [9, 56]],
+    "labels": ["me_type", "aircraft_category", "ident"],
+    "types": [BinInt, BinInt, AisStr]
+}, 56)
+
+MessageField.field_descriptor = CompiledDescriptor({
+    "boundaries": [[1, 5], [1, 56]],
+    "labels": ["me_type", "me_data"],
+    "types": [BinInt, int]
+}, 56)
+
+SurveillanceReply.field_descriptor = CompiledDescriptor({
+    "boundaries": [[6, 8], [9, 13], [14, 19], [20, 32]],
+    "labels": ["flight_status", "downlink_request", "utility_message", "code"],
+    "types": [BinInt, BinInt, BinInt, int]
+}, 32)
+
+ADSBFrame.short_frame_descriptor = CompiledDescriptor({
+    "boundaries": [[1, 5], [6, 8], [9, 32], [33, 56]],
+    "labels": ["df", "ca", "aa", "data"],
+    "types": [BinInt, BinInt, IcaoAA, int]
+}, 56)
+
+ADSBFrame.ext_frame_descriptor = CompiledDescriptor({
+    "boundaries": [[1, 5], [6, 8], [9, 32], [33, 88]],
+    "labels": ["df", "ca", "icao", "data"],
+    "types": [BinInt, BinInt, IcaoAA, int]
+}, 112)
@@ -0,0 +1,269 @@
+"""
+This file is part of Flextelem. Its purpose is to support decoding batches of ADS-B frames with
+NumPy using the same bit layouts as adsb.py.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .adsb import ADSBFrame
+from .adsb import AirbornePosition
+from .adsb import AirborneVelocity
+from .adsb import BaroAlt
+from .adsb import MessageField
+from .util import AdsbCrc
+
+
+class ADSBBatch(dict):
+    """
+    Columnar decode of a batch of same-length ADS-B frames.
+    """
+
+    def __new__(cls, frames, frame_bytes=None):
+        if np is None:
+            raise RuntimeError("NumPy is required for batch decoding.")
+
+        frames = cls.frame_array(frames, frame_bytes)
+
+        return cls.__decode(frames)
+
+
+    @staticmethod
+    def frame_array(frames, frame_bytes=None):
+        """
+        Get an (N, 7) or (N, 14) uint8 array view over a buffer or array of frames.
+        """
+
+        if not isinstance(frames, np.ndarray):
+            frames = np.frombuffer(frames, dtype=np.uint8)
+
+        if frames.dtype != np.uint8:
+            raise TypeError("Please provide frames as a uint8 array or a bytes-like buffer.")
+
+        # Flat buffers need to be cut into frames.
+        if frames.ndim == 1:
+            if frame_bytes is None:
+                frame_bytes = 14
+
+            if frames.size % frame_bytes != 0:
+                raise ValueError("Buffer length must be a multiple of the frame length.")
+
+            frames = frames.reshape(-1, frame_bytes)
+
+        if frames.ndim != 2 or frames.shape[1] not in [7, 14]:
+            raise ValueError("Frames must be 7 or 14 bytes in length.")
+
+        return frames
+
+
+    @staticmethod
+    def pack_bytes(frames, start, count):
+        """
+        Pack count big-endian bytes of each frame starting at start into a uint64 column.
+        """
+
+        packed = np.zeros(frames.shape[0], dtype=np.uint64)
+
+        for byte_index in range(start, start + count):
+            packed = (packed << np.uint64(8)) | frames[:, byte_index].astype(np.uint64)
+
+        return packed
+
+
+    @staticmethod
+    def unpack_columns(word, descriptor, labels, offset=0):
+        """
+        Extract labelled fields from a uint64 column using a compiled descriptor's layout. The
+        offset is the number of descriptor bits to the right of the packed word.
+        """
+
+        columns = {}
+
+        for label in labels:
+            shift, mask = descriptor.layout[label]
+            columns[label] = (word >> np.uint64(shift - offset)) & np.uint64(mask)
+
+        return columns
+
+
+    @staticmethod
+    def crc(frames):
+        """
+        Compute the CRC of the data portion of each frame as a uint32 column.
+        """
+
+        data_bytes = frames.shape[1] - 3
+        position_tables = ADSBBatch.crc_tables[data_bytes]
+
+        # One table lookup per byte position, XORed together across the row.
+        lookups = position_tables[np.arange(data_bytes), frames[:, :data_bytes]]
+
+        return np.bitwise_xor.reduce(lookups, axis=1)
+
+
+    @staticmethod
+    def crc_match(frames, frame_bytes=None):
+        """
+        Validate the CRC of a whole batch of frames, returning a boolean column.
+        """
+
+        frames = ADSBBatch.frame_array(frames, frame_bytes)
+
+        return ADSBBatch.crc(frames) == ADSBBatch.pack_bytes(frames, frames.shape[1] - 3, 3)
+
+
+    def __decode(frames):
+        """
+        Decode a (N, 7) or (N, 14) uint8 array of frames into a dictionary of columns.
+        """
+
+        frame_ct = frames.shape[0]
+        frame_bytes = frames.shape[1]
+
+        decoded = {
+            "frame_bytes": frame_bytes,
+            "frame_count": frame_ct
+        }
+
+        crc = ADSBBatch.crc(frames)
+
+        decoded.update({
+            "crc": crc,
+            "crc_match": crc == ADSBBatch.pack_bytes(frames, frame_bytes - 3, 3)
+        })
+
+        # Header fields live in the first four bytes of either frame length.
+        if frame_bytes == 7:
+            descriptor = ADSBFrame.short_frame_descriptor
+            header_labels = ["df", "ca", "aa"]
+        else:
+            descriptor = ADSBFrame.ext_frame_descriptor
+            header_labels = ["df", "ca", "icao"]
+
+        header = ADSBBatch.pack_bytes(frames, 0, 4)
+        header_offset = descriptor.len_bits - 32
+        header_columns = ADSBBatch.unpack_columns(header, descriptor, header_labels, header_offset)
+
+        decoded.update({
+            "df": header_columns['df'].astype(np.uint8),
+            "ca": header_columns['ca'].astype(np.uint8),
+            header_labels[2]: header_columns[header_labels[2]].astype(np.uint32)
+        })
+
+        if frame_bytes == 7:
+            return decoded
+
+        # The 56 bit message field fits in one uint64.
+        me = ADSBBatch.pack_bytes(frames, 4, 7)
+        extended = decoded['df'] == 17
+
+        me_type = ADSBBatch.unpack_columns(
+            me, MessageField.field_descriptor, ["me_type"])['me_type'].astype(np.uint8)
+        me_type[~extended] = 0
+
+        is_ident = (me_type >= 1) & (me_type <= 4)
+        is_baro = (me_type >= 9) & (me_type <= 18)
+        is_gnss = (me_type >= 20) & (me_type <= 22)
+        is_position = is_baro | is_gnss
+        is_velocity = me_type == 19
+
+        decoded.update({
+            "me": me,
+            "me_type": me_type,
+            "is_ident": is_ident,
+            "is_position": is_position,
+            "is_velocity": is_velocity
+        })
+
+        # Airborne position.
+        position = ADSBBatch.unpack_columns(me, AirbornePosition.field_descriptor,
+            ["surveillance_status", "altitude", "cpr-format", "lat-cpr", "lon-cpr"])
+
+        altitude_raw = position['altitude'].astype(np.int64)
+
+        # Barometric altitudes, Q bit and Gray coded, come from the altitude table.
+        altitude_baro = ADSBBatch.altitude_table[altitude_raw]
+        altitude_baro_valid = is_baro & ADSBBatch.altitude_valid[altitude_raw]
+
+        altitude = np.zeros(frame_ct, dtype=np.int32)
+        altitude[altitude_baro_valid] = altitude_baro[altitude_baro_valid]
+        altitude[is_gnss] = altitude_raw[is_gnss]
+
+        decoded.update({
+            "surveillance_status": np.where(is_position, position['surveillance_status'], 0
+                ).astype(np.uint8),
+            "altitude": altitude,
+            "altitude_valid": altitude_baro_valid | is_gnss,
+            "altitude_gnss": is_gnss,
+            "cpr_format": np.where(is_position, position['cpr-format'], 0).astype(np.uint8),
+            "lat_cpr": np.where(is_position, position['lat-cpr'], 0).astype(np.uint32),
+            "lon_cpr": np.where(is_position, position['lon-cpr'], 0).astype(np.uint32)
+        })
+
+        # Airborne velocity.
+        velocity = ADSBBatch.unpack_columns(me, AirborneVelocity.field_descriptor,
+            ["sub_type", "sign_1", "value_1", "sign_2", "value_2", "source_bit",
+            "vert_rate_sign", "vert_rate_raw"])
+
+        sub_type = np.where(is_velocity, velocity['sub_type'], 0).astype(np.uint8)
+        sign_1 = velocity['sign_1'] != 0
+        sign_2 = velocity['sign_2'] != 0
+        value_1 = velocity['value_1'].astype(np.int64)
+        value_2 = velocity['value_2'].astype(np.int64)
+
+        is_ground_speed = (sub_type == 1) | (sub_type == 2)
+        is_airspeed = (sub_type == 3) | (sub_type == 4)
+        units = np.where((sub_type == 2) | (sub_type == 4), 4, 1)
+
+        # Ground speed and track, the same way AirborneVelocity.speed_track works them out.
+        ground_speed_valid = is_ground_speed & (value_1 != 0) & (value_2 != 0)
+        ew = np.where(ground_speed_valid, value_1 - 1, 0)
+        ns = np.where(ground_speed_valid, value_2 - 1, 0)
+        west = sign_1 & (ew != 0)
+        south = sign_2 & (ns != 0)
+        velocity_ew = np.where(west, -ew, ew)
+        velocity_ns = np.where(south, -ns, ns)
+
+        ground_speed = np.hypot(velocity_ew, velocity_ns) * units
+        track = np.degrees(np.arctan2(velocity_ew, velocity_ns)) % 360
+        track[ground_speed == 0] = np.nan
+        ground_speed[~ground_speed_valid] = np.nan
+
+        # Airspeed and heading.
+        airspeed_valid = is_airspeed & (value_2 != 0)
+        heading_valid = is_airspeed & sign_1
+
+        # Vertical rate.
+        vert_rate_raw = velocity['vert_rate_raw'].astype(np.int32)
+        vert_rate_valid = is_velocity & (vert_rate_raw != 0)
+        vert_rate = (vert_rate_raw - 1) * np.where(velocity['vert_rate_sign'] != 0, -64, 64)
+
+        decoded.update({
+            "sub_type": sub_type,
+            "velocity_ew": (velocity_ew * units).astype(np.int32),
+            "velocity_ns": (velocity_ns * units).astype(np.int32),
+            "ground_speed": ground_speed,
+            "track": track,
+            "heading": np.where(heading_valid, value_1 * 0.3515625, np.nan),
+            "airspeed": np.where(airspeed_valid, (value_2 - 1) * units, 0).astype(np.int32),
+            "airspeed_valid": airspeed_valid,
+            "airspeed_tas": airspeed_valid & sign_2,
+            "vert_rate": np.where(vert_rate_valid, vert_rate, 0).astype(np.int32),
+            "vert_rate_valid": vert_rate_valid,
+            "vert_rate_baro": vert_rate_valid & (velocity['source_bit'] != 0)
+        })
+
+        return decoded
+
+
+# Share the CRC position tables and the altitude table as arrays.
+if np is not None:
+    ADSBBatch.crc_tables = {data_bytes: np.array(tables, dtype=np.uint32)
+        for data_bytes, tables in AdsbCrc.position_tables.items()}
+
+    ADSBBatch.altitude_table = np.array([altitude or 0 for altitude in BaroAlt.altitude_table],
+        dtype=np.int32)
+    ADSBBatch.altitude_valid = np.array([altitude is not None
+        for altitude in BaroAlt.altitude_table], dtype=bool)
@@ -0,0 +1,165 @@
+"""
+This file is part of Flextelem. Its purpose is to support skipping the decode of frames we've
+already decoded, such as copies of one frame heard by several receivers.
+"""
+
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+
+from .adsb import ADSBFrame
+from .adsb import AddressParity
+
+
+class DecodeCache:
+    """
+    Bounded LRU cache of decoded frames keyed by the frame's value as an int. Decoded frames are
+    read-only mappings shared by every copy of a frame, so copy one before changing it.
+
+    With an ICAO index, hits still confirm the address of clean DF11/17/18 frames, and address/
+    parity replies are checked against the index each time. Replies from addresses that aren't
+    confirmed yet aren't cached.
+
+    With a window, copies of a frame seen within window seconds of the first copy are collapsed
+    into it and decode to None.
+    """
+
+    # DFs whose clean frames confirm their address.
+    confirm_dfs = [11, 17, 18]
+
+    def __init__(self, size=65536, fix_bits=0, icao_index=None, window=None,
+        clock=time.monotonic):
+        self.size = size
+        self.fix_bits = fix_bits
+        self.icao_index = icao_index
+        self.window = window
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
+
+        # Key -> [decoded, address to confirm or check, first seen].
+        self.__entries = OrderedDict()
+
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+    @staticmethod
+    def frame_key(frame):
+        """
+        Cache key of a 7 or 14 byte frame. A bit above the frame keeps frames of each length
+        apart.
+        """
+
+        return int.from_bytes(frame, 'big') | (1 << (len(frame) * 8))
+
+
+    def decode(self, frame, now=None):
+        """
+        Decode a frame through the cache.
+
+        Returns a read-only decoded frame, or None if it can't be decoded or is a collapsed copy.
+        """
+
+        frame = ADSBFrame.check_frame(frame)
+        key = self.frame_key(frame)
+        entries = self.__entries
+        entry = entries.get(key)
+
+        if self.window is not None and now is None:
+            now = self.clock()
+
+        if entry is None:
+            self.misses += 1
+
+            return self.__add(key, frame, now)
+
+        self.hits += 1
+        entries.move_to_end(key)
+        decoded, address, first_seen = entry
+
+        # Collapsed copies still confirm their address, so it doesn't expire from the index.
+        if address is not None:
+            df = decoded['df']
+
+            if df in self.confirm_dfs:
+                self.icao_index.confirm(address)
+
+            # Addresses can expire from the index after we cached a reply.
+            elif not self.icao_index.check(address):
+                del entries[key]
+                return None
+
+        if self.window is not None:
+            if now - first_seen <= self.window:
+                self.duplicates += 1
+                return None
+
+            entry[2] = now
+
+        return decoded
+
+
+    def hit_rate(self):
+        """
+        Share of lookups that were hits.
+        """
+
+        lookups = self.hits + self.misses
+
+        if lookups == 0:
+            return 0.0
+
+        return self.hits / lookups
+
+
+    def clear(self):
+        """
+        Drop every cached frame and reset the counts.
+        """
+
+        self.__entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
+
+
+    def __add(self, key, frame, now):
+        """
+        Decode a frame we haven't got and cache it.
+        """
+
+        icao_index = self.icao_index
+        decoded = ADSBFrame(frame, self.fix_bits, icao_index)
+        address = None
+        df = frame[0] >> 3
+
+        if icao_index is not None:
+            if df in AddressParity.dfs:
+                # Whether it decodes depends on the index, so only replies that did are kept.
+                if decoded is None:
+                    return None
+
+                address = int(decoded['icao'], 16)
+
+            elif decoded is not None and decoded['crc_match'] is True and \
+                df in self.confirm_dfs:
+                # Corrected frames confirm the corrected address.
+                if 'crc_corrected_bits' in decoded:
+                    address = int(decoded['icao'], 16)
+                else:
+                    address = int.from_bytes(frame[1:4], 'big')
+
+        if decoded is not None:
+            decoded = MappingProxyType(decoded)
+
+        entries = self.__entries
+        entries[key] = [decoded, address, now]
+
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+
+        return decoded
@@ -0,0 +1,447 @@
+"""
+This file is part of Flextelem. Its purpose is to support recording raw Mode S frames to an
+append-only capture file and replaying them by time and ICAO address through a memory map.
+"""
+
+import array
+import bisect
+import math
+import mmap
+import os
+import struct
+import time
+
+from .adsb import ADSBFrame
+
+
+class CaptureFormat:
+    """
+    Capture file layout. A 32 byte header is followed by 32 byte records of a timestamp in
+    seconds since the epoch, receiver ID, signal level, frame length and up to 14 frame bytes.
+    Records are aligned so none straddle a page.
+    """
+
+    magic = b"FTLMCAP\x00"
+    version = 1
+
+    header_struct = struct.Struct("<8sHH20x")
+    record_struct = struct.Struct("<dHBB14s6x")
+
+    # Record fields ahead of the frame bytes.
+    record_head_struct = struct.Struct("<dHBB")
+
+    header_bytes = header_struct.size
+    record_bytes = record_struct.size
+    frame_offset = record_head_struct.size
+
+
+class CaptureIndex:
+    """
+    Sidecar indexes for a capture file. The time index maps time buckets to the range of records
+    in them, and the ICAO index maps addresses to their record numbers in ascending order. They're
+    saved next to the capture as .tidx and .iidx files in native byte order.
+    """
+
+    time_magic = b"FTLMTIX\x00"
+    icao_magic = b"FTLMIIX\x00"
+
+    time_header_struct = struct.Struct("<8sdQQ")
+    icao_header_struct = struct.Struct("<8sQQ")
+
+    def __init__(self, bucket_seconds=60):
+        self.bucket_seconds = bucket_seconds
+        self.record_ct = 0
+
+        # Bucket -> [first record, end record].
+        self.buckets = {}
+
+        # ICAO -> record numbers.
+        self.icaos = {}
+
+        self.__bucket_keys = None
+
+
+    def add(self, record, timestamp, icao):
+        """
+        Index a record.
+        """
+
+        bucket = math.floor(timestamp / self.bucket_seconds)
+        bucket_range = self.buckets.get(bucket)
+
+        if bucket_range is None:
+            self.buckets[bucket] = [record, record + 1]
+            self.__bucket_keys = None
+        else:
+            bucket_range[0] = min(bucket_range[0], record)
+            bucket_range[1] = max(bucket_range[1], record + 1)
+
+        records = self.icaos.get(icao)
+
+        if records is None:
+            records = array.array('I')
+            self.icaos[icao] = records
+
+        # Loaded indexes hold views, which need copying before they can grow.
+        elif type(records) is memoryview:
+            records = array.array('I', records)
+            self.icaos[icao] = records
+
+        records.append(record)
+
+        self.record_ct = max(self.record_ct, record + 1)
+
+
+    def time_range(self, start=None, end=None):
+        """
+        Range of record numbers that may hold records from start up to end.
+
+        Returns a (first record, end record) tuple.
+        """
+
+        if self.__bucket_keys is None:
+            self.__bucket_keys = sorted(self.buckets)
+
+        keys = self.__bucket_keys
+        first_key = 0
+        end_key = len(keys)
+
+        if start is not None:
+            first_key = bisect.bisect_left(keys, math.floor(start / self.bucket_seconds))
+
+        if end is not None:
+            end_key = bisect.bisect_right(keys, math.floor(end / self.bucket_seconds))
+
+        if first_key >= end_key:
+            return (0, 0)
+
+        ranges = [self.buckets[key] for key in keys[first_key:end_key]]
+
+        return (min(bucket_range[0] for bucket_range in ranges),
+            max(bucket_range[1] for bucket_range in ranges))
+
+
+    def icao_records(self, icao):
+        """
+        Record numbers for an ICAO address in ascending order.
+        """
+
+        return self.icaos.get(icao, ())
+
+
+    def save(self, path):
+        """
+        Write the sidecar indexes for the capture at path.
+        """
+
+        keys = sorted(self.buckets)
+        firsts = array.array('Q', [self.buckets[key][0] for key in keys])
+        ends = array.array('Q', [self.buckets[key][1] for key in keys])
+
+        with open(path + ".tidx", 'wb') as index_file:
+            index_file.write(self.time_header_struct.pack(self.time_magic, self.bucket_seconds,
+                self.record_ct, len(keys)))
+            array.array('q', keys).tofile(index_file)
+            firsts.tofile(index_file)
+            ends.tofile(index_file)
+
+        icaos = sorted(self.icaos)
+        offsets = array.array('Q', [0])
+        records = array.array('I')
+
+        for icao in icaos:
+            records.extend(self.icaos[icao])
+            offsets.append(len(records))
+
+        with open(path + ".iidx", 'wb') as index_file:
+            index_file.write(self.icao_header_struct.pack(self.icao_magic, self.record_ct,
+                len(icaos)))
+            array.array('I', icaos).tofile(index_file)
+            offsets.tofile(index_file)
+            records.tofile(index_file)
+
+
+    @staticmethod
+    def load(path):
+        """
+        Read the sidecar indexes for the capture at path.
+
+        Returns a CaptureIndex or None if they're missing, damaged or don't agree.
+        """
+
+        try:
+            with open(path + ".tidx", 'rb') as index_file:
+                header_struct = CaptureIndex.time_header_struct
+                magic, bucket_seconds, record_ct, bucket_ct = header_struct.unpack(
+                    index_file.read(header_struct.size))
+
+                if magic != CaptureIndex.time_magic:
+                    return None
+
+                keys = array.array('q')
+                firsts = array.array('Q')
+                ends = array.array('Q')
+
+                for column in [keys, firsts, ends]:
+                    column.fromfile(index_file, bucket_ct)
+
+            with open(path + ".iidx", 'rb') as index_file:
+                header_struct = CaptureIndex.icao_header_struct
+                magic, icao_record_ct, icao_ct = header_struct.unpack(
+                    index_file.read(header_struct.size))
+
+                if magic != CaptureIndex.icao_magic or icao_record_ct != record_ct:
+                    return None
+
+                icaos = array.array('I')
+                offsets = array.array('Q')
+                records = array.array('I')
+
+                icaos.fromfile(index_file, icao_ct)
+                offsets.fromfile(index_file, icao_ct + 1)
+                records.fromfile(index_file, offsets[-1])
+
+        except (OSError, EOFError, struct.error):
+            return None
+
+        index = CaptureIndex(bucket_seconds)
+        index.record_ct = record_ct
+        index.buckets = {key: [first, end] for key, first, end in zip(keys, firsts, ends)}
+
+        # Slices of the record numbers are views, not copies.
+        records = memoryview(records)
+        index.icaos = {icao: records[offsets[i]:offsets[i + 1]] for i, icao in enumerate(icaos)}
+
+        return index
+
+
+class CaptureWriter:
+    """
+    Appends frames to a capture file and keeps its sidecar indexes, which are written on flush and
+    close. Appending to an existing capture picks up its indexes, rebuilding them if needed, and
+    drops a partly written last record.
+    """
+
+    def __init__(self, path, bucket_seconds=60, clock=time.time):
+        self.path = path
+        self.clock = clock
+
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+
+        if new_file:
+            self.index = CaptureIndex(bucket_seconds)
+        else:
+            with CaptureReader(path) as reader:
+                self.index = reader.index
+                record_ct = reader.record_ct
+
+            # Drop a partly written last record so new records stay aligned.
+            os.truncate(path, CaptureFormat.header_bytes + (record_ct * CaptureFormat.record_bytes))
+
+        self.__file = open(path, 'ab')
+
+        if new_file:
+            self.__file.write(CaptureFormat.header_struct.pack(CaptureFormat.magic,
+                CaptureFormat.version, CaptureFormat.record_bytes))
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def write(self, frame, timestamp=None, signal=0, receiver=0):
+        """
+        Append a 7 or 14 byte frame. The timestamp defaults to now.
+        """
+
+        if len(frame) not in [7, 14]:
+            raise ValueError("Frames must be 7 or 14 bytes in length.")
+
+        if timestamp is None:
+            timestamp = self.clock()
+
+        index = self.index
+        record = index.record_ct
+
+        self.__file.write(CaptureFormat.record_struct.pack(timestamp, receiver, signal or 0,
+            len(frame), bytes(frame)))
+
+        index.add(record, timestamp, ADSBFrame.frame_address(frame))
+
+
+    def write_frames(self, frames, receiver=0):
+        """
+        Append frames yielded by a reader. Reader timestamps come from the receiver's clock, so
+        each frame is stamped w/ our clock instead.
+        """
+
+        for frame, timestamp, signal in frames:
+            self.write(frame, None, signal, receiver)
+
+
+    def flush(self):
+        """
+        Flush records to disk and write the indexes.
+        """
+
+        self.__file.flush()
+        self.index.save(self.path)
+
+
+    def close(self):
+        """
+        Flush and close the capture.
+        """
+
+        if self.__file.closed:
+            return
+
+        self.flush()
+        self.__file.close()
+
+
+class CaptureReader:
+    """
+    Memory-mapped capture file reader. Queries go through the sidecar indexes so only the pages
+    holding matching records are read, and frames come back as memoryviews into the map. Release
+    frames before closing the reader.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        self.__file = open(path, 'rb')
+        self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Index queries jump around the file.
+        if hasattr(self.__map, 'madvise'):
+            self.__map.madvise(mmap.MADV_RANDOM)
+
+        self.__view = memoryview(self.__map)
+
+        magic, version, record_bytes = CaptureFormat.header_struct.unpack_from(self.__map, 0)
+
+        if magic != CaptureFormat.magic or version != CaptureFormat.version or \
+            record_bytes != CaptureFormat.record_bytes:
+            self.close()
+            raise ValueError("Not a version %s capture file." %CaptureFormat.version)
+
+        # Ignore a partly written last record.
+        self.record_ct = (len(self.__map) - CaptureFormat.header_bytes) // record_bytes
+
+        self.index = CaptureIndex.load(path)
+
+        if self.index is None or self.index.record_ct != self.record_ct:
+            self.index = self.build_index()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def __len__(self):
+        return self.record_ct
+
+
+    def close(self):
+        """
+        Unmap and close the capture.
+        """
+
+        self.__view.release()
+        self.__map.close()
+        self.__file.close()
+
+
+    def record(self, record):
+        """
+        Record by number.
+
+        Returns a (frame, timestamp, signal, receiver) tuple where frame is a memoryview.
+        """
+
+        offset = CaptureFormat.header_bytes + (record * CaptureFormat.record_bytes)
+
+        timestamp, receiver, signal, frame_len = CaptureFormat.record_head_struct.unpack_from(
+            self.__map, offset)
+
+        offset += CaptureFormat.frame_offset
+
+        return (self.__view[offset:offset + frame_len], timestamp, signal, receiver)
+
+
+    def build_index(self, bucket_seconds=60):
+        """
+        Index the capture by reading every record.
+        """
+
+        index = CaptureIndex(bucket_seconds)
+
+        for record in range(0, self.record_ct):
+            frame, timestamp, signal, receiver = self.record(record)
+            index.add(record, timestamp, ADSBFrame.frame_address(frame))
+
+        return index
+
+
+    def select(self, start=None, end=None, icao=None):
+        """
+        Record numbers in capture order for records from start up to, but not including, end and
+        from an ICAO address. Times are seconds since the epoch and ICAO addresses are ints or hex
+        strings.
+        """
+
+        first, last = self.index.time_range(start, end)
+
+        if icao is None:
+            records = range(first, last)
+        else:
+            if type(icao) is str:
+                icao = int(icao, 16)
+
+            icao_records = self.index.icao_records(icao)
+            records = icao_records[bisect.bisect_left(icao_records, first):
+                bisect.bisect_left(icao_records, last)]
+
+        if start is None and end is None:
+            yield from records
+            return
+
+        header_bytes = CaptureFormat.header_bytes
+        record_bytes = CaptureFormat.record_bytes
+        unpack_from = CaptureFormat.record_head_struct.unpack_from
+        capture_map = self.__map
+
+        # Buckets are coarse, so check each record's own timestamp.
+        for record in records:
+            timestamp = unpack_from(capture_map, header_bytes + (record * record_bytes))[0]
+
+            if (start is None or timestamp >= start) and (end is None or timestamp < end):
+                yield record
+
+
+    def records(self, start=None, end=None, icao=None):
+        """
+        Yield (frame, timestamp, signal, receiver) tuples for records matching a query.
+        """
+
+        for record in self.select(start, end, icao):
+            yield self.record(record)
+
+
+    def frames(self, start=None, end=None, icao=None):
+        """
+        Yield (frame, timestamp, signal) tuples for records matching a query, like the stream
+        readers do, so they can go straight to FrameStream.decode w/ a timestamp_hz of 1.
+        """
+
+        for frame, timestamp, signal, receiver in self.records(start, end, icao):
+            yield (frame, timestamp, signal)
@@ -0,0 +1,427 @@
+"""
+This file is part of Flextelem. Its purpose is to support decoding the Mode S enhanced
+surveillance registers carried in Comm-B (DF20/21) replies.
+"""
+
+import time
+from collections import OrderedDict
+
+from .adsb import AisStr
+
+
+class CommB:
+    """
+    Comm-B BDS register decoders. Each takes the 56 bit MB field as an int and returns a
+    dictionary of fields, or None if the values don't make sense for that register. MB bits are
+    numbered 1 to 56 from the most significant bit.
+    """
+
+    # Characters a BDS 2,0 ident may hold.
+    ident_chars = set("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 ")
+
+    # Registers flagged in the BDS 1,7 capability bits, in bit order.
+    capability_registers = ["0,5", "0,6", "0,7", "0,8", "0,9", "0,A", "2,0", "2,1", "4,0", "4,1",
+        "4,2", "4,3", "4,4", "4,5", "4,8", "5,0", "5,1", "5,2", "5,3", "5,4", "5,5", "5,6", "5,F",
+        "6,0"]
+
+    @staticmethod
+    def mask(first, last):
+        """
+        Mask of MB bits first to last.
+        """
+
+        return ((1 << (last - first + 1)) - 1) << (56 - last)
+
+
+    @staticmethod
+    def field(mb, first, last):
+        """
+        Value of MB bits first to last.
+        """
+
+        return (mb >> (56 - last)) & ((1 << (last - first + 1)) - 1)
+
+
+    @staticmethod
+    def signed_field(mb, first, last):
+        """
+        Value of MB bits first to last, where the first bit is the sign of a two's complement
+        value.
+        """
+
+        bits = last - first + 1
+        value = (mb >> (56 - last)) & ((1 << bits) - 1)
+
+        if value >> (bits - 1):
+            value -= 1 << bits
+
+        return value
+
+
+    def decode_10(mb):
+        """
+        BDS 1,0 data link capability report.
+        """
+
+        version = CommB.field(mb, 17, 23)
+
+        if version > 5:
+            return None
+
+        return {
+            'continuation_flag': CommB.field(mb, 9, 9),
+            'overlay_command_capability': CommB.field(mb, 15, 15),
+            'mode_s_subnetwork_version': version
+        }
+
+
+    def decode_17(mb):
+        """
+        BDS 1,7 common usage GICB capability report.
+        """
+
+        registers = [register for bit, register in enumerate(CommB.capability_registers, 1)
+            if CommB.field(mb, bit, bit)]
+
+        return {'supported_registers': registers}
+
+
+    def decode_20(mb):
+        """
+        BDS 2,0 aircraft identification.
+        """
+
+        ident = AisStr(CommB.field(mb, 9, 56))
+
+        if not set(ident) <= CommB.ident_chars or ident.strip() == "":
+            return None
+
+        return {'ident': ident}
+
+
+    def decode_30(mb):
+        """
+        BDS 3,0 ACAS active resolution advisory.
+        """
+
+        # Threat type 3 is reserved.
+        if CommB.field(mb, 29, 30) == 3:
+            return None
+
+        return {
+            'active_resolution_advisories': CommB.field(mb, 9, 22),
+            'resolution_advisory_complements': CommB.field(mb, 23, 26),
+            'resolution_advisory_terminated': CommB.field(mb, 27, 27),
+            'multiple_threat_encounter': CommB.field(mb, 28, 28),
+            'threat_type': CommB.field(mb, 29, 30)
+        }
+
+
+    def decode_40(mb):
+        """
+        BDS 4,0 selected vertical intention.
+        """
+
+        decoded = {}
+
+        if mb & CommB.bit_1:
+            decoded['selected_altitude_mcp'] = CommB.field(mb, 2, 13) * 16
+
+        if CommB.field(mb, 14, 14):
+            decoded['selected_altitude_fms'] = CommB.field(mb, 15, 26) * 16
+
+        if CommB.field(mb, 27, 27):
+            decoded['baro_setting'] = round((CommB.field(mb, 28, 39) * 0.1) + 800, 1)
+
+        for label in ['selected_altitude_mcp', 'selected_altitude_fms']:
+            if decoded.get(label, 0) > 50000:
+                return None
+
+        if CommB.field(mb, 48, 48):
+            decoded.update({
+                'vnav_mode': CommB.field(mb, 49, 49),
+                'alt_hold_mode': CommB.field(mb, 50, 50),
+                'approach_mode': CommB.field(mb, 51, 51)
+            })
+
+        if CommB.field(mb, 54, 54):
+            decoded['target_altitude_source'] = CommB.field(mb, 55, 56)
+
+        return decoded
+
+
+    def decode_50(mb):
+        """
+        BDS 5,0 track and turn report.
+        """
+
+        decoded = {}
+
+        if mb & CommB.bit_1:
+            decoded['roll'] = round(CommB.signed_field(mb, 2, 11) * 45 / 256, 2)
+
+            if abs(decoded['roll']) > 50:
+                return None
+
+        if CommB.field(mb, 12, 12):
+            decoded['track'] = round((CommB.signed_field(mb, 13, 23) * 90 / 512) % 360, 2)
+
+        if CommB.field(mb, 24, 24):
+            decoded['ground_speed'] = CommB.field(mb, 25, 34) * 2
+
+            if decoded['ground_speed'] > 600:
+                return None
+
+        if CommB.field(mb, 35, 35):
+            decoded['track_rate'] = round(CommB.signed_field(mb, 36, 45) * 8 / 256, 3)
+
+        if CommB.field(mb, 46, 46):
+            decoded['true_airspeed'] = CommB.field(mb, 47, 56) * 2
+
+            if decoded['true_airspeed'] > 500:
+                return None
+
+        # Ground speed is true airspeed plus or minus the wind.
+        if 'ground_speed' in decoded and 'true_airspeed' in decoded and \
+            abs(decoded['ground_speed'] - decoded['true_airspeed']) > 200:
+            return None
+
+        return decoded
+
+
+    def decode_60(mb):
+        """
+        BDS 6,0 heading and speed report.
+        """
+
+        decoded = {}
+
+        if mb & CommB.bit_1:
+            decoded['heading'] = round((CommB.signed_field(mb, 2, 12) * 90 / 512) % 360, 2)
+
+        if CommB.field(mb, 13, 13):
+            decoded['indicated_airspeed'] = CommB.field(mb, 14, 23)
+
+            if decoded['indicated_airspeed'] > 500:
+                return None
+
+        if CommB.field(mb, 24, 24):
+            decoded['mach'] = round(CommB.field(mb, 25, 34) * 2.048 / 512, 3)
+
+            if decoded['mach'] > 1:
+                return None
+
+        for label, first in [('vert_rate_baro', 36), ('vert_rate_inertial', 47)]:
+            if CommB.field(mb, first - 1, first - 1):
+                decoded[label] = CommB.signed_field(mb, first, first + 9) * 32
+
+                if abs(decoded[label]) > 6000:
+                    return None
+
+        return decoded
+
+
+class BdsInference:
+    """
+    Infers which BDS register a Comm-B reply carries. Cheap mask checks on identifier, reserved
+    and status bits prune the candidate registers before any decoding. Registers that recently
+    decoded for an aircraft are tried first, and one is taken w/o decoding the other candidates if
+    it's the only one of them that decodes. Otherwise every candidate is decoded, and a register
+    is only taken if it's the only one that decodes. Aircraft profiles expire after a TTL.
+    """
+
+    def __init__(self, ttl=300, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+
+        self.profile_hits = 0
+        self.inferred = 0
+        self.ambiguous = 0
+        self.unknown = 0
+        self.decodes = 0
+
+        # ICAO -> {register: last decoded}, oldest aircraft first.
+        self.__profiles = OrderedDict()
+
+
+    def __len__(self):
+        return len(self.__profiles)
+
+
+    def profile(self, icao):
+        """
+        Registers recently decoded for an aircraft, most recent first.
+        """
+
+        profile = self.__profiles.get(icao, {})
+
+        return sorted(profile, key=profile.get, reverse=True)
+
+
+    @staticmethod
+    def candidates(mb):
+        """
+        Registers whose identifier, reserved and status bits allow an MB field.
+        """
+
+        if mb == 0:
+            return []
+
+        candidates = []
+
+        for register, id_mask, id_value, zero_mask, status_pairs, decoder in \
+            BdsInference.registers:
+            if mb & id_mask != id_value or mb & zero_mask:
+                continue
+
+            # Fields w/o their status bit must be all zeros.
+            for status_mask, value_mask in status_pairs:
+                if not mb & status_mask and mb & value_mask:
+                    break
+            else:
+                candidates.append(register)
+
+        return candidates
+
+
+    def decode(self, icao, mb, now=None):
+        """
+        Decode an MB field from an aircraft.
+
+        Returns a dictionary w/ the register in 'bds' and its fields, 'bds_candidates' when more
+        than one register decodes, or an empty dictionary. Recent registers in the aircraft's
+        profile are decoded first; the other candidates are only decoded when none or several of
+        them decode.
+        """
+
+        candidates = self.candidates(mb)
+
+        if not candidates:
+            self.unknown += 1
+            return {}
+
+        if now is None:
+            now = self.clock()
+
+        decoders = BdsInference.decoders
+        profile = self.__profiles.get(icao)
+        found = []
+        tried = []
+
+        # Registers this aircraft sent recently save decoding the rest.
+        if profile is not None:
+            tried = [register for register in candidates
+                if register in profile and now - profile[register] <= self.ttl]
+
+            for register in tried:
+                self.decodes += 1
+                decoded = decoders[register](mb)
+
+                if decoded is not None:
+                    found.append((register, decoded))
+
+            if len(found) == 1:
+                self.profile_hits += 1
+
+                return self.__found(icao, found[0][0], found[0][1], now)
+
+        for register in candidates:
+            if register in tried:
+                continue
+
+            self.decodes += 1
+            decoded = decoders[register](mb)
+
+            if decoded is not None:
+                found.append((register, decoded))
+
+        if len(found) == 1:
+            self.inferred += 1
+
+            return self.__found(icao, found[0][0], found[0][1], now)
+
+        if not found:
+            self.unknown += 1
+            return {}
+
+        self.ambiguous += 1
+        found = {register for register, decoded in found}
+
+        return {'bds_candidates': [register for register in candidates if register in found]}
+
+
+    def expire(self, now=None):
+        """
+        Drop aircraft that haven't had a register decode within the TTL.
+        """
+
+        if now is None:
+            now = self.clock()
+
+        profiles = self.__profiles
+
+        while profiles:
+            icao, profile = next(iter(profiles.items()))
+
+            if now - max(profile.values()) <= self.ttl:
+                break
+
+            profiles.popitem(last=False)
+
+
+    def __found(self, icao, register, decoded, now):
+        """
+        Note a register decoded for an aircraft.
+        """
+
+        profiles = self.__profiles
+        profile = profiles.get(icao)
+
+        if profile is None:
+            profile = {}
+            profiles[icao] = profile
+        else:
+            profiles.move_to_end(icao)
+
+        profile[register] = now
+        self.expire(now)
+
+        decoded['bds'] = register
+
+        return decoded
+
+
+# MB bit 1, the status bit of the first field of several registers.
+CommB.bit_1 = CommB.mask(1, 1)
+
+# Register, identifier mask and value, mask of reserved bits and (status bit, field) masks.
+BdsInference.registers = [
+    ("1,0", CommB.mask(1, 8), 0x10 << 48, CommB.mask(10, 14), [], CommB.decode_10),
+    ("1,7", CommB.mask(7, 7), CommB.mask(7, 7), CommB.mask(25, 56), [], CommB.decode_17),
+    ("2,0", CommB.mask(1, 8), 0x20 << 48, 0, [], CommB.decode_20),
+    ("3,0", CommB.mask(1, 8), 0x30 << 48, 0, [], CommB.decode_30),
+    ("4,0", 0, 0, CommB.mask(40, 47) | CommB.mask(52, 53), [
+        (CommB.mask(1, 1), CommB.mask(2, 13)),
+        (CommB.mask(14, 14), CommB.mask(15, 26)),
+        (CommB.mask(27, 27), CommB.mask(28, 39)),
+        (CommB.mask(48, 48), CommB.mask(49, 51)),
+        (CommB.mask(54, 54), CommB.mask(55, 56))
+    ], CommB.decode_40),
+    ("5,0", 0, 0, 0, [
+        (CommB.mask(1, 1), CommB.mask(2, 11)),
+        (CommB.mask(12, 12), CommB.mask(13, 23)),
+        (CommB.mask(24, 24), CommB.mask(25, 34)),
+        (CommB.mask(35, 35), CommB.mask(36, 45)),
+        (CommB.mask(46, 46), CommB.mask(47, 56))
+    ], CommB.decode_50),
+    ("6,0", 0, 0, 0, [
+        (CommB.mask(1, 1), CommB.mask(2, 12)),
+        (CommB.mask(13, 13), CommB.mask(14, 23)),
+        (CommB.mask(24, 24), CommB.mask(25, 34)),
+        (CommB.mask(35, 35), CommB.mask(36, 45)),
+        (CommB.mask(46, 46), CommB.mask(47, 56))
+    ], CommB.decode_60)
+]
+
+BdsInference.decoders = {register: decoder for register, id_mask, id_value, zero_mask,
+    status_pairs, decoder in BdsInference.registers}
@@ -0,0 +1,241 @@
+"""
+This file is part of Flextelem. Its purpose is to support decoding airborne CPR positions.
+https://mode-s.org/decode/content/ads-b/3-airborne-position.html
+"""
+
+import bisect
+import math
+import time
+from collections import OrderedDict
+
+
+class Cpr:
+    """
+    Compact Position Reporting functions
+    """
+
+    # Number of latitude zones between the equator and a pole.
+    nz = 15
+
+    # 17 bit CPR lat/lon.
+    cpr_max = 131072
+
+    def compute_nl_table():
+        """
+        Create the table of latitudes where the number of longitude zones drops by one.
+
+        Returns the transition latitudes in ascending order.
+        """
+
+        nl_table = []
+        a = 1 - math.cos(math.pi / (2 * Cpr.nz))
+
+        # NL drops from nl to nl - 1 at this latitude.
+        for nl in range(59, 1, -1):
+            cos_lat = math.sqrt(a / (1 - math.cos(2 * math.pi / nl)))
+            nl_table.append(math.degrees(math.acos(cos_lat)))
+
+        return nl_table
+
+
+    @staticmethod
+    def nl(lat):
+        """
+        Number of longitude zones at a latitude.
+        """
+
+        return 59 - bisect.bisect_right(Cpr.nl_table, abs(lat))
+
+
+    @staticmethod
+    def global_position(even, odd, odd_newest):
+        """
+        Globally unambiguous position from a pair of (lat_cpr, lon_cpr) tuples. The position is
+        computed for whichever of the pair is the newest.
+
+        Returns a (lat, lon) tuple or None if the pair straddles a longitude zone boundary.
+        """
+
+        cpr_max = Cpr.cpr_max
+
+        lat_even = even[0] / cpr_max
+        lon_even = even[1] / cpr_max
+        lat_odd = odd[0] / cpr_max
+        lon_odd = odd[1] / cpr_max
+
+        # Latitude zone index.
+        j = math.floor((59 * lat_even) - (60 * lat_odd) + 0.5)
+
+        lat_e = (360 / 60) * ((j % 60) + lat_even)
+        lat_o = (360 / 59) * ((j % 59) + lat_odd)
+
+        # Southern hemisphere.
+        if lat_e >= 270:
+            lat_e -= 360
+        if lat_o >= 270:
+            lat_o -= 360
+
+        nl = Cpr.nl(lat_e)
+
+        if nl != Cpr.nl(lat_o):
+            return None
+
+        # Longitude zone index.
+        m = math.floor((lon_even * (nl - 1)) - (lon_odd * nl) + 0.5)
+
+        if odd_newest:
+            lat = lat_o
+            ni = max(nl - 1, 1)
+            lon = (360 / ni) * ((m % ni) + lon_odd)
+        else:
+            lat = lat_e
+            ni = max(nl, 1)
+            lon = (360 / ni) * ((m % ni) + lon_even)
+
+        if lon >= 180:
+            lon -= 360
+
+        return (lat, lon)
+
+
+    @staticmethod
+    def local_position(cpr_format, lat_cpr, lon_cpr, lat_ref, lon_ref):
+        """
+        Position from a single CPR frame relative to a reference position within 180 NM.
+
+        Returns a (lat, lon) tuple w/ the longitude in [-180, 180).
+        """
+
+        cpr_max = Cpr.cpr_max
+
+        lat_cpr = lat_cpr / cpr_max
+        lon_cpr = lon_cpr / cpr_max
+
+        d_lat = 360 / (60 - cpr_format)
+        j = math.floor(lat_ref / d_lat) + math.floor(((lat_ref % d_lat) / d_lat) - lat_cpr + 0.5)
+        lat = d_lat * (j + lat_cpr)
+
+        d_lon = 360 / max(Cpr.nl(lat) - cpr_format, 1)
+        m = math.floor(lon_ref / d_lon) + math.floor(((lon_ref % d_lon) / d_lon) - lon_cpr + 0.5)
+        lon = d_lon * (m + lon_cpr)
+
+        # References near the antimeridian can put the position a zone past it.
+        if lon >= 180 or lon < -180:
+            lon = ((lon + 180) % 360) - 180
+
+        return (lat, lon)
+
+
+class CprPositions:
+    """
+    Per-aircraft CPR position engine. Keeps the latest even and odd frames per ICAO address in a
+    bounded cache, decoding globally from a fresh pair and locally from the last position after.
+    """
+
+    def __init__(self, max_aircraft=4096, pair_ttl=10, position_ttl=60, clock=time.monotonic):
+        self.max_aircraft = max_aircraft
+        self.pair_ttl = pair_ttl
+        self.position_ttl = position_ttl
+        self.clock = clock
+
+        # ICAO -> [even, odd, position] where each is a tuple ending with its time, or None.
+        # Ordered by last update, oldest first.
+        self.__aircraft = OrderedDict()
+
+
+    def __len__(self):
+        return len(self.__aircraft)
+
+
+    def update(self, icao, cpr_format, lat_cpr, lon_cpr, now=None):
+        """
+        Add a CPR frame for an aircraft.
+
+        Returns a (lat, lon) tuple or None if we can't place the aircraft yet.
+        """
+
+        if now is None:
+            now = self.clock()
+
+        aircraft = self.__aircraft.get(icao)
+
+        if aircraft is None:
+            aircraft = [None, None, None]
+            self.__aircraft[icao] = aircraft
+        else:
+            self.__aircraft.move_to_end(icao)
+
+        aircraft[cpr_format] = (lat_cpr, lon_cpr, now)
+        last_position = aircraft[2]
+        position = None
+
+        # Cheap local decode against a recent position.
+        if last_position is not None and now - last_position[2] <= self.position_ttl:
+            position = Cpr.local_position(cpr_format, lat_cpr, lon_cpr,
+                last_position[0], last_position[1])
+
+        # Global decode from a fresh even/odd pair.
+        else:
+            even = aircraft[0]
+            odd = aircraft[1]
+
+            if even is not None and odd is not None and abs(even[2] - odd[2]) <= self.pair_ttl:
+                position = Cpr.global_position(even, odd, cpr_format == 1)
+
+        if position is not None:
+            aircraft[2] = (position[0], position[1], now)
+
+        self.expire(now)
+
+        return position
+
+
+    def update_frame(self, frame, now=None):
+        """
+        Add a decoded airborne position frame.
+
+        Returns a (lat, lon) tuple or None.
+        """
+
+        return self.update(int(frame['icao'], 16), frame['cpr-format'], frame['lat-cpr'],
+            frame['lon-cpr'], now)
+
+
+    def position(self, icao):
+        """
+        Last known (lat, lon, time) for an aircraft or None.
+        """
+
+        aircraft = self.__aircraft.get(icao)
+
+        if aircraft is None:
+            return None
+
+        return aircraft[2]
+
+
+    def expire(self, now=None):
+        """
+        Drop aircraft we haven't heard from within the position TTL, and the least recently
+        updated aircraft past the cache size.
+        """
+
+        if now is None:
+            now = self.clock()
+
+        aircraft = self.__aircraft
+        ttl = max(self.pair_ttl, self.position_ttl)
+
+        while aircraft:
+            icao, oldest = next(iter(aircraft.items()))
+
+            last_seen = max(entry[2] for entry in oldest if entry is not None)
+
+            if now - last_seen <= ttl and len(aircraft) <= self.max_aircraft:
+                break
+
+            aircraft.popitem(last=False)
+
+
+# Compute the NL table once at import time.
+Cpr.nl_table = Cpr.compute_nl_table()
@@ -0,0 +1,424 @@
+"""
+This file is part of Flextelem. Its purpose is to support storing and reading back the track
+history of aircraft for plotting past flights.
+"""
+
+import array
+import math
+import mmap
+import os
+import struct
+import time
+
+
+class TrackChunk:
+    """
+    Compact encoding of a run of track points for one aircraft. Each column is scaled to an int
+    and stored as zigzag varint deltas. Optional columns lead w/ a bitmap of the points that have
+    a value and only store deltas between those values.
+    """
+
+    header_struct = struct.Struct("<II")
+
+    # Label, scale and whether values may be missing.
+    columns = [
+        ("time", 1000, False),
+        ("lat", 100000, False),
+        ("lon", 100000, False),
+        ("altitude", 1, True),
+        ("ground_speed", 10, True),
+        ("track", 10, True)
+    ]
+
+    @staticmethod
+    def encode(icao, points):
+        """
+        Encode a list of point tuples in column order, returning bytes.
+        """
+
+        point_ct = len(points)
+        chunk = bytearray(TrackChunk.header_struct.pack(icao, point_ct))
+
+        for column, (label, scale, optional) in enumerate(TrackChunk.columns):
+            values = [point[column] for point in points]
+
+            if optional:
+                bitmap = bytearray((point_ct + 7) // 8)
+
+                for i, value in enumerate(values):
+                    if value is not None:
+                        bitmap[i >> 3] |= 1 << (i & 0x7)
+
+                chunk += bitmap
+                values = [value for value in values if value is not None]
+
+            TrackChunk.pack_deltas([round(value * scale) for value in values], chunk)
+
+        return bytes(chunk)
+
+
+    @staticmethod
+    def decode(chunk):
+        """
+        Decode a chunk.
+
+        Returns the ICAO address and a dictionary of array('d') columns w/ NaN for missing values.
+        """
+
+        icao, point_ct = TrackChunk.header_struct.unpack_from(chunk, 0)
+        cursor = TrackChunk.header_struct.size
+        decoded = {}
+
+        for label, scale, optional in TrackChunk.columns:
+            if optional:
+                bitmap = chunk[cursor:cursor + ((point_ct + 7) // 8)]
+                cursor += len(bitmap)
+                present = [(bitmap[i >> 3] >> (i & 0x7)) & 0x1 for i in range(0, point_ct)]
+                value_ct = sum(present)
+            else:
+                present = None
+                value_ct = point_ct
+
+            values, cursor = TrackChunk.unpack_deltas(chunk, cursor, value_ct)
+            column = array.array('d', [value / scale for value in values])
+
+            if present is not None and value_ct < point_ct:
+                values = iter(column)
+                column = array.array('d', [next(values) if flag else math.nan
+                    for flag in present])
+
+            decoded[label] = column
+
+        return (icao, decoded)
+
+
+    @staticmethod
+    def pack_deltas(values, out):
+        """
+        Append ints to a bytearray as zigzag varint deltas.
+        """
+
+        previous = 0
+
+        for value in values:
+            delta = value - previous
+            previous = value
+
+            # Zigzag keeps small negative deltas small.
+            delta = (delta << 1) if delta >= 0 else ((-delta << 1) - 1)
+
+            while delta > 0x7f:
+                out.append((delta & 0x7f) | 0x80)
+                delta >>= 7
+
+            out.append(delta)
+
+
+    @staticmethod
+    def unpack_deltas(data, cursor, value_ct):
+        """
+        Read value_ct zigzag varint deltas starting at cursor.
+
+        Returns a list of ints and the cursor after them.
+        """
+
+        values = []
+        previous = 0
+
+        for i in range(0, value_ct):
+            delta = 0
+            shift = 0
+
+            while True:
+                byte = data[cursor]
+                cursor += 1
+                delta |= (byte & 0x7f) << shift
+                shift += 7
+
+                if byte < 0x80:
+                    break
+
+            if delta & 0x1:
+                delta = -((delta + 1) >> 1)
+            else:
+                delta >>= 1
+
+            previous += delta
+            values.append(previous)
+
+        return (values, cursor)
+
+
+class TrackStore:
+    """
+    On-disk track history. Points are buffered per aircraft and written as chunks to one data file
+    per UTC day. Each day has an index of its chunks sorted by ICAO address, so reading one
+    aircraft's history only reads that aircraft's chunks.
+    """
+
+    # ICAO, chunk offset, chunk length, first and last point time.
+    index_struct = struct.Struct("<IQIdd")
+
+    day_seconds = 86400
+
+    def __init__(self, path, chunk_points=256, clock=time.time):
+        self.path = path
+        self.chunk_points = chunk_points
+        self.clock = clock
+
+        os.makedirs(path, exist_ok=True)
+
+        # (day, ICAO) -> buffered points.
+        self.__buffers = {}
+
+        # Day -> [data file, index entries, whether the index changed since it was written].
+        self.__days = {}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def day_path(self, day):
+        """
+        Path of a day's files w/o the extension.
+        """
+
+        return os.path.join(self.path, time.strftime("%Y-%m-%d",
+            time.gmtime(day * self.day_seconds)))
+
+
+    def append(self, icao, timestamp, lat, lon, altitude=None, ground_speed=None, track=None):
+        """
+        Add a point to an aircraft's history. The timestamp is in seconds since the epoch and
+        defaults to now, and the altitude is barometric in feet.
+        """
+
+        if timestamp is None:
+            timestamp = self.clock()
+
+        day = math.floor(timestamp / self.day_seconds)
+        key = (day, icao)
+        points = self.__buffers.get(key)
+
+        if points is None:
+            points = []
+            self.__buffers[key] = points
+
+        points.append((timestamp, lat, lon, altitude, ground_speed, track))
+
+        if len(points) >= self.chunk_points:
+            self.__write_chunk(day, icao, points)
+            del self.__buffers[key]
+
+
+    def append_state(self, state, timestamp=None):
+        """
+        Add the current position of a tracker AircraftState.
+        """
+
+        if state.lat is None:
+            return
+
+        self.append(state.icao, timestamp, state.lat, state.lon, state.altitude,
+            state.ground_speed, state.track)
+
+
+    def flush(self):
+        """
+        Write every buffered point and the indexes of days that changed. Only the latest day
+        written to stays open, so past days' files are closed.
+        """
+
+        for (day, icao), points in self.__buffers.items():
+            self.__write_chunk(day, icao, points)
+
+        self.__buffers = {}
+
+        for day, day_files in self.__days.items():
+            data_file, entries, changed = day_files
+
+            if not changed:
+                continue
+
+            data_file.flush()
+
+            entries.sort()
+            index_path = self.day_path(day) + ".idx"
+
+            with open(index_path + ".tmp", 'wb') as index_file:
+                index_file.write(b"".join([self.index_struct.pack(*entry) for entry in entries]))
+
+            os.replace(index_path + ".tmp", index_path)
+            day_files[2] = False
+
+        # Days we write to again are reopened w/ their index.
+        if self.__days:
+            latest = max(self.__days)
+
+            for day in [day for day in self.__days if day < latest]:
+                self.__days.pop(day)[0].close()
+
+
+    def close(self):
+        """
+        Flush and close every day's files.
+        """
+
+        self.flush()
+
+        for data_file, entries, changed in self.__days.values():
+            data_file.close()
+
+        self.__days = {}
+
+
+    def track(self, icao, start=None, end=None):
+        """
+        History of an aircraft from start up to end, in seconds since the epoch, including points
+        still buffered. Defaults to the last 24 hours.
+
+        Returns a dictionary of array('d') columns in time order w/ NaN for missing values.
+        """
+
+        if type(icao) is str:
+            icao = int(icao, 16)
+
+        if end is None:
+            end = self.clock()
+
+        if start is None:
+            start = end - self.day_seconds
+
+        columns = {label: array.array('d') for label, scale, optional in TrackChunk.columns}
+        chunks = []
+
+        for day in range(math.floor(start / self.day_seconds),
+            math.floor(end / self.day_seconds) + 1):
+            for chunk in self.__read_chunks(day, icao, start, end):
+                chunks.append(TrackChunk.decode(chunk)[1])
+
+            points = self.__buffers.get((day, icao))
+
+            if points:
+                chunks.append(TrackChunk.decode(TrackChunk.encode(icao, points))[1])
+
+        # Chunks are in time order within an aircraft, but points from each may fall outside.
+        chunks.sort(key=lambda chunk: chunk['time'][0])
+
+        for chunk in chunks:
+            times = chunk['time']
+
+            for i in range(0, len(times)):
+                if times[i] >= start and times[i] < end:
+                    for label in columns:
+                        columns[label].append(chunk[label][i])
+
+        return columns
+
+
+    def __read_chunks(self, day, icao, start, end):
+        """
+        Read an aircraft's chunks for a day that overlap start up to end.
+        """
+
+        day_path = self.day_path(day)
+        day_files = self.__days.get(day)
+
+        # Days we're writing to have their index in memory.
+        if day_files is not None:
+            day_files[0].flush()
+            entries = [entry for entry in day_files[1] if entry[0] == icao]
+        else:
+            entries = self.__read_index(day_path, icao)
+
+        entries = sorted(entry for entry in entries if entry[3] < end and entry[4] >= start)
+
+        if not entries:
+            return
+
+        with open(day_path + ".trk", 'rb') as data_file:
+            for entry_icao, offset, length, first_time, last_time in entries:
+                data_file.seek(offset)
+                yield data_file.read(length)
+
+
+    def __read_index(self, day_path, icao):
+        """
+        Index entries for an aircraft from a day's index file.
+        """
+
+        entries = []
+
+        try:
+            index_file = open(day_path + ".idx", 'rb')
+        except FileNotFoundError:
+            return entries
+
+        with index_file:
+            if os.fstat(index_file.fileno()).st_size == 0:
+                return entries
+
+            index = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            entry_bytes = self.index_struct.size
+            unpack_from = self.index_struct.unpack_from
+
+            # Binary search for the aircraft's first entry.
+            low = 0
+            high = len(index) // entry_bytes
+
+            while low < high:
+                middle = (low + high) // 2
+
+                if unpack_from(index, middle * entry_bytes)[0] < icao:
+                    low = middle + 1
+                else:
+                    high = middle
+
+            for cursor in range(low * entry_bytes, len(index), entry_bytes):
+                entry = unpack_from(index, cursor)
+
+                if entry[0] != icao:
+                    break
+
+                entries.append(entry)
+
+            index.close()
+
+        return entries
+
+
+    def __write_chunk(self, day, icao, points):
+        """
+        Append a chunk of points to a day's data file and index.
+        """
+
+        day_files = self.__days.get(day)
+
+        if day_files is None:
+            day_path = self.day_path(day)
+            entries = []
+
+            # Pick up the index of a day we've written before.
+            try:
+                with open(day_path + ".idx", 'rb') as index_file:
+                    entries = [entry for entry in self.index_struct.iter_unpack(index_file.read())]
+            except FileNotFoundError:
+                pass
+
+            day_files = [open(day_path + ".trk", 'ab'), entries, False]
+            self.__days[day] = day_files
+
+        data_file, entries, changed = day_files
+        chunk = TrackChunk.encode(icao, points)
+
+        offset = data_file.tell()
+        data_file.write(chunk)
+
+        times = [point[0] for point in points]
+        entries.append((icao, offset, len(chunk), min(times), max(times)))
+        day_files[2] = True
@@ -0,0 +1,334 @@
+"""
+This file is part of Flextelem. Its purpose is to support counting decoded frames and timing the
+decoder stages, exported in the Prometheus text format.
+"""
+
+import bisect
+import cProfile
+import http.server
+import io
+import os
+import pstats
+import threading
+import time
+
+from .adsb import Crc
+from .adsb import FrameRecord
+from .adsb import MessageField
+from .util import CompiledDescriptor
+from .util import NullMetrics
+
+
+class Metrics(NullMetrics):
+    """
+    Registry of decoder counters and stage latency histograms. Enabling it swaps it in for the
+    no-op collector and wraps each decoder stage w/ a timer. Disabling it puts everything back, so
+    decoders run unwrapped while metrics are off.
+    """
+
+    enabled = True
+
+    # Latency histogram bucket upper bounds in seconds.
+    default_buckets = [0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001,
+        0.00025, 0.001, 0.01]
+
+    # Stage name, owner and attribute of each timed decoder stage.
+    stages = [
+        ("frame", FrameRecord, "__new__"),
+        ("crc", Crc, "__new__"),
+        ("message", MessageField, "__new__"),
+        ("fields", CompiledDescriptor, "values"),
+        ("record_fields", CompiledDescriptor, "unpack_into")
+    ]
+
+    help_text = {
+        "flextelem_frames_total": ("counter", "Frames decoded by downlink format."),
+        "flextelem_frames_dropped_total": ("counter", "Frames that didn't decode."),
+        "flextelem_me_type_total": ("counter", "Extended squitters by message type code."),
+        "flextelem_crc_total": ("counter", "CRC checks by result."),
+        "flextelem_stage_errors_total": ("counter", "Decoder stage calls that raised."),
+        "flextelem_stage_seconds": ("histogram", "Decoder stage latency.")
+    }
+
+    def __init__(self, buckets=None, profile_every=0):
+        if buckets is None:
+            buckets = self.default_buckets
+
+        self.buckets = sorted(buckets)
+
+        # Profile one in profile_every frame decodes when it's over 0.
+        self.profile_every = profile_every
+        self.profiler = cProfile.Profile() if profile_every > 0 else None
+
+        # (name, labels) -> value, where labels is a tuple of (label, value) tuples.
+        self.counters = {}
+
+        # (name, labels) -> [per-bucket counts w/ +Inf last, sum, count].
+        self.histograms = {}
+
+        self.__originals = []
+        self.__frame_ct = 0
+
+
+    def count(self, name, labels=(), value=1):
+        """
+        Add to a counter.
+        """
+
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+
+    def observe(self, name, value, labels=()):
+        """
+        Add an observation to a histogram.
+        """
+
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+
+        if histogram is None:
+            histogram = [[0] * (len(self.buckets) + 1), 0, 0]
+            self.histograms[key] = histogram
+
+        histogram[0][bisect.bisect_left(self.buckets, value)] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+
+    def frame(self, decoded):
+        """
+        Count a decoded frame by DF, message type code and CRC result.
+        """
+
+        if decoded is None:
+            self.count("flextelem_frames_dropped_total")
+            return
+
+        counters = self.counters
+
+        key = ("flextelem_frames_total", (("df", decoded.df),))
+        counters[key] = counters.get(key, 0) + 1
+
+        if getattr(decoded, 'crc_corrected_bits', None) is not None:
+            crc_result = "corrected"
+        elif decoded.crc_match is True:
+            crc_result = "pass"
+        else:
+            crc_result = "fail"
+
+        key = ("flextelem_crc_total", (("result", crc_result),))
+        counters[key] = counters.get(key, 0) + 1
+
+        message = getattr(getattr(decoded, 'message', None), 'message', None)
+
+        if type(message) is MessageField:
+            key = ("flextelem_me_type_total", (("tc", message.me_type),))
+            counters[key] = counters.get(key, 0) + 1
+
+
+    def enable(self):
+        """
+        Start collecting, swapping this registry in for the current collector.
+        """
+
+        if self.__originals:
+            return
+
+        Metrics.disable_all()
+
+        for stage, owner, attribute in self.stages:
+            original = owner.__dict__[attribute]
+            self.__originals.append((owner, attribute, original))
+
+            setattr(owner, attribute, self.timed(stage, original))
+
+        FrameRecord.metrics = self
+
+
+    def disable(self):
+        """
+        Stop collecting, putting back the unwrapped stages and the no-op collector.
+        """
+
+        for owner, attribute, original in reversed(self.__originals):
+            setattr(owner, attribute, original)
+
+        self.__originals = []
+
+        if FrameRecord.metrics is self:
+            FrameRecord.metrics = NullMetrics()
+
+
+    @staticmethod
+    def disable_all():
+        """
+        Disable whichever registry is collecting.
+        """
+
+        if FrameRecord.metrics.enabled:
+            FrameRecord.metrics.disable()
+
+
+    def timed(self, stage, original):
+        """
+        Wrap a stage's function, staticmethod or method w/ a timer.
+        """
+
+        is_static = type(original) is staticmethod
+        function = original.__func__ if is_static else original
+
+        labels = (("stage", stage),)
+        clock = time.perf_counter
+        observe = self.observe
+        metrics = self
+
+        def timed_stage(*args, **kwargs):
+            start = clock()
+
+            try:
+                # Sample whole frame decodes w/ the profiler.
+                if stage == "frame" and metrics.profiler is not None:
+                    metrics.__frame_ct += 1
+
+                    if metrics.__frame_ct % metrics.profile_every == 0:
+                        return metrics.profiler.runcall(function, *args, **kwargs)
+
+                return function(*args, **kwargs)
+
+            except Exception:
+                metrics.count("flextelem_stage_errors_total", labels)
+                raise
+
+            finally:
+                observe("flextelem_stage_seconds", clock() - start, labels)
+
+        if is_static:
+            return staticmethod(timed_stage)
+
+        return timed_stage
+
+
+    def prometheus(self):
+        """
+        Metrics in the Prometheus text exposition format.
+        """
+
+        lines = []
+        families = {}
+
+        for (name, labels), value in list(self.counters.items()):
+            families.setdefault(name, []).append((labels, value))
+
+        for (name, labels), histogram in list(self.histograms.items()):
+            families.setdefault(name, []).append((labels, histogram))
+
+        for name in sorted(families):
+            metric_type, help_text = self.help_text.get(name, ("untyped", name))
+            lines.append("# HELP %s %s" %(name, help_text))
+            lines.append("# TYPE %s %s" %(name, metric_type))
+
+            for labels, value in sorted(families[name], key=lambda entry: str(entry[0])):
+                if metric_type != "histogram":
+                    lines.append("%s%s %s" %(name, Metrics.format_labels(labels), value))
+                    continue
+
+                bucket_counts, value_sum, value_ct = value
+                cumulative = 0
+
+                for bound, bucket_ct in zip(self.buckets + ["+Inf"], bucket_counts):
+                    cumulative += bucket_ct
+                    lines.append("%s_bucket%s %s" %(name,
+                        Metrics.format_labels(labels + (("le", bound),)), cumulative))
+
+                lines.append("%s_sum%s %r" %(name, Metrics.format_labels(labels), value_sum))
+                lines.append("%s_count%s %s" %(name, Metrics.format_labels(labels), value_ct))
+
+        return "\n".join(lines) + "\n"
+
+
+    @staticmethod
+    def format_labels(labels):
+        """
+        Format a tuple of (label, value) tuples as a Prometheus label set.
+        """
+
+        if not labels:
+            return ""
+
+        return "{%s}" %",".join(['%s="%s"' %(label, value) for label, value in labels])
+
+
+    def write(self, path):
+        """
+        Write the metrics to a file, replacing it in one step so scrapers never see half of it.
+        """
+
+        with open(path + ".tmp", 'w') as metrics_file:
+            metrics_file.write(self.prometheus())
+
+        os.replace(path + ".tmp", path)
+
+
+    def serve(self, port=9108, host="127.0.0.1"):
+        """
+        Serve the metrics over HTTP at /metrics from a background thread.
+
+        Returns the server, which stops w/ shutdown().
+        """
+
+        metrics = self
+
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+
+                body = metrics.prometheus().encode()
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        return server
+
+
+    def profile_stats(self, sort="cumulative", limit=30):
+        """
+        Stats from the sampled frame decodes as text.
+        """
+
+        if self.profiler is None:
+            return ""
+
+        stats_text = io.StringIO()
+        pstats.Stats(self.profiler, stream=stats_text).sort_stats(sort).print_stats(limit)
+
+        return stats_text.getvalue()
+
+
+    @staticmethod
+    def profile(function, *args, sort="cumulative", limit=30, **kwargs):
+        """
+        Profile one call of a decoder.
+
+        Returns the call's result and the profile stats as text.
+        """
+
+        profiler = cProfile.Profile()
+        result = profiler.runcall(function, *args, **kwargs)
+
+        stats_text = io.StringIO()
+        pstats.Stats(profiler, stream=stats_text).sort_stats(sort).print_stats(limit)
+
+        return (result, stats_text.getvalue())
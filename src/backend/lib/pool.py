@@ -0,0 +1,264 @@
+"""
+This file is part of Flextelem. Its purpose is to support decoding frames across CPU cores,
+sharding them by ICAO address so each aircraft's state stays on one worker.
+"""
+
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+from .adsb import ADSBFrame
+from .adsb import FrameRecord
+from .util import IcaoIndex
+
+
+class FrameDecoder:
+    """
+    Per-worker frame decoder holding that worker's aircraft state. Frames decode to ADSBFrame
+    dictionaries, which are cheaper to send back than records, unless records is True.
+    """
+
+    def __init__(self, fix_bits=0, icao_ttl=None, records=False):
+        self.fix_bits = fix_bits
+        self.icao_ttl = icao_ttl
+        self.records = records
+        self.icao_index = None
+
+
+    def __call__(self, frame):
+        # Build worker-local state on first use so it isn't shipped across processes.
+        if self.icao_ttl is not None and self.icao_index is None:
+            self.icao_index = IcaoIndex(self.icao_ttl)
+
+        decoded = FrameRecord(frame, self.fix_bits, self.icao_index)
+
+        if decoded is None or self.records:
+            return decoded
+
+        return decoded.to_dict()
+
+
+class DecodePool:
+    """
+    Pool of decoder processes. Frames are sharded by ICAO address and handed to workers in
+    batches through shared memory. Each worker returns decoded batches in order, so results for
+    any one aircraft come back in the order its frames went in.
+    """
+
+    # One length byte and up to 14 frame bytes per frame.
+    frame_slot_bytes = 15
+
+    def __init__(self, workers=None, batch_frames=4096, buffers=2, decoder=None):
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        if decoder is None:
+            decoder = FrameDecoder()
+
+        self.workers = workers
+        self.batch_frames = batch_frames
+        self.buffers = buffers
+        self.decoder = decoder
+        self.errors = 0
+
+        self.__processes = []
+        self.__pipes = []
+        self.__memory = []
+        self.__started = False
+
+
+    def __enter__(self):
+        self.start()
+
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def start(self):
+        """
+        Start the worker processes.
+        """
+
+        if self.__started:
+            return
+
+        buffer_bytes = self.batch_frames * self.frame_slot_bytes
+
+        for worker_id in range(0, self.workers):
+            memory = shared_memory.SharedMemory(create=True, size=buffer_bytes * self.buffers)
+            parent_pipe, child_pipe = multiprocessing.Pipe()
+
+            process = multiprocessing.Process(target=DecodePool.worker,
+                args=(memory.name, buffer_bytes, child_pipe, self.decoder), daemon=True)
+            process.start()
+            child_pipe.close()
+
+            self.__memory.append(memory)
+            self.__pipes.append(parent_pipe)
+            self.__processes.append(process)
+
+        self.__started = True
+
+
+    def close(self):
+        """
+        Stop the workers and release shared memory.
+        """
+
+        for pipe in self.__pipes:
+            try:
+                pipe.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+
+        for process in self.__processes:
+            process.join()
+
+        for pipe in self.__pipes:
+            pipe.close()
+
+        for memory in self.__memory:
+            memory.close()
+            memory.unlink()
+
+        self.__processes = []
+        self.__pipes = []
+        self.__memory = []
+        self.__started = False
+
+
+    def shard(self, frame):
+        """
+        Worker for a frame, by ICAO address. Address/parity replies are sharded by the address
+        recovered from their CRC.
+        """
+
+        return ADSBFrame.frame_address(frame) % self.workers
+
+
+    def decode(self, frames):
+        """
+        Decode an iterable of 7 or 14 byte frames, yielding whatever the decoder returns. Frames
+        that can't be decoded are skipped, and ones of other lengths or that raise are counted in
+        errors.
+        """
+
+        self.start()
+
+        workers = self.workers
+        batch_frames = self.batch_frames
+        slot_bytes = self.frame_slot_bytes
+        buffer_bytes = batch_frames * slot_bytes
+
+        buffers = [memory.buf for memory in self.__memory]
+
+        # Per worker: buffers free to fill, the one being filled, how full it is, and batches
+        # in flight.
+        free = [list(range(1, self.buffers)) for i in range(0, workers)]
+        filling = [0] * workers
+        counts = [0] * workers
+        in_flight = [0] * workers
+
+        for frame in frames:
+            frame_len = len(frame)
+
+            # Frames of other lengths would overrun their slot.
+            if frame_len != 7 and frame_len != 14:
+                self.errors += 1
+                continue
+
+            worker_id = self.shard(frame)
+
+            # Copy the frame into the worker's shared buffer.
+            offset = (filling[worker_id] * buffer_bytes) + (counts[worker_id] * slot_bytes)
+            buffer = buffers[worker_id]
+            buffer[offset] = frame_len
+            buffer[offset + 1:offset + 1 + frame_len] = frame
+
+            counts[worker_id] += 1
+
+            if counts[worker_id] == batch_frames:
+                yield from self.__dispatch(worker_id, free, filling, counts, in_flight)
+
+        # Flush partial batches.
+        for worker_id in range(0, workers):
+            if counts[worker_id] > 0:
+                yield from self.__dispatch(worker_id, free, filling, counts, in_flight)
+
+        # Drain everything still in flight.
+        for worker_id in range(0, workers):
+            while in_flight[worker_id] > 0:
+                yield from self.__receive(worker_id, free, in_flight)
+
+
+    def __dispatch(self, worker_id, free, filling, counts, in_flight):
+        """
+        Hand the buffer being filled to its worker, waiting for a free buffer to fill next.
+        """
+
+        self.__pipes[worker_id].send((filling[worker_id], counts[worker_id]))
+        in_flight[worker_id] += 1
+        counts[worker_id] = 0
+
+        if not free[worker_id]:
+            yield from self.__receive(worker_id, free, in_flight)
+
+        filling[worker_id] = free[worker_id].pop()
+
+
+    def __receive(self, worker_id, free, in_flight):
+        """
+        Wait for the oldest batch in flight on a worker and yield its results.
+        """
+
+        buffer_id, results, errors = self.__pipes[worker_id].recv()
+
+        free[worker_id].append(buffer_id)
+        in_flight[worker_id] -= 1
+        self.errors += errors
+
+        for result in results:
+            if result is not None:
+                yield result
+
+
+    @staticmethod
+    def worker(memory_name, buffer_bytes, pipe, decoder):
+        """
+        Worker process loop. Decodes batches from shared memory and sends back the results.
+        """
+
+        memory = shared_memory.SharedMemory(name=memory_name)
+        buffer = memory.buf
+        slot_bytes = DecodePool.frame_slot_bytes
+
+        try:
+            while True:
+                task = pipe.recv()
+
+                if task is None:
+                    break
+
+                buffer_id, count = task
+                results = []
+                errors = 0
+                offset = buffer_id * buffer_bytes
+
+                for cursor in range(offset, offset + (count * slot_bytes), slot_bytes):
+                    frame_len = buffer[cursor]
+
+                    # Whatever a frame raises only fails that frame, not the worker.
+                    try:
+                        results.append(decoder(buffer[cursor + 1:cursor + 1 + frame_len]))
+                    except Exception:
+                        errors += 1
+
+                pipe.send((buffer_id, results, errors))
+
+        finally:
+            del buffer
+            memory.close()
+            pipe.close()
@@ -0,0 +1,369 @@
+"""
+This file is part of Flextelem. Its purpose is to support pushing tracked aircraft state to map
+clients as server-sent events, sending only what changed each tick.
+"""
+
+import asyncio
+import json
+
+
+class StateView:
+    """
+    Published view of a tracker's aircraft. Each tick coalesces everything that changed since the
+    last one into a delta of changed fields and removed aircraft, where cleared fields are None.
+    """
+
+    # State field and rounding, None for fields sent as they are.
+    fields = [
+        ("ident", None),
+        ("category", None),
+        ("squawk", None),
+        ("altitude", None),
+        ("gnss_altitude", None),
+        ("lat", 5),
+        ("lon", 5),
+        ("ground_speed", 1),
+        ("track", 1),
+        ("vert_rate", None)
+    ]
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.tick = 0
+
+        # Hex ICAO -> published fields.
+        self.__published = {}
+
+        # ICAO int -> last_seen when it was published.
+        self.__seen = {}
+
+        self.__snapshot = None
+
+
+    @staticmethod
+    def state_fields(state):
+        """
+        Fields of an aircraft's state that clients see.
+        """
+
+        fields = {}
+
+        for field, places in StateView.fields:
+            value = getattr(state, field)
+
+            if value is None:
+                continue
+
+            if places is not None:
+                value = round(value, places)
+
+            fields[field] = value
+
+        return fields
+
+
+    def update(self):
+        """
+        Move on a tick, coalescing what changed since the last one.
+
+        Returns a delta dictionary or None if nothing changed.
+        """
+
+        published = self.__published
+        seen = self.__seen
+
+        changed = {}
+        current = set()
+
+        # Copy the aircraft so a decoder thread can keep updating the tracker.
+        for state in list(self.tracker):
+            icao = state.icao
+            current.add(icao)
+
+            # Aircraft we haven't heard from since the last tick haven't changed.
+            if seen.get(icao) == state.last_seen:
+                continue
+
+            seen[icao] = state.last_seen
+            key = "%06x" %icao
+            fields = self.state_fields(state)
+            old = published.get(key)
+
+            if old is None:
+                delta = fields
+            else:
+                delta = {field: value for field, value in fields.items()
+                    if old.get(field) != value}
+
+                # Cleared fields go out as None so clients drop them.
+                for field in old:
+                    if field not in fields:
+                        delta[field] = None
+
+            if delta:
+                published[key] = fields
+                changed[key] = delta
+
+        removed = []
+
+        for icao in [icao for icao in seen if icao not in current]:
+            del seen[icao]
+            key = "%06x" %icao
+
+            if published.pop(key, None) is not None:
+                removed.append(key)
+
+        if not changed and not removed:
+            return None
+
+        self.tick += 1
+        self.__snapshot = None
+
+        delta = {"tick": self.tick, "aircraft": changed}
+
+        if removed:
+            delta["removed"] = removed
+
+        return delta
+
+
+    def snapshot(self):
+        """
+        Every published aircraft as of the current tick.
+        """
+
+        if self.__snapshot is None:
+            self.__snapshot = {"tick": self.tick, "aircraft": dict(self.__published)}
+
+        return self.__snapshot
+
+
+class PushClient:
+    """
+    Connected client w/ a bounded queue of (tick, event) tuples. A client that falls behind has
+    its queue dropped for a snapshot, which is queued as a None event.
+    """
+
+    # Event queued to end a client's stream.
+    closed = object()
+
+    def __init__(self, queue_size=8, writer=None):
+        self.queue = asyncio.Queue(queue_size)
+        self.writer = writer
+        self.skips = 0
+
+
+    def push(self, tick, event):
+        """
+        Queue an event w/o waiting.
+        """
+
+        queue = self.queue
+
+        if queue.full():
+            # Skip ahead to a snapshot instead of stalling the tick.
+            while not queue.empty():
+                queue.get_nowait()
+
+            queue.put_nowait((tick, None))
+            self.skips += 1
+
+            return
+
+        queue.put_nowait((tick, event))
+
+
+    def close(self):
+        """
+        End the client's stream, dropping whatever is queued, and close its connection so a
+        write waiting on it gives up.
+        """
+
+        queue = self.queue
+
+        while not queue.empty():
+            queue.get_nowait()
+
+        queue.put_nowait((None, PushClient.closed))
+
+        if self.writer is not None:
+            self.writer.close()
+
+
+class PushServer:
+    """
+    Server-sent events server. GET /events streams a snapshot followed by a delta each tick that
+    something changed, and GET /snapshot returns the current snapshot as JSON. Ticks never wait on
+    clients, so slow clients skip ahead rather than holding up decoding.
+    """
+
+    def __init__(self, tracker, host="127.0.0.1", port=8080, tick=1.0, queue_size=8):
+        self.view = StateView(tracker)
+        self.host = host
+        self.port = port
+        self.tick = tick
+        self.queue_size = queue_size
+
+        self.clients = set()
+
+        self.__server = None
+        self.__ticker = None
+
+
+    async def start(self):
+        """
+        Start listening and ticking.
+        """
+
+        self.__server = await asyncio.start_server(self.__handle, self.host, self.port)
+        self.__ticker = asyncio.ensure_future(self.__tick_forever())
+
+
+    async def serve_forever(self):
+        """
+        Start, then serve until cancelled.
+        """
+
+        await self.start()
+
+        try:
+            await self.__server.serve_forever()
+        finally:
+            await self.close()
+
+
+    async def close(self):
+        """
+        Stop ticking, end every client's stream and close the server.
+        """
+
+        if self.__ticker is not None:
+            self.__ticker.cancel()
+            self.__ticker = None
+
+        if self.__server is not None:
+            self.__server.close()
+
+            for client in list(self.clients):
+                client.close()
+
+            await self.__server.wait_closed()
+            self.__server = None
+
+
+    def publish(self):
+        """
+        Run a tick, queueing its delta for every client.
+
+        Returns the delta or None.
+        """
+
+        delta = self.view.update()
+
+        if delta is None:
+            return None
+
+        # Encode once for every client.
+        event = PushServer.event("delta", delta)
+
+        for client in self.clients:
+            client.push(delta['tick'], event)
+
+        return delta
+
+
+    @staticmethod
+    def event(event_type, data):
+        """
+        Encode a server-sent event.
+        """
+
+        return ("id: %s\nevent: %s\ndata: %s\n\n" %(data['tick'], event_type,
+            json.dumps(data, separators=(",", ":")))).encode()
+
+
+    async def __tick_forever(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self.publish()
+
+
+    async def __handle(self, reader, writer):
+        """
+        Handle one HTTP connection.
+        """
+
+        try:
+            request_line = await reader.readline()
+
+            # Skip the headers.
+            while True:
+                line = await reader.readline()
+
+                if not line or line in [b"\r\n", b"\n"]:
+                    break
+
+            request = request_line.decode('latin-1').split()
+
+            if len(request) < 2 or request[0] != "GET":
+                writer.write(b"HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\n\r\n")
+                return
+
+            path = request[1].split("?")[0]
+
+            if path == "/snapshot":
+                body = json.dumps(self.view.snapshot(), separators=(",", ":")).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\nConnection: close\r\n\r\n%s" %(len(body), body))
+
+            elif path == "/events":
+                await self.__stream(writer)
+
+            else:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+
+            await writer.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            writer.close()
+
+
+    async def __stream(self, writer):
+        """
+        Stream events to a client until it goes away or the server closes.
+        """
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n")
+
+        client = PushClient(self.queue_size, writer)
+        self.clients.add(client)
+
+        try:
+            # Queued as a skip so it goes out like any other snapshot.
+            client.push(self.view.tick, None)
+            sent_tick = -1
+
+            while True:
+                tick, event = await client.queue.get()
+
+                if event is PushClient.closed:
+                    break
+
+                if event is None:
+                    snapshot = self.view.snapshot()
+                    sent_tick = snapshot['tick']
+                    writer.write(PushServer.event("snapshot", snapshot))
+
+                # Deltas older than the last snapshot are already in it.
+                elif tick > sent_tick:
+                    sent_tick = tick
+                    writer.write(event)
+
+                await writer.drain()
+
+        finally:
+            self.clients.discard(client)
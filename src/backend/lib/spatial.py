@@ -0,0 +1,248 @@
+"""
+This file is part of Flextelem. Its purpose is to support bounding box, radius and nearest
+neighbour queries over the positions of tracked aircraft.
+"""
+
+import math
+
+
+class SpatialGrid:
+    """
+    Uniform lat/lon grid of aircraft positions, updated as positions decode. Only occupied cells
+    are kept, each holding the positions in it, so queries only look at cells that overlap them.
+    """
+
+    # Mean earth radius.
+    earth_radius_nm = 3440.065
+
+    def __init__(self, cell_degrees=0.25):
+        self.cell_degrees = cell_degrees
+
+        self.rows = math.ceil(180 / cell_degrees)
+        self.cols = math.ceil(360 / cell_degrees)
+
+        # (row, col) -> {ICAO: (lat, lon)}.
+        self.__cells = {}
+
+        # ICAO -> (lat, lon, cell).
+        self.__positions = {}
+
+
+    def __contains__(self, icao):
+        return icao in self.__positions
+
+
+    def __len__(self):
+        return len(self.__positions)
+
+
+    def cell(self, lat, lon):
+        """
+        Grid cell of a position as a (row, col) tuple.
+        """
+
+        row = min(math.floor((lat + 90) / self.cell_degrees), self.rows - 1)
+        col = math.floor((lon + 180) / self.cell_degrees) % self.cols
+
+        return (row, col)
+
+
+    def position(self, icao):
+        """
+        Indexed (lat, lon) of an aircraft or None.
+        """
+
+        position = self.__positions.get(icao)
+
+        if position is None:
+            return None
+
+        return position[:2]
+
+
+    def update(self, icao, lat, lon):
+        """
+        Add or move an aircraft.
+        """
+
+        cell = self.cell(lat, lon)
+        old = self.__positions.get(icao)
+
+        if old is not None and old[2] != cell:
+            self.__remove_from_cell(icao, old[2])
+
+        cell_positions = self.__cells.get(cell)
+
+        if cell_positions is None:
+            cell_positions = {}
+            self.__cells[cell] = cell_positions
+
+        cell_positions[icao] = (lat, lon)
+        self.__positions[icao] = (lat, lon, cell)
+
+
+    def remove(self, icao):
+        """
+        Drop an aircraft if it's indexed.
+        """
+
+        old = self.__positions.pop(icao, None)
+
+        if old is not None:
+            self.__remove_from_cell(icao, old[2])
+
+
+    def bbox(self, south, west, north, east):
+        """
+        Aircraft inside a bounding box in degrees. Boxes where west is greater than east cross the
+        antimeridian.
+
+        Returns a list of ICAO addresses.
+        """
+
+        found = []
+
+        for cell_positions in self.__cells_in(south, west, north, east):
+            for icao, (lat, lon) in cell_positions.items():
+                if lat < south or lat > north:
+                    continue
+
+                if west <= east:
+                    if lon < west or lon > east:
+                        continue
+                elif lon < west and lon > east:
+                    continue
+
+                found.append(icao)
+
+        return found
+
+
+    def radius(self, lat, lon, radius_nm):
+        """
+        Aircraft within a great circle distance of a point.
+
+        Returns a list of (ICAO, distance in nm) tuples, nearest first.
+        """
+
+        # Degrees of latitude and longitude that cover the radius.
+        d_lat = math.degrees(radius_nm / self.earth_radius_nm)
+        south = lat - d_lat
+        north = lat + d_lat
+
+        if south <= -90 or north >= 90:
+            west = -180
+            east = 180
+        else:
+            cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+            d_lon = d_lat / cos_lat
+
+            if d_lon >= 180:
+                west = -180
+                east = 180
+            else:
+                west = ((lon - d_lon + 180) % 360) - 180
+                east = ((lon + d_lon + 180) % 360) - 180
+
+        found = []
+        distance = SpatialGrid.distance
+
+        for cell_positions in self.__cells_in(max(south, -90), west, min(north, 90), east):
+            for icao, position in cell_positions.items():
+                nm = distance(lat, lon, position[0], position[1])
+
+                if nm <= radius_nm:
+                    found.append((icao, nm))
+
+        found.sort(key=lambda entry: entry[1])
+
+        return found
+
+
+    def nearest(self, lat, lon, k=1, max_nm=None):
+        """
+        Up to k aircraft nearest a point, optionally no further than max_nm.
+
+        Returns a list of (ICAO, distance in nm) tuples, nearest first.
+        """
+
+        # Widen a radius search until it holds k aircraft. Radius searches are exact, so the k
+        # nearest are then all inside it.
+        limit = math.pi * self.earth_radius_nm
+
+        if max_nm is not None:
+            limit = min(limit, max_nm)
+
+        radius_nm = min(self.cell_degrees * 60, limit)
+
+        while True:
+            found = self.radius(lat, lon, radius_nm)
+
+            if len(found) >= k or radius_nm >= limit or len(found) == len(self.__positions):
+                return found[:k]
+
+            radius_nm = min(radius_nm * 2, limit)
+
+
+    @staticmethod
+    def distance(lat_1, lon_1, lat_2, lon_2):
+        """
+        Great circle distance between two points in nm.
+        """
+
+        lat_1 = math.radians(lat_1)
+        lat_2 = math.radians(lat_2)
+
+        a = (math.sin((lat_2 - lat_1) / 2) ** 2) + (math.cos(lat_1) * math.cos(lat_2) *
+            (math.sin(math.radians(lon_2 - lon_1) / 2) ** 2))
+
+        return 2 * SpatialGrid.earth_radius_nm * math.asin(min(math.sqrt(a), 1))
+
+
+    def __cells_in(self, south, west, north, east):
+        """
+        Occupied cells overlapping a bounding box.
+        """
+
+        cells = self.__cells
+        first_row, first_col = self.cell(south, west)
+        last_row, last_col = self.cell(north, east)
+
+        if west <= east:
+            # Keep a box that ends on the antimeridian from wrapping.
+            last_col = min(math.floor((east + 180) / self.cell_degrees), self.cols - 1)
+            cols = range(first_col, last_col + 1)
+        else:
+            cols = list(range(first_col, self.cols)) + list(range(0, last_col + 1))
+
+        rows = range(first_row, last_row + 1)
+
+        # Big boxes are cheaper to check against the occupied cells.
+        if len(rows) * len(cols) > len(cells):
+            cols = set(cols)
+
+            return [cell_positions for (row, col), cell_positions in cells.items()
+                if row >= first_row and row <= last_row and col in cols]
+
+        found = []
+
+        for row in rows:
+            for col in cols:
+                cell_positions = cells.get((row, col))
+
+                if cell_positions is not None:
+                    found.append(cell_positions)
+
+        return found
+
+
+    def __remove_from_cell(self, icao, cell):
+        """
+        Take an aircraft out of a cell, dropping the cell once it's empty.
+        """
+
+        cell_positions = self.__cells[cell]
+        del cell_positions[icao]
+
+        if not cell_positions:
+            del self.__cells[cell]
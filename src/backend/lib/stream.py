@@ -0,0 +1,396 @@
+"""
+This file is part of Flextelem. Its purpose is to support streaming Mode S frames from Beast binary
+and AVR text feeds such as dump1090, and from files of hex frames.
+"""
+
+import binascii
+import itertools
+import socket
+
+from .adsb import ADSBFrame
+
+
+class FrameStream:
+    """
+    Sources and sinks for streams of frames.
+    """
+
+    # Beast and AVR MLAT timestamps count a 12 MHz clock.
+    mlat_clock_hz = 12000000
+
+    @staticmethod
+    def connect(host, port, timeout=None):
+        """
+        Connect to a TCP feed, returning the socket.
+        """
+
+        return socket.create_connection((host, port), timeout)
+
+
+    @staticmethod
+    def chunks(source, chunk_size=65536):
+        """
+        Yield large reads from a file, pipe or socket until it runs dry. Each read is a new bytes
+        object so slices handed out by the readers stay valid.
+        """
+
+        if hasattr(source, 'recv'):
+            read = source.recv
+        elif hasattr(source, 'read1'):
+            read = source.read1
+        else:
+            read = source.read
+
+        while True:
+            chunk = read(chunk_size)
+
+            if not chunk:
+                break
+
+            yield chunk
+
+
+    @staticmethod
+    def decode(frames, cache=None, timestamp_hz=None, **kwargs):
+        """
+        Decode frames yielded by a reader, skipping the ones that aren't decodable. Keyword
+        arguments are passed through to ADSBFrame, or frames go through a DecodeCache if one is
+        given. The cache's own settings apply, so it doesn't take keyword arguments.
+
+        The cache times frames by its own clock unless timestamp_hz gives the units of the
+        reader's timestamps: 1 for captures, whose timestamps are seconds since the epoch, or
+        mlat_clock_hz for a Beast or AVR feed from a single receiver. MLAT counters of different
+        receivers can't be compared, so merged feeds leave it None.
+        """
+
+        if cache is not None and kwargs:
+            raise ValueError("Decode settings can't be given w/ a DecodeCache, which has its "
+                "own: %s." %", ".join(sorted(kwargs)))
+
+        for frame, timestamp, signal in frames:
+            # Frames are decoded straight from the reader's buffers.
+            if cache is None:
+                decoded = ADSBFrame(frame, **kwargs)
+            elif timestamp is None or timestamp_hz is None:
+                decoded = cache.decode(frame)
+            else:
+                decoded = cache.decode(frame, timestamp / timestamp_hz)
+
+            if decoded is None:
+                continue
+
+            # Cached frames are shared.
+            if cache is not None:
+                decoded = dict(decoded)
+
+            decoded.update({
+                "timestamp": timestamp,
+                "signal": signal
+            })
+
+            yield decoded
+
+
+class BeastReader:
+    """
+    Beast binary format reader.
+    """
+
+    escape = 0x1a
+
+    # Payload length by message type. Mode A/C and status messages are skipped.
+    payload_bytes = {
+        0x31: 2, # '1' Mode A/C
+        0x32: 7, # '2' Mode S short
+        0x33: 14, # '3' Mode S long
+        0x34: 14 # '4' Status
+    }
+
+    # 6 byte MLAT timestamp and 1 byte signal level.
+    header_bytes = 7
+
+    def __init__(self):
+        self.skipped = 0
+
+
+    def frames(self, chunks):
+        """
+        Yield (frame, timestamp, signal) tuples from an iterable of chunks. Frames are memoryview
+        slices of the chunk they arrived in, joined to any partial message before it, unless they
+        had to be unescaped.
+        """
+
+        escape = self.escape
+        payload_bytes = self.payload_bytes
+        header_bytes = self.header_bytes
+        pending = b""
+
+        for chunk in chunks:
+            # Joining a partial message carried over from the last chunk copies the whole chunk,
+            # once per chunk, which is cheap next to parsing it.
+            if pending:
+                buffer = pending + chunk
+            else:
+                buffer = chunk
+
+            view = memoryview(buffer)
+            buffer_len = len(buffer)
+            cursor = 0
+            pending = b""
+
+            while True:
+                start = buffer.find(escape, cursor)
+
+                # Need at least the escape and type bytes.
+                if start < 0:
+                    break
+
+                if start + 1 >= buffer_len:
+                    pending = buffer[start:]
+                    break
+
+                msg_type = buffer[start + 1]
+                length = payload_bytes.get(msg_type)
+
+                # Resync on anything we don't recognise, including escaped 0x1a bytes.
+                if length is None:
+                    cursor = start + 2 if msg_type == escape else start + 1
+                    continue
+
+                body_start = start + 2
+                body_end = body_start + header_bytes + length
+
+                if body_end > buffer_len:
+                    pending = buffer[start:]
+                    break
+
+                # Fast path: nothing escaped in the body, so it's a straight slice.
+                if buffer.find(escape, body_start, body_end) < 0:
+                    body = view[body_start:body_end]
+                    cursor = body_end
+                else:
+                    body, cursor = BeastReader.__unescape(
+                        buffer, body_start, header_bytes + length)
+
+                    if body is None:
+                        pending = buffer[start:]
+                        break
+
+                if msg_type not in [0x32, 0x33]:
+                    self.skipped += 1
+                    continue
+
+                timestamp = int.from_bytes(body[:6], 'big')
+                signal = body[6]
+
+                yield (body[header_bytes:], timestamp, signal)
+
+        if pending:
+            self.skipped += 1
+
+
+    def __unescape(buffer, body_start, body_len):
+        """
+        Unescape doubled 0x1a bytes in a message body, returning the body and the cursor after
+        it, or None if the body runs past the end of the buffer.
+        """
+
+        body = bytearray()
+        cursor = body_start
+        buffer_len = len(buffer)
+
+        while len(body) < body_len:
+            if cursor >= buffer_len:
+                return (None, cursor)
+
+            this_byte = buffer[cursor]
+
+            if this_byte == 0x1a:
+                if cursor + 1 >= buffer_len:
+                    return (None, cursor)
+
+                cursor += 1
+
+            body.append(this_byte)
+            cursor += 1
+
+        return (memoryview(body), cursor)
+
+
+class AvrReader:
+    """
+    AVR text format reader for '*...;' and '@...;' (MLAT timestamped) lines.
+    """
+
+    # '@' lines lead with a 12 hex digit timestamp.
+    timestamp_digits = 12
+
+    # Longest partial line carried between chunks.
+    max_pending = 1024
+
+    def __init__(self):
+        self.skipped = 0
+
+
+    def frames(self, chunks):
+        """
+        Yield (frame, timestamp, signal) tuples from an iterable of chunks. AVR carries no signal
+        level, and timestamps are None for '*' lines.
+        """
+
+        pending = b""
+
+        for chunk in chunks:
+            # As w/ Beast, a partial line carried over copies the chunk it's joined to.
+            if pending:
+                buffer = pending + chunk
+            else:
+                buffer = chunk
+
+            view = memoryview(buffer)
+            cursor = 0
+            pending = b""
+
+            for line_end in AvrReader.__line_ends(buffer):
+                line_start = cursor
+                cursor = line_end + 1
+
+                # Find the start of the message on this line.
+                star = buffer.find(b"*", line_start, line_end)
+                at = buffer.find(b"@", line_start, line_end)
+
+                timestamp = None
+
+                if star >= 0:
+                    hex_start = star + 1
+                elif at >= 0:
+                    hex_start = at + 1 + self.timestamp_digits
+                else:
+                    self.skipped += 1
+                    continue
+
+                # Truncated lines don't have room for the timestamp.
+                if hex_start > line_end:
+                    self.skipped += 1
+                    continue
+
+                # Decode the hex straight from the buffer without a str in between.
+                try:
+                    if star < 0:
+                        timestamp = int(buffer[at + 1:hex_start], 16)
+
+                    frame = binascii.a2b_hex(view[hex_start:line_end])
+                except (binascii.Error, ValueError):
+                    self.skipped += 1
+                    continue
+
+                if len(frame) not in [7, 14]:
+                    self.skipped += 1
+                    continue
+
+                yield (frame, timestamp, None)
+
+            pending = buffer[cursor:]
+
+            # Don't hang on to line noise that never ends a message.
+            if len(pending) > self.max_pending:
+                self.skipped += 1
+                pending = b""
+
+
+    def __line_ends(buffer):
+        """
+        Yield the position of each ';' ending a message.
+        """
+
+        cursor = 0
+
+        while True:
+            line_end = buffer.find(b";", cursor)
+
+            if line_end < 0:
+                break
+
+            yield line_end
+
+            cursor = line_end + 1
+
+
+class HexLineReader:
+    """
+    Reader for text w/ one hex frame per line. Each chunk's lines are converted and checked w/o
+    a Python loop over them, falling back to one line at a time if any line is bad.
+    """
+
+    # Longest partial line carried between chunks.
+    max_pending = 1024
+
+    frame_lengths = {7, 14}
+
+    def __init__(self):
+        self.skipped = 0
+
+
+    def frames(self, chunks):
+        """
+        Yield (frame, timestamp, signal) tuples from an iterable of chunks. Timestamps and signal
+        levels are None.
+        """
+
+        pending = b""
+
+        for chunk in chunks:
+            # As w/ Beast, a partial line carried over copies the chunk it's joined to.
+            if pending:
+                buffer = pending + chunk
+            else:
+                buffer = chunk
+
+            lines = buffer.split()
+            pending = b""
+
+            # A line the chunk doesn't finish waits for the next one.
+            if lines and not buffer.endswith(b"\n"):
+                pending = lines.pop()
+
+                # Don't hang on to line noise that never ends.
+                if len(pending) > self.max_pending:
+                    self.skipped += 1
+                    pending = b""
+
+            yield from self.__decode_lines(lines)
+
+        if pending:
+            yield from self.__decode_lines(pending.split())
+
+
+    def __decode_lines(self, lines):
+        """
+        Frames from a list of hex lines w/o whitespace.
+        """
+
+        # Convert the whole chunk in C, and only go line by line if a line is bad.
+        try:
+            frames = list(map(binascii.a2b_hex, lines))
+        except (binascii.Error, ValueError):
+            frames = None
+
+        if frames is not None and set(map(len, frames)) <= HexLineReader.frame_lengths:
+            return zip(frames, itertools.repeat(None), itertools.repeat(None))
+
+        decoded = []
+
+        for line in lines:
+            try:
+                frame = binascii.a2b_hex(line)
+            except (binascii.Error, ValueError):
+                self.skipped += 1
+                continue
+
+            if len(frame) not in [7, 14]:
+                self.skipped += 1
+                continue
+
+            decoded.append((frame, None, None))
+
+        return decoded
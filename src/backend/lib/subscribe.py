@@ -0,0 +1,177 @@
+"""
+This file is part of Flextelem. Its purpose is to support consumers subscribing to the kinds of
+frames and aircraft they care about, so everything else is dropped before it's decoded.
+"""
+
+from .adsb import ADSBFrame
+from .adsb import AddressParity
+
+
+class FrameFilter:
+    """
+    Accepts frames by kind and ICAO address from their header alone. Kinds are looked up by
+    downlink format, then by type code for extended squitters.
+    """
+
+    # Kind by downlink format, None where the type code decides.
+    df_kinds = [None] * 32
+
+    # Kind of extended squitter by type code.
+    tc_kinds = [None] * 32
+
+    def __init__(self, kinds=None, icaos=None):
+        if kinds is not None:
+            unknown = set(kinds) - set(FrameFilter.all_kinds())
+
+            if unknown:
+                raise ValueError("Unknown frame kinds: %s." %", ".join(sorted(unknown)))
+
+            kinds = set(kinds)
+
+        if icaos is not None:
+            icaos = set(int(icao, 16) if type(icao) is str else int(icao) for icao in icaos)
+
+        self.kinds = kinds
+        self.icaos = icaos
+
+        # Per DF: True, False or None when the type code decides.
+        self.df_accept = [self.__accept_kind(kind) for kind in self.df_kinds]
+        self.tc_accept = [self.__accept_kind(kind) is True for kind in self.tc_kinds]
+
+        for df in [17, 18]:
+            self.df_accept[df] = None if kinds is not None else True
+
+
+    def __accept_kind(self, kind):
+        return self.kinds is None or kind in self.kinds
+
+
+    def accepts(self, frame):
+        """
+        See if a 7 or 14 byte frame is wanted.
+        """
+
+        accept = self.df_accept[frame[0] >> 3]
+
+        # Extended squitters are wanted by type code.
+        if accept is None:
+            accept = len(frame) == 14 and self.tc_accept[frame[4] >> 3]
+
+        if not accept:
+            return False
+
+        if self.icaos is None:
+            return True
+
+        return ADSBFrame.frame_address(frame) in self.icaos
+
+
+    @staticmethod
+    def kind(frame):
+        """
+        Kind of a 7 or 14 byte frame or None.
+        """
+
+        kind = FrameFilter.df_kinds[frame[0] >> 3]
+
+        if kind is None and len(frame) == 14 and (frame[0] >> 3) in [17, 18]:
+            kind = FrameFilter.tc_kinds[frame[4] >> 3]
+
+        return kind
+
+
+    @staticmethod
+    def all_kinds():
+        """
+        Every kind of frame.
+        """
+
+        return sorted(set(kind for kind in FrameFilter.df_kinds + FrameFilter.tc_kinds
+            if kind is not None))
+
+
+class FrameSubscriptions:
+    """
+    Callbacks subscribed to kinds of frames and ICAO addresses. A frame is decoded once, and only
+    if a subscriber wants it.
+    """
+
+    def __init__(self, fix_bits=0, icao_index=None):
+        self.fix_bits = fix_bits
+        self.icao_index = icao_index
+
+        self.__subscriptions = []
+
+
+    def __len__(self):
+        return len(self.__subscriptions)
+
+
+    def subscribe(self, callback, kinds=None, icaos=None):
+        """
+        Call callback w/ each decoded frame of the given kinds from the given ICAO addresses. Both
+        default to everything.
+
+        Returns the subscription, which unsubscribe() takes.
+        """
+
+        subscription = (callback, FrameFilter(kinds, icaos))
+        self.__subscriptions.append(subscription)
+
+        return subscription
+
+
+    def unsubscribe(self, subscription):
+        """
+        Drop a subscription.
+        """
+
+        self.__subscriptions.remove(subscription)
+
+
+    def publish(self, frame):
+        """
+        Hand a frame to its subscribers.
+
+        Returns the number of subscribers that got it.
+        """
+
+        frame = ADSBFrame.check_frame(frame)
+        decoded = None
+        delivered = 0
+
+        for callback, frame_filter in self.__subscriptions:
+            if not frame_filter.accepts(frame):
+                continue
+
+            if decoded is None:
+                decoded = ADSBFrame(frame, self.fix_bits, self.icao_index)
+
+                if decoded is None:
+                    return 0
+
+            callback(decoded)
+            delivered += 1
+
+        return delivered
+
+
+# Frame kinds by DF and type code.
+for df in AddressParity.dfs:
+    FrameFilter.df_kinds[df] = "surveillance"
+
+FrameFilter.df_kinds[11] = "all_call"
+
+for me_type in range(1, 5):
+    FrameFilter.tc_kinds[me_type] = "ident"
+
+for me_type in range(5, 9):
+    FrameFilter.tc_kinds[me_type] = "surface_position"
+
+for me_type in list(range(9, 19)) + list(range(20, 23)):
+    FrameFilter.tc_kinds[me_type] = "position"
+
+FrameFilter.tc_kinds[19] = "velocity"
+
+for me_type in [28, 29, 31]:
+    FrameFilter.tc_kinds[me_type] = "status"
@@ -0,0 +1,297 @@
+"""
+This file is part of Flextelem. Its purpose is to support generating reproducible synthetic Mode S
+traffic with valid CRCs for benchmarks.
+"""
+
+import math
+import random
+
+from .adsb import AisStr
+from .cpr import Cpr
+from .util import AdsbCrc
+
+
+class FrameEncoder:
+    """
+    Mode S frame encoders.
+    """
+
+    @staticmethod
+    def crc_frame(data):
+        """
+        Append a CRC to frame data, returning the frame.
+        """
+
+        return data + AdsbCrc.crc_sliced(data).to_bytes(3, 'big')
+
+
+    @staticmethod
+    def extended_squitter(icao, me, ca=5, df=17):
+        """
+        14 byte DF17/18 frame carrying a 56 bit ME field.
+        """
+
+        data = bytes([(df << 3) | ca]) + icao.to_bytes(3, 'big') + me.to_bytes(7, 'big')
+
+        return FrameEncoder.crc_frame(data)
+
+
+    @staticmethod
+    def all_call_reply(icao, ca=5):
+        """
+        7 byte DF11 all-call reply with an interrogator code of 0.
+        """
+
+        return FrameEncoder.crc_frame(bytes([(11 << 3) | ca]) + icao.to_bytes(3, 'big'))
+
+
+    @staticmethod
+    def surveillance_reply(icao, df, code, flight_status=0):
+        """
+        7 byte DF4/5 reply with the address overlaid on the CRC.
+        """
+
+        data = (((df << 27) | (flight_status << 24) | code) & 0xffffffff).to_bytes(4, 'big')
+        ap = AdsbCrc.crc_sliced(data) ^ icao
+
+        return data + ap.to_bytes(3, 'big')
+
+
+    @staticmethod
+    def altitude_code(altitude):
+        """
+        12 bit Q bit altitude field for an altitude in feet.
+        """
+
+        n = (round(altitude) + 1000) // 25
+
+        return ((n >> 4) << 5) | 0x10 | (n & 0xf)
+
+
+    @staticmethod
+    def ident_code(squawk):
+        """
+        13 bit ID field for a 4 digit squawk string.
+        """
+
+        a, b, c, d = [int(digit) for digit in squawk]
+        code = 0
+
+        for digit, bits in zip([a, b, c, d], [[7, 9, 11], [1, 3, 5], [8, 10, 12], [0, 2, 4]]):
+            for bit_value, bit in zip([4, 2, 1], bits):
+                if digit & bit_value:
+                    code |= 1 << bit
+
+        return code
+
+
+    @staticmethod
+    def ident(tc, category, callsign):
+        """
+        ME field for aircraft identification.
+        """
+
+        charset = AisStr.ais_charset
+        chars = 0
+
+        for char in callsign.ljust(8)[:8]:
+            chars = (chars << 6) | charset.index(char)
+
+        return (tc << 51) | (category << 48) | chars
+
+
+    @staticmethod
+    def cpr(lat, lon, cpr_format):
+        """
+        17 bit CPR encoding of a position, returning (lat_cpr, lon_cpr).
+        """
+
+        cpr_max = Cpr.cpr_max
+
+        d_lat = 360 / (60 - cpr_format)
+        lat_cpr = math.floor(cpr_max * ((lat % d_lat) / d_lat) + 0.5)
+        r_lat = d_lat * ((lat_cpr / cpr_max) + math.floor(lat / d_lat))
+
+        d_lon = 360 / max(Cpr.nl(r_lat) - cpr_format, 1)
+        lon_cpr = math.floor(cpr_max * ((lon % d_lon) / d_lon) + 0.5)
+
+        return (lat_cpr & 0x1ffff, lon_cpr & 0x1ffff)
+
+
+    @staticmethod
+    def position(tc, altitude, lat, lon, cpr_format):
+        """
+        ME field for an airborne position. Altitude is in feet for barometric type codes and
+        meters for GNSS ones.
+        """
+
+        if tc >= 20:
+            alt_field = round(altitude) & 0xfff
+        else:
+            alt_field = FrameEncoder.altitude_code(altitude)
+
+        lat_cpr, lon_cpr = FrameEncoder.cpr(lat, lon, cpr_format)
+
+        return (tc << 51) | (alt_field << 36) | (cpr_format << 34) | (lat_cpr << 17) | lon_cpr
+
+
+    @staticmethod
+    def vert_rate_bits(vert_rate):
+        """
+        Sign and 9 bit vertical rate fields of an airborne velocity for a rate in ft/min, w/ a
+        GNSS source.
+        """
+
+        s_vr = 1 if vert_rate < 0 else 0
+        vr = min((abs(round(vert_rate)) // 64) + 1, 511)
+
+        return (s_vr << 19) | (vr << 10)
+
+
+    @staticmethod
+    def velocity(v_ew, v_ns, vert_rate, sub_type=1):
+        """
+        ME field for a subtype 1 or 2 (supersonic) airborne velocity in knots and ft/min.
+        """
+
+        units = 4 if sub_type == 2 else 1
+
+        s_ew = 1 if v_ew < 0 else 0
+        s_ns = 1 if v_ns < 0 else 0
+
+        ew = min(abs(round(v_ew / units)) + 1, 1023)
+        ns = min(abs(round(v_ns / units)) + 1, 1023)
+
+        return (19 << 51) | (sub_type << 48) | (s_ew << 42) | (ew << 32) | (s_ns << 31) | \
+            (ns << 21) | FrameEncoder.vert_rate_bits(vert_rate)
+
+
+    @staticmethod
+    def airspeed(heading, airspeed, vert_rate, sub_type=3, tas=True):
+        """
+        ME field for a subtype 3 or 4 (supersonic) airborne velocity w/ a heading in degrees, an
+        airspeed in knots and a vertical rate in ft/min.
+        """
+
+        units = 4 if sub_type == 4 else 1
+
+        heading_field = round((heading % 360) / 0.3515625) & 0x3ff
+        airspeed_field = min(round(airspeed / units) + 1, 1023)
+
+        return (19 << 51) | (sub_type << 48) | (1 << 42) | (heading_field << 32) | \
+            ((1 if tas else 0) << 31) | (airspeed_field << 21) | \
+            FrameEncoder.vert_rate_bits(vert_rate)
+
+
+class FrameGenerator:
+    """
+    Reproducible synthetic traffic from a population of aircraft around a center point.
+    """
+
+    # Relative weight of each kind of frame.
+    default_mix = {
+        "ident": 1,
+        "position": 4,
+        "gnss_position": 0.5,
+        "velocity": 3,
+        "all_call": 1,
+        "surveillance": 1
+    }
+
+    def __init__(self, aircraft=200, mix=None, seed=0, center=(52.3, 4.8), radius=2.5):
+        if mix is None:
+            mix = self.default_mix
+
+        self.random = random.Random(seed)
+        self.kinds = [kind for kind in mix if mix[kind] > 0]
+        self.weights = [mix[kind] for kind in self.kinds]
+
+        self.aircraft = []
+        letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+        for i in range(0, aircraft):
+            rand = self.random
+
+            self.aircraft.append({
+                "icao": rand.randrange(0x000001, 0xffffff),
+                "callsign": "".join(rand.choice(letters) for j in range(0, 3)) + \
+                    str(rand.randrange(1, 9999)),
+                "category": rand.randrange(0, 8),
+                "squawk": "".join(str(rand.randrange(0, 8)) for j in range(0, 4)),
+                "lat": center[0] + rand.uniform(-radius, radius),
+                "lon": center[1] + rand.uniform(-radius, radius),
+                "altitude": rand.randrange(1000, 40000, 25),
+                "v_ew": rand.uniform(-450, 450),
+                "v_ns": rand.uniform(-450, 450),
+                "vert_rate": rand.choice([0, 0, 0, rand.randrange(-3000, 3000, 64)]),
+                "cpr_format": 0,
+
+                # Type codes and velocity subtype the aircraft sends, covering every one decoded.
+                "ident_tc": rand.randrange(1, 5),
+                "position_tc": rand.randrange(9, 19),
+                "gnss_tc": rand.randrange(20, 23),
+                "velocity_sub_type": rand.randrange(1, 5)
+            })
+
+
+    def frame(self):
+        """
+        Generate one frame.
+        """
+
+        rand = self.random
+        aircraft = rand.choice(self.aircraft)
+        kind = rand.choices(self.kinds, self.weights)[0]
+        icao = aircraft['icao']
+
+        if kind == "ident":
+            me = FrameEncoder.ident(aircraft['ident_tc'], aircraft['category'],
+                aircraft['callsign'])
+            return FrameEncoder.extended_squitter(icao, me)
+
+        if kind == "position" or kind == "gnss_position":
+            # Alternate even and odd frames.
+            cpr_format = aircraft['cpr_format']
+            aircraft['cpr_format'] = cpr_format ^ 1
+
+            if kind == "position":
+                me = FrameEncoder.position(aircraft['position_tc'], aircraft['altitude'],
+                    aircraft['lat'], aircraft['lon'], cpr_format)
+            else:
+                me = FrameEncoder.position(aircraft['gnss_tc'], aircraft['altitude'] * 0.3048,
+                    aircraft['lat'], aircraft['lon'], cpr_format)
+
+            return FrameEncoder.extended_squitter(icao, me)
+
+        if kind == "velocity":
+            sub_type = aircraft['velocity_sub_type']
+
+            if sub_type <= 2:
+                me = FrameEncoder.velocity(aircraft['v_ew'], aircraft['v_ns'],
+                    aircraft['vert_rate'], sub_type)
+            else:
+                # Airspeed subtypes send the heading and speed over the ground, w/o wind.
+                heading = math.degrees(math.atan2(aircraft['v_ew'], aircraft['v_ns']))
+                me = FrameEncoder.airspeed(heading, math.hypot(aircraft['v_ew'], aircraft['v_ns']),
+                    aircraft['vert_rate'], sub_type)
+
+            return FrameEncoder.extended_squitter(icao, me)
+
+        if kind == "all_call":
+            return FrameEncoder.all_call_reply(icao)
+
+        # Altitude and identity replies.
+        if rand.random() < 0.5:
+            n = (aircraft['altitude'] + 1000) // 25
+            code = ((n >> 5) << 7) | (((n >> 4) & 0x1) << 5) | 0x10 | (n & 0xf)
+            return FrameEncoder.surveillance_reply(icao, 4, code)
+
+        return FrameEncoder.surveillance_reply(icao, 5, FrameEncoder.ident_code(aircraft['squawk']))
+
+
+    def frames(self, count):
+        """
+        Generate a list of frames.
+        """
+
+        return [self.frame() for i in range(0, count)]
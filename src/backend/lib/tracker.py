@@ -0,0 +1,246 @@
+"""
+This file is part of Flextelem. Its purpose is to support tracking the state of aircraft across
+decoded frames.
+"""
+
+import math
+import time
+
+from .cpr import CprPositions
+
+
+class AircraftState:
+    """
+    Latest known state of one aircraft. Barometric and GNSS altitudes are kept apart, both in
+    feet.
+    """
+
+    __slots__ = ('icao', 'ident', 'category', 'squawk', 'altitude', 'gnss_altitude', 'lat',
+        'lon', 'position_time', 'ground_speed', 'track', 'vert_rate', 'first_seen', 'last_seen',
+        'messages', 'expiry_tick')
+
+    # Fields copied straight from decoded frames when they're present.
+    frame_fields = [
+        ('ident', 'ident'),
+        ('aircraft_category_name', 'category'),
+        ('squawk', 'squawk'),
+        ('ground_speed', 'ground_speed'),
+        ('track', 'track'),
+        ('vert_rate', 'vert_rate')
+    ]
+
+    def __init__(self, icao, now):
+        self.icao = icao
+        self.ident = None
+        self.category = None
+        self.squawk = None
+        self.altitude = None
+        self.gnss_altitude = None
+        self.lat = None
+        self.lon = None
+        self.position_time = None
+        self.ground_speed = None
+        self.track = None
+        self.vert_rate = None
+        self.first_seen = now
+        self.last_seen = now
+        self.messages = 0
+        self.expiry_tick = None
+
+
+    def merge(self, frame, now):
+        """
+        Merge the fields of a decoded frame into this state.
+        """
+
+        for frame_field, state_field in self.frame_fields:
+            value = frame.get(frame_field)
+
+            if value is not None:
+                setattr(self, state_field, value)
+
+        altitude = frame.get('altitude')
+
+        if altitude is not None:
+            # GNSS altitudes come in meters.
+            if frame.get('altitude_type') == 'gnss':
+                if frame.get('altitude_unit') == 'm':
+                    altitude = round(altitude / 0.3048)
+
+                self.gnss_altitude = altitude
+            else:
+                self.altitude = altitude
+
+        self.last_seen = now
+        self.messages += 1
+
+
+    def to_dict(self):
+        """
+        State as a dictionary.
+        """
+
+        state = {slot: getattr(self, slot) for slot in self.__slots__}
+        state.pop('expiry_tick')
+
+        return state
+
+
+class Tracker:
+    """
+    In-memory aircraft state keyed by the integer ICAO address. Stale aircraft are evicted by a
+    timer wheel so expiry never scans the whole table.
+    """
+
+    def __init__(self, ttl=300, tick=1, positions=None, history=None, spatial=None,
+        clock=time.monotonic):
+        self.ttl = ttl
+        self.tick = tick
+        self.clock = clock
+
+        # Optional TrackStore that decoded positions are recorded to.
+        self.history = history
+
+        # Optional SpatialGrid kept up to date w/ aircraft positions.
+        self.spatial = spatial
+
+        if positions is None:
+            positions = CprPositions(clock=clock)
+
+        self.positions = positions
+
+        self.__aircraft = {}
+
+        # One bucket of ICAO addresses per tick, wide enough that a bucket is only ever due once
+        # per turn of the wheel.
+        self.__wheel = [[] for i in range(0, math.ceil(ttl / tick) + 1)]
+        self.__current_tick = None
+
+
+    def __contains__(self, icao):
+        return icao in self.__aircraft
+
+
+    def __iter__(self):
+        return iter(self.__aircraft.values())
+
+
+    def __len__(self):
+        return len(self.__aircraft)
+
+
+    def get(self, icao):
+        """
+        State for an aircraft or None.
+        """
+
+        return self.__aircraft.get(icao)
+
+
+    def update(self, frame, now=None):
+        """
+        Merge a decoded frame into the state of its aircraft. Frames timed by the caller are
+        recorded to history at that time, which should then be in seconds since the epoch.
+
+        Returns the aircraft's state or None if the frame doesn't identify an aircraft.
+        """
+
+        icao = frame.get('icao')
+
+        if icao is None:
+            icao = frame.get('aa')
+
+            if icao is None or frame.get('df') != 11:
+                return None
+
+        # History keeps its own clock for frames we time.
+        frame_time = now
+
+        if now is None:
+            now = self.clock()
+
+        self.expire(now)
+
+        icao = int(icao)
+        state = self.__aircraft.get(icao)
+
+        if state is None:
+            state = AircraftState(icao, now)
+            self.__aircraft[icao] = state
+            self.__schedule(state)
+
+        state.merge(frame, now)
+
+        # Airborne positions.
+        if 'lat-cpr' in frame:
+            position = self.positions.update(icao, frame['cpr-format'], frame['lat-cpr'],
+                frame['lon-cpr'], now)
+
+            if position is not None:
+                state.lat = position[0]
+                state.lon = position[1]
+                state.position_time = now
+
+                if self.history is not None:
+                    self.history.append_state(state, frame_time)
+
+                if self.spatial is not None:
+                    self.spatial.update(icao, position[0], position[1])
+
+        return state
+
+
+    def expire(self, now=None):
+        """
+        Turn the wheel up to now, evicting aircraft that haven't been seen within the TTL.
+        """
+
+        if now is None:
+            now = self.clock()
+
+        now_tick = math.floor(now / self.tick)
+
+        if self.__current_tick is None:
+            self.__current_tick = now_tick
+            return
+
+        wheel = self.__wheel
+        wheel_size = len(wheel)
+
+        # A full turn covers every bucket.
+        first_tick = max(self.__current_tick + 1, now_tick - wheel_size + 1)
+
+        for tick in range(first_tick, now_tick + 1):
+            bucket = wheel[tick % wheel_size]
+
+            if not bucket:
+                continue
+
+            wheel[tick % wheel_size] = []
+
+            for icao in bucket:
+                state = self.__aircraft.get(icao)
+
+                # Skip entries left behind by aircraft that have since been scheduled again.
+                if state is None or state.expiry_tick > now_tick:
+                    continue
+
+                # Aircraft seen since they were scheduled get pushed further along the wheel.
+                if math.floor((state.last_seen + self.ttl) / self.tick) > now_tick:
+                    self.__schedule(state)
+                else:
+                    del self.__aircraft[icao]
+
+                    if self.spatial is not None:
+                        self.spatial.remove(icao)
+
+        self.__current_tick = max(self.__current_tick, now_tick)
+
+
+    def __schedule(self, state):
+        """
+        Put an aircraft in the bucket for the tick it expires on.
+        """
+
+        state.expiry_tick = math.floor((state.last_seen + self.ttl) / self.tick)
+        self.__wheel[state.expiry_tick % len(self.__wheel)].append(state.icao)
@@ -1,4 +1,6 @@
 import math
+import time
+from collections import OrderedDict
 from pprint import pprint
 
 
@@ -121,11 +123,161 @@ class Slicer:
         return slices
 
 
+class CompiledDescriptor:
+    """
+    Field descriptor compiled into precomputed shifts and masks.
+    """
+
+    def __init__(self, descriptor, len_bits):
+        """
+        Compile a boundaries/labels/types descriptor for data that is len_bits long.
+        """
+
+        self.len_bits = len_bits
+        self.labels = tuple(descriptor['labels'])
+
+        fields = []
+
+        for chunk, label, type_cast in zip(descriptor['boundaries'], descriptor['labels'],
+            descriptor['types']):
+            # Chunk boundaries.
+            chunk_start = chunk[0]
+            chunk_end = chunk[1]
+
+            # Compute chunk parameters once.
+            chunk_len = chunk_end - chunk_start + 1
+            chunk_mask = (1 << chunk_len) - 1
+            chunk_shift = len_bits - chunk_end
+
+            # Byte arrays are rebuilt at the chunk's width, everything else takes the integer.
+            if type_cast is bytearray:
+                chunk_required_bytes = math.ceil(chunk_len / 8)
+                type_cast = lambda value, length=chunk_required_bytes: bytearray(
+                    value.to_bytes(length, 'big'))
+
+            fields.append((label, chunk_shift, chunk_mask, type_cast))
+
+        self.fields = tuple(fields)
+
+        # Shift and mask by label for callers that extract fields themselves.
+        self.layout = {label: (shift, mask) for label, shift, mask, type_cast in fields}
+
+        # Record attribute names can't have dashes.
+        self.slots = tuple(label.replace('-', '_') for label in self.labels)
+
+
+    def unpack(self, bin_data):
+        """
+        Unpack binary data or its integer value into a dictionary of typed fields.
+        """
+
+        if type(bin_data) is not int:
+            bin_data = int.from_bytes(bin_data, 'big')
+
+        return {label: type_cast((bin_data >> shift) & mask)
+            for label, shift, mask, type_cast in self.fields}
+
+
+    def unpack_into(self, record, bin_data):
+        """
+        Unpack binary data or its integer value into the attributes of a record.
+        """
+
+        if type(bin_data) is not int:
+            bin_data = int.from_bytes(bin_data, 'big')
+
+        for slot, (label, shift, mask, type_cast) in zip(self.slots, self.fields):
+            setattr(record, slot, type_cast((bin_data >> shift) & mask))
+
+        return record
+
+
+    def values(self, bin_data):
+        """
+        Unpack binary data or its integer value into a tuple of typed fields in label order.
+        """
+
+        if type(bin_data) is not int:
+            bin_data = int.from_bytes(bin_data, 'big')
+
+        return tuple(type_cast((bin_data >> shift) & mask)
+            for label, shift, mask, type_cast in self.fields)
+
+
+class Record:
+    """
+    Compact decoded record with fixed fields. Subclasses name their fields in __slots__, mapping
+    any with a different dictionary key in dict_keys. Fields that were never set are left out of
+    to_dict(), and a record in the message field is merged into it.
+    """
+
+    __slots__ = ()
+
+    dict_keys = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        cls.record_fields = tuple((slot, cls.dict_keys.get(slot, slot)) for slot in cls.__slots__)
+
+
+    def __reduce__(self):
+        state = tuple(getattr(self, slot, None) for slot in self.__slots__)
+
+        return (type(self).from_state, (state,))
+
+
+    def __repr__(self):
+        return "%s(%s)" %(type(self).__name__, self.to_dict())
+
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Rebuild a record from a tuple of its fields in slot order without decoding anything.
+        """
+
+        record = object.__new__(cls)
+
+        for slot, value in zip(cls.__slots__, state):
+            if value is not None:
+                setattr(record, slot, value)
+
+        return record
+
+
+    def to_dict(self):
+        """
+        Record in the dictionary shape of the original decoders.
+        """
+
+        decoded = {}
+
+        for slot, key in self.record_fields:
+            value = getattr(self, slot, None)
+
+            if value is None:
+                continue
+
+            if slot == 'message':
+                if type(value) is dict:
+                    decoded.update(value)
+                else:
+                    decoded.update(value.to_dict())
+            else:
+                decoded[key] = value
+
+        return decoded
+
+
 class AdsbCrc:
     """
     ADS-B CRC funcitons
     """
 
+    crc_poly = 0xfff409
+    bitmask = 0xffffff
+
     def compute_crc_table():
         """
         Create CRC value table for improved CRC computation performance.
@@ -150,3 +302,245 @@ class AdsbCrc:
             crc_table.append((crc & bitmask))
         
         return crc_table
+
+
+    @staticmethod
+    def compute_position_tables(data_bytes):
+        """
+        Create one CRC table per byte position for data of a fixed length so the CRC can be
+        computed slice-by-N as an XOR of independent lookups.
+
+        Returns a list of data_bytes tables, one per byte position.
+        """
+
+        crc_table = AdsbCrc.crc_table
+        bitmask = AdsbCrc.bitmask
+        position_tables = []
+
+        for position in range(0, data_bytes):
+            # CRC of the byte followed by zero bytes for each remaining position.
+            zero_bytes = data_bytes - position - 1
+            table = []
+
+            for i in range(0, 256):
+                crc = crc_table[i]
+
+                for j in range(0, zero_bytes):
+                    crc = (crc_table[(crc >> 16) & 0xff] ^ (crc << 8)) & bitmask
+
+                table.append(crc)
+
+            position_tables.append(table)
+
+        return position_tables
+
+
+    @staticmethod
+    def crc(data):
+        """
+        Compute the CRC of data one byte at a time using the shared CRC table.
+        """
+
+        crc_table = AdsbCrc.crc_table
+        crc = 0
+
+        for data_byte in data:
+            crc = crc_table[((crc >> 16) ^ data_byte) & 0xff] ^ (crc << 8)
+
+        return crc & AdsbCrc.bitmask
+
+
+    @staticmethod
+    def crc_sliced(data):
+        """
+        Compute the CRC of 4 or 11 bytes of data from the per-position tables. Other lengths fall
+        back to the byte-wise computation.
+        """
+
+        try:
+            position_tables = AdsbCrc.position_tables[len(data)]
+        except KeyError:
+            return AdsbCrc.crc(data)
+
+        crc = 0
+
+        for table, data_byte in zip(position_tables, data):
+            crc ^= table[data_byte]
+
+        return crc
+
+
+    @staticmethod
+    def compute_syndrome_tables(frame_bytes):
+        """
+        Create syndrome to bit position lookup tables for single and double bit errors in a frame
+        of frame_bytes. Bit positions are 1-based from the start of the frame. Syndromes shared by
+        more than one error pattern are left out since they can't be corrected unambiguously.
+
+        Returns a dictionary of tables keyed by the number of bits in error.
+        """
+
+        data_bytes = frame_bytes - 3
+        frame_bits = frame_bytes * 8
+        position_tables = AdsbCrc.position_tables[data_bytes]
+
+        # Syndrome of each single flipped bit. CRC bits show up in the syndrome directly.
+        bit_syndromes = []
+
+        for bit in range(0, frame_bits):
+            if bit < data_bytes * 8:
+                bit_syndromes.append(position_tables[bit // 8][0x80 >> (bit % 8)])
+            else:
+                bit_syndromes.append(1 << (frame_bits - bit - 1))
+
+        single = {}
+
+        for bit in range(0, frame_bits):
+            single[bit_syndromes[bit]] = (bit + 1,)
+
+        double = {}
+        ambiguous = set()
+
+        for bit_a in range(0, frame_bits):
+            for bit_b in range(bit_a + 1, frame_bits):
+                syndrome = bit_syndromes[bit_a] ^ bit_syndromes[bit_b]
+
+                if syndrome in double or syndrome in single:
+                    ambiguous.add(syndrome)
+                else:
+                    double[syndrome] = (bit_a + 1, bit_b + 1)
+
+        for syndrome in ambiguous:
+            double.pop(syndrome, None)
+
+        return {1: single, 2: double}
+
+
+    @staticmethod
+    def correct(frame, syndrome, max_bits=1):
+        """
+        Fix up to max_bits bit errors in a frame given its CRC syndrome.
+
+        Returns a tuple of the corrected frame as a bytearray and the 1-based bit positions that
+        were flipped, or None if the syndrome can't be corrected.
+        """
+
+        try:
+            syndrome_tables = AdsbCrc.syndrome_tables[len(frame)]
+        except KeyError:
+            return None
+
+        for error_bits in range(1, max_bits + 1):
+            bits = syndrome_tables[error_bits].get(syndrome)
+
+            if bits is not None:
+                corrected = bytearray(frame)
+
+                for bit in bits:
+                    corrected[(bit - 1) // 8] ^= 0x80 >> ((bit - 1) % 8)
+
+                return (corrected, bits)
+
+        return None
+
+
+class IcaoIndex:
+    """
+    Index of recently confirmed ICAO aircraft addresses that expire after a TTL.
+    """
+
+    def __init__(self, ttl=60, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+
+        # Addresses ordered by when they were last confirmed, oldest first.
+        self.__last_seen = OrderedDict()
+
+
+    def __contains__(self, icao):
+        return self.check(icao)
+
+
+    def __len__(self):
+        return len(self.__last_seen)
+
+
+    def confirm(self, icao, now=None):
+        """
+        Mark an address as confirmed by a frame with a clean CRC.
+        """
+
+        if now is None:
+            now = self.clock()
+
+        self.__last_seen[icao] = now
+        self.__last_seen.move_to_end(icao)
+
+        self.expire(now)
+
+
+    def check(self, icao, now=None):
+        """
+        Is this address confirmed and still fresh?
+        """
+
+        last_seen = self.__last_seen.get(icao)
+
+        if last_seen is None:
+            return False
+
+        if now is None:
+            now = self.clock()
+
+        if now - last_seen > self.ttl:
+            del self.__last_seen[icao]
+            return False
+
+        return True
+
+
+    def expire(self, now=None):
+        """
+        Drop addresses that haven't been confirmed within the TTL.
+        """
+
+        if now is None:
+            now = self.clock()
+
+        last_seen = self.__last_seen
+
+        while last_seen:
+            icao, seen = next(iter(last_seen.items()))
+
+            if now - seen <= self.ttl:
+                break
+
+            last_seen.popitem(last=False)
+
+
+class NullMetrics:
+    """
+    Metrics collector that records nothing. Decoders hold one of these until metrics are enabled.
+    """
+
+    enabled = False
+
+    def frame(self, decoded):
+        """
+        Record a decoded frame.
+        """
+
+        pass
+
+
+# Compute CRC tables once at import time. Frame data is 4 (short) or 11 (extended) bytes.
+AdsbCrc.crc_table = AdsbCrc.compute_crc_table()
+AdsbCrc.position_tables = {
+    4: AdsbCrc.compute_position_tables(4),
+    11: AdsbCrc.compute_position_tables(11)
+}
+
+# Error correction is only attempted on extended squitters, where the CRC isn't overlaid.
+AdsbCrc.syndrome_tables = {
+    14: AdsbCrc.compute_syndrome_tables(14)
+}
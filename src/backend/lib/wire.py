@@ -0,0 +1,360 @@
+"""
+This file is part of Flextelem. Its purpose is to support a compact binary encoding of aircraft
+state snapshots, state deltas and frames for sending over slow links.
+"""
+
+import struct
+
+from .adsb import WakeVortexCategory
+
+
+class WireCodec:
+    """
+    Binary encoding of the snapshots and deltas StateView produces, and of raw frames. Messages
+    lead w/ a header of their type, tick and record count. Each aircraft record is a fixed-width
+    ICAO address and a bitmask of the fields that follow, so deltas only carry the fields that
+    changed, and fields that were cleared go in a record of their own. Fields are scaled ints,
+    and the struct for each bitmask is compiled once.
+    """
+
+    # Message type, tick, record count.
+    header_struct = struct.Struct("<BIH")
+
+    # ICAO address and field bitmask that lead each record.
+    record_head_struct = struct.Struct("<IH")
+
+    # Frame timestamp and length, followed by the frame.
+    frame_struct = struct.Struct("<dB")
+
+    snapshot_type = 1
+    delta_type = 2
+    frames_type = 3
+
+    # Set in a record's bitmask for an aircraft that's gone.
+    removed_flag = 0x8000
+
+    # Set in a record's bitmask of fields an aircraft no longer has. No values follow.
+    cleared_flag = 0x4000
+
+    # Field, struct format and scale, None for fields converted by encode_field().
+    fields = [
+        ("ident", "8s", None),
+        ("category", "B", None),
+        ("squawk", "H", None),
+        ("altitude", "i", 1),
+        ("gnss_altitude", "i", 1),
+        ("lat", "i", 100000),
+        ("lon", "i", 100000),
+        ("ground_speed", "H", 10),
+        ("track", "H", 10),
+        ("vert_rate", "h", 1)
+    ]
+
+    # Every wake vortex category name.
+    categories = sorted(set(name for names in WakeVortexCategory.tc_ca_matrix if names is not None
+        for name in names))
+
+    # Name -> code.
+    category_codes = {name: code for code, name in enumerate(categories)}
+
+    # Bitmask -> compiled record struct.
+    record_structs = {}
+
+    # Bitmask -> (field, scale) tuples in record order.
+    record_fields = {}
+
+    # Tuple of field names -> record plan.
+    record_plans = {}
+
+    @staticmethod
+    def record_struct(mask):
+        """
+        Record struct for a bitmask of fields, compiled on first use.
+        """
+
+        record_struct = WireCodec.record_structs.get(mask)
+
+        if record_struct is None:
+            record_format = "<IH"
+            record_fields = []
+
+            for bit, (field, field_format, scale) in enumerate(WireCodec.fields):
+                if mask & (1 << bit):
+                    record_format += field_format
+                    record_fields.append((field, scale))
+
+            record_struct = struct.Struct(record_format)
+            WireCodec.record_structs[mask] = record_struct
+            WireCodec.record_fields[mask] = record_fields
+
+        return record_struct
+
+
+    @staticmethod
+    def record_plan(field_names):
+        """
+        Bitmask, record struct and (field, scale) tuples in record order for a tuple of field
+        names, kept for the next record w/ the same fields.
+        """
+
+        mask = 0
+        field_plan = []
+
+        for bit, (field, field_format, scale) in enumerate(WireCodec.fields):
+            if field in field_names:
+                mask |= 1 << bit
+                field_plan.append((field, scale))
+
+        if len(field_plan) != len(field_names):
+            unknown = set(field_names) - set(field for field, scale in field_plan)
+            raise ValueError("Unknown wire fields: %s." %", ".join(sorted(unknown)))
+
+        plan = (mask, WireCodec.record_struct(mask), field_plan)
+        WireCodec.record_plans[field_names] = plan
+
+        return plan
+
+
+    @staticmethod
+    def cleared_mask(field_names):
+        """
+        Bitmask of a cleared fields record.
+        """
+
+        mask = WireCodec.cleared_flag
+        known = []
+
+        for bit, (field, field_format, scale) in enumerate(WireCodec.fields):
+            if field in field_names:
+                mask |= 1 << bit
+                known.append(field)
+
+        if len(known) != len(field_names):
+            unknown = set(field_names) - set(known)
+            raise ValueError("Unknown wire fields: %s." %", ".join(sorted(unknown)))
+
+        return mask
+
+
+    @staticmethod
+    def encode_field(field, value):
+        """
+        Encode one field's value as the int or bytes its struct format takes.
+        """
+
+        if field == "ident":
+            return value.encode('ascii')
+
+        if field == "category":
+            return WireCodec.category_codes[value]
+
+        if field == "squawk":
+            return int(value, 8)
+
+        return value
+
+
+    @staticmethod
+    def decode_field(field, value):
+        """
+        Decode one field's value from what its struct format gave.
+        """
+
+        if field == "ident":
+            return value.rstrip(b"\x00").decode('ascii')
+
+        if field == "category":
+            return WireCodec.categories[value]
+
+        if field == "squawk":
+            return "%04o" %value
+
+        return value
+
+
+    @staticmethod
+    def encode(message_type, event):
+        """
+        Encode a StateView snapshot or delta dictionary as a message of the given type.
+
+        Returns bytes.
+        """
+
+        aircraft = event['aircraft']
+        removed = event.get('removed', [])
+        encode_field = WireCodec.encode_field
+
+        # The header goes in once the records are counted.
+        message = [b""]
+        record_ct = len(aircraft) + len(removed)
+
+        plans = WireCodec.record_plans
+        plan_for = WireCodec.record_plan
+
+        for icao, fields in aircraft.items():
+            if type(icao) is str:
+                icao = int(icao, 16)
+
+            # Cleared fields go in a record of their own.
+            if None in fields.values():
+                cleared = [field for field, value in fields.items() if value is None]
+                fields = {field: value for field, value in fields.items() if value is not None}
+
+                message.append(WireCodec.record_head_struct.pack(icao,
+                    WireCodec.cleared_mask(cleared)))
+
+                # Aircraft w/ only cleared fields have no record of values.
+                if not fields:
+                    continue
+
+                record_ct += 1
+
+            # Records w/ the same fields share a plan.
+            plan = plans.get(tuple(fields))
+
+            if plan is None:
+                plan = plan_for(tuple(fields))
+
+            mask, record_struct, field_plan = plan
+            values = []
+
+            for field, scale in field_plan:
+                if scale is None:
+                    values.append(encode_field(field, fields[field]))
+                else:
+                    values.append(round(fields[field] * scale))
+
+            message.append(record_struct.pack(icao, mask, *values))
+
+        removed_struct = WireCodec.record_struct(WireCodec.removed_flag)
+
+        for icao in removed:
+            if type(icao) is str:
+                icao = int(icao, 16)
+
+            message.append(removed_struct.pack(icao, WireCodec.removed_flag))
+
+        message[0] = WireCodec.header_struct.pack(message_type, event['tick'], record_ct)
+
+        return b"".join(message)
+
+
+    @staticmethod
+    def encode_snapshot(snapshot):
+        """
+        Encode a StateView snapshot.
+        """
+
+        return WireCodec.encode(WireCodec.snapshot_type, snapshot)
+
+
+    @staticmethod
+    def encode_delta(delta):
+        """
+        Encode a StateView delta.
+        """
+
+        return WireCodec.encode(WireCodec.delta_type, delta)
+
+
+    @staticmethod
+    def encode_frames(frames, tick=0):
+        """
+        Encode a list of (timestamp, frame) tuples w/ 7 or 14 byte frames.
+        """
+
+        pack = WireCodec.frame_struct.pack
+        message = [WireCodec.header_struct.pack(WireCodec.frames_type, tick, len(frames))]
+
+        for timestamp, frame in frames:
+            message.append(pack(timestamp, len(frame)))
+            message.append(bytes(frame))
+
+        return b"".join(message)
+
+
+    @staticmethod
+    def decode(message):
+        """
+        Decode a message.
+
+        Returns the message type and a dictionary like the one encoded, where aircraft are keyed by
+        hex ICAO address. Frame messages decode to a tick and a list of (timestamp, frame) tuples.
+        """
+
+        message_type, tick, record_ct = WireCodec.header_struct.unpack_from(message, 0)
+        cursor = WireCodec.header_struct.size
+
+        if message_type == WireCodec.frames_type:
+            return (message_type, {"tick": tick,
+                "frames": WireCodec.__decode_frames(message, cursor, record_ct)})
+
+        if message_type not in [WireCodec.snapshot_type, WireCodec.delta_type]:
+            raise ValueError("Unknown wire message type %s." %message_type)
+
+        unpack_head = WireCodec.record_head_struct.unpack_from
+        decode_field = WireCodec.decode_field
+
+        aircraft = {}
+        removed = []
+
+        head_bytes = WireCodec.record_head_struct.size
+        fields_by_bit = WireCodec.fields
+
+        for i in range(0, record_ct):
+            icao, mask = unpack_head(message, cursor)
+
+            if mask & WireCodec.cleared_flag:
+                cursor += head_bytes
+                fields = aircraft.setdefault("%06x" %icao, {})
+
+                for bit, (field, field_format, scale) in enumerate(fields_by_bit):
+                    if mask & (1 << bit):
+                        fields[field] = None
+
+                continue
+
+            record_struct = WireCodec.record_struct(mask)
+            values = record_struct.unpack_from(message, cursor)[2:]
+            cursor += record_struct.size
+
+            if mask & WireCodec.removed_flag:
+                removed.append("%06x" %icao)
+                continue
+
+            fields = {}
+
+            for (field, scale), value in zip(WireCodec.record_fields[mask], values):
+                if scale is None:
+                    fields[field] = decode_field(field, value)
+                elif scale == 1:
+                    fields[field] = value
+                else:
+                    fields[field] = value / scale
+
+            aircraft.setdefault("%06x" %icao, {}).update(fields)
+
+        event = {"tick": tick, "aircraft": aircraft}
+
+        if removed:
+            event['removed'] = removed
+
+        return (message_type, event)
+
+
+    def __decode_frames(message, cursor, frame_ct):
+        """
+        Decode frame_ct (timestamp, frame) tuples starting at cursor.
+        """
+
+        unpack_from = WireCodec.frame_struct.unpack_from
+        head_bytes = WireCodec.frame_struct.size
+        frames = []
+
+        for i in range(0, frame_ct):
+            timestamp, frame_bytes = unpack_from(message, cursor)
+            cursor += head_bytes
+            frames.append((timestamp, bytes(message[cursor:cursor + frame_bytes])))
+            cursor += frame_bytes
+
+        return frames
@@ -0,0 +1,70 @@
+"""
+Address/parity recovery and squawk tests.
+"""
+
+from lib import *
+
+
+# Replies w/ the addresses their address/parity fields carry.
+replies = [
+    ("2000171806A983", 0x4ca7e8),
+    ("2A00516D492B80", 0x510af9),
+    ("A0001839CA3800315800007448D9", 0x400940),
+    ("A800292DFFBBA9383FFCEB903D01", 0xd9938e)
+]
+
+
+def test_recovered_addresses():
+    """
+    DF4/5/20/21 replies recover their address once it's confirmed.
+    """
+
+    icao_index = IcaoIndex()
+
+    for frame, address in replies:
+        assert AddressParity(bytes.fromhex(frame), icao_index) is None
+        assert ADSBFrame(frame, 0, icao_index) is None
+
+        icao_index.confirm(address)
+
+        assert AddressParity(bytes.fromhex(frame), icao_index)['icao'] == "%06x" %address
+
+        decoded = ADSBFrame(frame, 0, icao_index)
+        assert decoded['icao'] == "%06x" %address
+        assert decoded['crc_match'] is True
+
+
+def test_expired_addresses():
+    """
+    Replies from addresses that have expired from the index are dropped.
+    """
+
+    now = [0]
+    icao_index = IcaoIndex(ttl=10, clock=lambda: now[0])
+    frame, address = replies[0]
+
+    icao_index.confirm(address)
+    assert ADSBFrame(frame, 0, icao_index)['altitude'] == 36000
+
+    now[0] = 11
+    assert ADSBFrame(frame, 0, icao_index) is None
+
+
+def test_squawks():
+    """
+    Squawks come out of the ID field in A, B, C, D digit order.
+    """
+
+    icao_index = IcaoIndex()
+
+    for frame, address in replies:
+        icao_index.confirm(address)
+
+    assert ADSBFrame("2A00516D492B80", 0, icao_index)['squawk'] == "0356"
+    assert ADSBFrame("A800292DFFBBA9383FFCEB903D01", 0, icao_index)['squawk'] == "1346"
+
+    # Each digit's bits.
+    assert Squawk(0b0101010000000) == "7000"
+    assert Squawk(0b0000000101010) == "0700"
+    assert Squawk(0b1010100000000) == "0070"
+    assert Squawk(0b0000000010101) == "0007"
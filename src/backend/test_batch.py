@@ -0,0 +1,104 @@
+"""
+NumPy batch decoder tests, checked against ADSBFrame.
+"""
+
+import math
+
+import pytest
+
+from lib import *
+from lib.synth import FrameGenerator
+
+np = pytest.importorskip("numpy")
+
+
+known_frames = [
+    bytes.fromhex("8D4840D6202CC371C32CE0576098"),
+    bytes.fromhex("8D40621D58C382D690C8AC2863A7"),
+    bytes.fromhex("8D485020994409940838175B284F"),
+    bytes.fromhex("8DA05F219B06B6AF189400CBC33F"),
+    bytes.fromhex("8D40621D58C386435CC412692AD6")
+]
+
+
+def generated(frame_bytes):
+    """
+    Synthetic frames of one length.
+    """
+
+    return [frame for frame in FrameGenerator(aircraft=50, seed=2).frames(3000)
+        if len(frame) == frame_bytes]
+
+
+def test_extended_squitters():
+    """
+    Batch columns match ADSBFrame for extended squitters.
+    """
+
+    frames = known_frames + generated(14)
+    batch = ADSBBatch(b"".join(frames))
+
+    assert batch['frame_count'] == len(frames)
+
+    for i, frame in enumerate(frames):
+        decoded = ADSBFrame(frame)
+
+        assert batch['crc_match'][i] == decoded['crc_match']
+        assert int(batch['crc'][i]) == int(decoded['crc_hex'], 16)
+        assert "%06x" %batch['icao'][i] == decoded['icao']
+        assert batch['me_type'][i] == decoded['me_type']
+
+        if batch['is_position'][i]:
+            assert batch['altitude_valid'][i]
+            assert batch['altitude'][i] == decoded['altitude']
+            assert batch['altitude_gnss'][i] == (decoded['altitude_type'] == 'gnss')
+            assert batch['cpr_format'][i] == decoded['cpr-format']
+            assert batch['lat_cpr'][i] == decoded['lat-cpr']
+            assert batch['lon_cpr'][i] == decoded['lon-cpr']
+
+        if batch['is_velocity'][i]:
+            assert batch['sub_type'][i] == decoded['sub_type']
+            assert batch['vert_rate'][i] == decoded['vert_rate']
+
+            if decoded['sub_type'] in [1, 2]:
+                assert batch['velocity_ew'][i] == decoded['velocity_ew']
+                assert batch['velocity_ns'][i] == decoded['velocity_ns']
+                assert batch['ground_speed'][i] == pytest.approx(decoded['ground_speed'])
+
+                if decoded['track'] is None:
+                    assert math.isnan(batch['track'][i])
+                else:
+                    assert batch['track'][i] == pytest.approx(decoded['track'])
+
+            else:
+                assert batch['heading'][i] == pytest.approx(decoded['heading'])
+                assert batch['airspeed'][i] == decoded['airspeed']
+                assert batch['airspeed_tas'][i] == (decoded['airspeed_type'] == 'tas')
+
+
+def test_all_call_replies():
+    """
+    Batch columns match ADSBFrame for all-call replies.
+    """
+
+    frames = [frame for frame in generated(7) if frame[0] >> 3 == 11]
+    batch = ADSBBatch(b"".join(frames), 7)
+
+    for i, frame in enumerate(frames):
+        decoded = ADSBFrame(frame)
+
+        assert batch['df'][i] == 11
+        assert batch['crc_match'][i] == decoded['crc_match']
+        assert "%06x" %batch['aa'][i] == decoded['aa']
+
+
+def test_bad_buffers():
+    """
+    Buffers that don't hold whole frames raise.
+    """
+
+    with pytest.raises(ValueError):
+        ADSBBatch(bytes(20))
+
+    with pytest.raises(ValueError):
+        ADSBBatch(np.zeros((2, 9), dtype=np.uint8))
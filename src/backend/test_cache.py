@@ -0,0 +1,73 @@
+"""
+Decode cache tests.
+"""
+
+import pytest
+
+from lib import *
+from test_stream import beast_message
+
+
+frame = bytes.fromhex("8D4840D6202CC371C32CE0576098")
+
+
+def test_stream_cache_settings():
+    """
+    Decode settings can't be given alongside a cache, which has its own.
+    """
+
+    with pytest.raises(ValueError):
+        list(FrameStream.decode([], DecodeCache(), fix_bits=1))
+
+
+def test_stream_cache_frame_times(tmp_path):
+    """
+    The cache window is timed by frame timestamps in the units given, or by the cache's clock.
+    """
+
+    data = beast_message(frame, 0) + beast_message(frame, 6000000) + \
+        beast_message(frame, 24000000)
+
+    cache = DecodeCache(window=1, clock=lambda: 0)
+    decoded = list(FrameStream.decode(BeastReader().frames([data]), cache,
+        FrameStream.mlat_clock_hz))
+
+    assert [each['timestamp'] for each in decoded] == [0, 24000000]
+    assert cache.duplicates == 1
+
+    # MLAT counters from different receivers can't be compared, so they aren't used by default.
+    cache = DecodeCache(window=1, clock=lambda: 0)
+
+    assert len(list(FrameStream.decode(BeastReader().frames([data]), cache))) == 1
+
+    # Capture timestamps are seconds.
+    path = str(tmp_path / "test.cap")
+
+    with CaptureWriter(path) as writer:
+        for i in range(0, 5):
+            writer.write(frame, 1000.0 + (i * 3600))
+
+    cache = DecodeCache(window=1, clock=lambda: 0)
+
+    with CaptureReader(path) as reader:
+        decoded = list(FrameStream.decode(reader.frames(), cache, 1))
+
+    assert len(decoded) == 5
+
+
+def test_collapsed_copies_confirm():
+    """
+    Copies collapsed by the window still keep their address in the index.
+    """
+
+    now = [0]
+    icao_index = IcaoIndex(ttl=10, clock=lambda: now[0])
+    cache = DecodeCache(icao_index=icao_index, window=100, clock=lambda: now[0])
+
+    assert cache.decode(frame) is not None
+
+    now[0] = 8
+    assert cache.decode(frame) is None
+
+    now[0] = 15
+    assert icao_index.check(0x4840d6)
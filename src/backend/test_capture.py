@@ -0,0 +1,125 @@
+"""
+Capture file tests.
+"""
+
+import os
+
+from lib import *
+
+
+frames = [
+    bytes.fromhex("8D4840D6202CC371C32CE0576098"),
+    bytes.fromhex("8D40621D58C382D690C8AC2863A7"),
+    bytes.fromhex("8D40621D58C386435CC412692AD6"),
+    bytes.fromhex("5D484FDEA248F5")
+]
+
+
+def write_capture(path, count=40, start=1000.0, step=10.0):
+    """
+    Write count records step seconds apart, cycling through the frames.
+    """
+
+    with CaptureWriter(path) as writer:
+        for i in range(0, count):
+            writer.write(frames[i % len(frames)], start + (i * step), i % 256, i % 3)
+
+
+def read_all(reader, **query):
+    """
+    Records matching a query w/ their frames as bytes.
+    """
+
+    return [(bytes(frame), timestamp, signal, receiver) for frame, timestamp, signal, receiver in
+        reader.records(**query)]
+
+
+def test_write_read(tmp_path):
+    """
+    Records read back as they were written.
+    """
+
+    path = str(tmp_path / "test.cap")
+    write_capture(path)
+
+    with CaptureReader(path) as reader:
+        assert len(reader) == 40
+
+        records = read_all(reader)
+
+        assert records[0] == (frames[0], 1000.0, 0, 0)
+        assert records[5] == (frames[1], 1050.0, 5, 2)
+        assert records[39] == (frames[3], 1390.0, 39, 0)
+
+
+def test_queries(tmp_path):
+    """
+    Time and ICAO queries match a scan of every record.
+    """
+
+    path = str(tmp_path / "test.cap")
+    write_capture(path)
+
+    with CaptureReader(path) as reader:
+        every = list(enumerate(read_all(reader)))
+
+        for start, end, icao in [(None, None, "40621d"), (1055, 1200, None),
+            (1055, 1200, 0x40621d), (1060, 1060, None), (2000, None, None), (None, 1000, None),
+            (1000, 1001, "4840d6")]:
+            expected = [record for record, (frame, timestamp, signal, receiver) in every
+                if (start is None or timestamp >= start) and (end is None or timestamp < end) and
+                (icao is None or ADSBFrame.frame_address(frame) ==
+                (int(icao, 16) if type(icao) is str else icao))]
+
+            assert list(reader.select(start, end, icao)) == expected
+
+        assert list(reader.select(1055, 1200)) == list(range(6, 20))
+
+
+def test_indexes(tmp_path):
+    """
+    Saved indexes load to the same answers, and missing ones are rebuilt.
+    """
+
+    path = str(tmp_path / "test.cap")
+    write_capture(path)
+
+    index = CaptureIndex.load(path)
+
+    assert index is not None
+    assert index.record_ct == 40
+
+    # Whole 60 second buckets, from 1020 up to 1260.
+    assert index.time_range(1055, 1200) == (2, 26)
+    assert index.time_range(2000, None) == (0, 0)
+    assert list(index.icao_records(0x4840d6)) == list(range(0, 40, 4))
+
+    os.remove(path + ".iidx")
+
+    with CaptureReader(path) as reader:
+        assert list(reader.select(icao="4840d6")) == list(range(0, 40, 4))
+
+
+def test_torn_write(tmp_path):
+    """
+    Reopening a capture w/ a partly written last record drops it before appending.
+    """
+
+    path = str(tmp_path / "test.cap")
+    write_capture(path, 5)
+
+    # A crash mid-record leaves a torn tail and stale indexes.
+    with open(path, 'ab') as capture_file:
+        capture_file.write(b"\x01" * 10)
+
+    with CaptureWriter(path) as writer:
+        writer.write(frames[1], 2000.0, 7, 1)
+
+    assert os.path.getsize(path) == CaptureFormat.header_bytes + (6 * CaptureFormat.record_bytes)
+
+    with CaptureReader(path) as reader:
+        records = read_all(reader)
+
+        assert len(records) == 6
+        assert records[5] == (frames[1], 2000.0, 7, 1)
+        assert list(reader.select(2000, None)) == [5]
@@ -0,0 +1,109 @@
+"""
+Comm-B register inference tests.
+"""
+
+import pytest
+
+from lib import *
+
+
+def reply_address(frame):
+    """
+    Address a Comm-B reply's address/parity field carries.
+    """
+
+    frame = bytes.fromhex(frame)
+
+    return AdsbCrc.crc_sliced(frame[:-3]) ^ int.from_bytes(frame[-3:], 'big')
+
+
+def decode(frame, bds_inference):
+    """
+    Decode a Comm-B reply from a confirmed address.
+    """
+
+    icao_index = IcaoIndex()
+    icao_index.confirm(reply_address(frame))
+
+    return ADSBFrame(frame, 0, icao_index, bds_inference=bds_inference)
+
+
+def test_registers():
+    """
+    Known replies decode to their registers.
+    """
+
+    bds_inference = BdsInference()
+
+    decoded = decode("A000083E202CC371C31DE0AA1CCF", bds_inference)
+    assert decoded['bds'] == "2,0" and decoded['ident'] == "KLM1017 "
+
+    decoded = decode("A000029C85E42F313000007047D3", bds_inference)
+    assert decoded['bds'] == "4,0" and decoded['selected_altitude_mcp'] == 3008
+
+    decoded = decode("A000139381951536E024D4CCF6B5", bds_inference)
+    assert decoded['bds'] == "5,0" and decoded['roll'] == 2.11
+
+    decoded = decode("A00004128F39F91A7E27C46ADC21", bds_inference)
+    assert decoded['bds'] == "6,0" and decoded['heading'] == 42.71
+
+    # 5,0 and 6,0 are candidates too, but only 4,0 makes sense.
+    frame = "A0001838CA3E51F0A8000047A36A"
+    mb = int(frame[8:22], 16)
+
+    assert BdsInference.candidates(mb) == ["4,0", "5,0", "6,0"]
+    assert decode(frame, bds_inference)['bds'] == "4,0"
+
+
+def test_profiles():
+    """
+    Profiles only pick between registers that decode.
+    """
+
+    bds_inference = BdsInference(clock=lambda: 0)
+    mb_40 = int("A0001838CA3E51F0A8000047A36A"[8:22], 16)
+    mb_50 = int("A000139381951536E024D4CCF6B5"[8:22], 16)
+    mb_60 = int("A00004128F39F91A7E27C46ADC21"[8:22], 16)
+
+    # Both 5,0 and 6,0 decode.
+    mb = 0xe7f86716bc6c48
+
+    assert bds_inference.decode(0x4840d6, mb) == {'bds_candidates': ["5,0", "6,0"]}
+
+    # A profile of 6,0 settles it w/o decoding 5,0, but not replies only 4,0 makes sense of.
+    assert bds_inference.decode(0x4840d6, mb_60)['bds'] == "6,0"
+    decodes = bds_inference.decodes
+    assert bds_inference.decode(0x4840d6, mb)['bds'] == "6,0"
+    assert bds_inference.decodes == decodes + 1
+    assert bds_inference.decode(0x4840d6, mb_40)['bds'] == "4,0"
+    assert bds_inference.profile_hits == 1
+
+    # Once both are in the profile it can't pick.
+    assert bds_inference.decode(0x4840d6, mb_50)['bds'] == "5,0"
+    assert bds_inference.decode(0x4840d6, mb) == {'bds_candidates': ["5,0", "6,0"]}
+
+
+def test_stale_profiles():
+    """
+    Registers that haven't decoded within the TTL don't settle anything.
+    """
+
+    now = [0]
+    bds_inference = BdsInference(ttl=60, clock=lambda: now[0])
+    mb_60 = int("A00004128F39F91A7E27C46ADC21"[8:22], 16)
+    mb = 0xe7f86716bc6c48
+
+    assert bds_inference.decode(0x4840d6, mb_60)['bds'] == "6,0"
+
+    now[0] = 61
+    assert bds_inference.decode(0x4840d6, mb) == {'bds_candidates': ["5,0", "6,0"]}
+    assert bds_inference.profile_hits == 0
+
+
+def test_needs_icao_index():
+    """
+    Comm-B replies can't be inferred w/o an index to check their addresses.
+    """
+
+    with pytest.raises(ValueError):
+        ADSBFrame("A000083E202CC371C31DE0AA1CCF", bds_inference=BdsInference())
@@ -0,0 +1,108 @@
+"""
+CPR position decoding tests.
+"""
+
+import pytest
+
+from lib import *
+from lib.synth import FrameEncoder
+
+
+# Even and odd (lat_cpr, lon_cpr) of 8D40621D58C382D690C8AC2863A7 and 8D40621D58C386435CC412692AD6.
+even = (93000, 51372)
+odd = (74158, 50194)
+
+
+def test_global_position():
+    """
+    A known even/odd pair decodes for whichever of them is newest.
+    """
+
+    assert Cpr.global_position(even, odd, False) == pytest.approx((52.2572021484375,
+        3.91937255859375))
+    assert Cpr.global_position(even, odd, True) == pytest.approx((52.26578017412606,
+        3.938912527901786))
+
+
+def test_local_position():
+    """
+    Local decodes against a nearby reference match the global decode.
+    """
+
+    assert Cpr.local_position(0, even[0], even[1], 52.258, 3.918) == \
+        Cpr.global_position(even, odd, False)
+
+    for lat, lon in [(52.3, 4.8), (-33.9, 151.2), (0.1, -0.1), (64.1, -21.9)]:
+        for cpr_format in [0, 1]:
+            lat_cpr, lon_cpr = FrameEncoder.cpr(lat, lon, cpr_format)
+            decoded = Cpr.local_position(cpr_format, lat_cpr, lon_cpr, lat + 0.5, lon - 0.5)
+
+            assert decoded == pytest.approx((lat, lon), abs=0.001)
+
+
+def test_local_position_antimeridian():
+    """
+    Local decodes across the antimeridian wrap into [-180, 180).
+    """
+
+    lat_cpr, lon_cpr = FrameEncoder.cpr(52, -179.99, 0)
+    assert Cpr.local_position(0, lat_cpr, lon_cpr, 52, 179.99) == pytest.approx((52, -179.99),
+        abs=0.001)
+
+    lat_cpr, lon_cpr = FrameEncoder.cpr(52, 179.99, 1)
+    assert Cpr.local_position(1, lat_cpr, lon_cpr, 52, -179.99) == pytest.approx((52, 179.99),
+        abs=0.001)
+
+
+def test_nl():
+    """
+    Longitude zone counts change at the table's latitudes.
+    """
+
+    assert Cpr.nl(0) == 59
+    assert Cpr.nl(10.4704) == 59
+    assert Cpr.nl(10.4705) == 58
+    assert Cpr.nl(-10.4705) == 58
+    assert Cpr.nl(86.5353) == 3
+    assert Cpr.nl(86.5354) == 2
+    assert Cpr.nl(86.9999) == 2
+    assert Cpr.nl(87) == 1
+    assert Cpr.nl(-90) == 1
+
+
+def test_zone_change():
+    """
+    Pairs either side of a change in longitude zones don't decode globally.
+    """
+
+    pair_even = FrameEncoder.cpr(10.46, 20.0, 0)
+    pair_odd = FrameEncoder.cpr(10.48, 20.0, 1)
+
+    assert Cpr.global_position(pair_even, pair_odd, True) is None
+
+    pair_odd = FrameEncoder.cpr(10.465, 20.0, 1)
+
+    assert Cpr.global_position(pair_even, pair_odd, True) == pytest.approx((10.465, 20.0),
+        abs=0.001)
+
+
+def test_positions():
+    """
+    The engine places aircraft from a fresh pair, then locally from the last position.
+    """
+
+    positions = CprPositions(clock=lambda: 0)
+    icao = 0x40621d
+
+    assert positions.update(icao, 1, odd[0], odd[1], 0) is None
+    assert positions.update(icao, 0, even[0], even[1], 1) == \
+        Cpr.global_position(even, odd, False)
+
+    # Stale pairs don't decode.
+    assert positions.update(0x4840d6, 0, even[0], even[1], 0) is None
+    assert positions.update(0x4840d6, 1, odd[0], odd[1], 30) is None
+
+    lat_cpr, lon_cpr = FrameEncoder.cpr(52.3, 3.95, 1)
+    assert positions.update(icao, 1, lat_cpr, lon_cpr, 2) == pytest.approx((52.3, 3.95),
+        abs=0.001)
+    assert positions.position(icao)[2] == 2
@@ -0,0 +1,67 @@
+"""
+CRC check and error correction tests.
+"""
+
+from lib import *
+
+
+frame = bytes.fromhex("8D4840D6202CC371C32CE0576098")
+
+
+def flip(frame, bit):
+    """
+    Frame w/ a 0-based bit flipped.
+    """
+
+    flipped = bytearray(frame)
+    flipped[bit // 8] ^= 0x80 >> (bit % 8)
+
+    return bytes(flipped)
+
+
+def test_clean_frame():
+    decoded = ADSBFrame(frame)
+
+    assert decoded['crc_match'] is True
+    assert decoded['crc_hex'] == "576098"
+    assert 'crc_corrected_bits' not in decoded
+
+
+def test_uncorrected_error():
+    decoded = ADSBFrame(flip(frame, 40))
+
+    assert decoded['crc_match'] is False
+
+
+def test_corrected_data_bit():
+    """
+    A flipped data bit is corrected and decodes as the clean frame.
+    """
+
+    decoded = ADSBFrame(flip(frame, 40), fix_bits=1)
+    clean = ADSBFrame(frame)
+
+    assert decoded['crc_match'] is True
+    assert decoded['crc_corrected_bits'] == [41]
+    assert decoded['crc_hex'] == "576098"
+    assert decoded['ident'] == clean['ident']
+
+
+def test_corrected_crc_bit():
+    """
+    A flipped bit in the CRC field reports the corrected CRC.
+    """
+
+    decoded = ADSBFrame(flip(frame, 111), fix_bits=1)
+
+    assert decoded['crc_match'] is True
+    assert decoded['crc_corrected_bits'] == [112]
+    assert decoded['crc_hex'] == "576098"
+
+
+def test_corrected_two_bits():
+    decoded = ADSBFrame(flip(flip(frame, 10), 70), fix_bits=2)
+
+    assert decoded['crc_match'] is True
+    assert sorted(decoded['crc_corrected_bits']) == [11, 71]
+    assert decoded['crc_hex'] == "576098"
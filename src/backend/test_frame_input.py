@@ -0,0 +1,75 @@
+"""
+Frame input type tests.
+"""
+
+import array
+
+import pytest
+
+from lib import *
+
+
+hex_frames = ["8D4840D6202CC371C32CE0576098", "5D484FDEA248F5", "8D40621D58C382D690C8AC2863A7"]
+
+
+def test_input_types():
+    """
+    Ints, bytes, bytearrays, memoryviews and other buffers decode like hex strings.
+    """
+
+    for hex_frame in hex_frames:
+        frame = bytes.fromhex(hex_frame)
+        expected = dict(ADSBFrame(hex_frame))
+
+        for each in [frame, bytearray(frame), memoryview(frame), memoryview(bytearray(frame)),
+            memoryview(b"\x00" + frame + b"\x00")[1:-1], array.array('B', frame),
+            int.from_bytes(frame, 'big')]:
+            assert dict(ADSBFrame(each)) == expected
+
+
+def test_short_ints():
+    """
+    Ints that fit in 56 bits are short frames, even w/ leading zero bytes.
+    """
+
+    assert len(ADSBFrame.check_frame(0x5D484FDEA248F5)) == 7
+    assert len(ADSBFrame.check_frame(1)) == 7
+    assert len(ADSBFrame.check_frame(1 << 56)) == 14
+
+    with pytest.raises(ValueError):
+        ADSBFrame.check_frame(1 << 112)
+
+    with pytest.raises(ValueError):
+        ADSBFrame.check_frame(-1)
+
+
+def test_memoryview_formats():
+    """
+    Memoryviews of wider items are taken as their bytes.
+    """
+
+    frame = bytes.fromhex(hex_frames[0])
+    view = memoryview(frame).cast('H')
+
+    assert len(view) == 7
+    assert bytes(ADSBFrame.check_frame(view)) == frame
+    assert dict(ADSBFrame(view)) == dict(ADSBFrame(frame))
+
+    # Views that can't be taken as bytes w/o a copy.
+    with pytest.raises(TypeError):
+        ADSBFrame.check_frame(memoryview(frame * 2).cast('H')[::2])
+
+
+def test_bad_input():
+    """
+    Wrong lengths and types raise.
+    """
+
+    with pytest.raises(ValueError):
+        ADSBFrame(bytes(9))
+
+    with pytest.raises(TypeError):
+        ADSBFrame("not hex")
+
+    with pytest.raises(TypeError):
+        ADSBFrame(3.5)
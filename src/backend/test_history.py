@@ -0,0 +1,57 @@
+"""
+Track history store tests.
+"""
+
+import os
+
+from lib import *
+
+
+day = TrackStore.day_seconds
+
+
+def open_track_files():
+    """
+    Day data files this process has open.
+    """
+
+    paths = [os.readlink(os.path.join("/proc/self/fd", fd)) for fd in os.listdir("/proc/self/fd")
+        if os.path.islink(os.path.join("/proc/self/fd", fd))]
+
+    return sorted(os.path.basename(path) for path in paths if path.endswith(".trk"))
+
+
+def test_flush_changed_days(tmp_path):
+    """
+    Flushes only rewrite the indexes of days that changed and close past days' files.
+    """
+
+    store = TrackStore(str(tmp_path), clock=lambda: 2 * day)
+
+    store.append(0x4840d6, 100.0, 52.3, 4.8, 2100)
+    store.append(0x4840d6, day + 100.0, 52.4, 4.9, 2200)
+    store.flush()
+
+    first_index = store.day_path(0) + ".idx"
+    second_index = store.day_path(1) + ".idx"
+
+    assert os.path.exists(first_index) and os.path.exists(second_index)
+
+    if os.path.isdir("/proc/self/fd"):
+        assert open_track_files() == ["1970-01-02.trk"]
+
+    # Only the day that changed gets its index written again.
+    os.remove(first_index)
+    store.append(0x4840d6, day + 200.0, 52.5, 5.0, 2300)
+    store.flush()
+
+    assert not os.path.exists(first_index)
+
+    # Writing to a closed day picks its index up again, which no longer has the first point.
+    store.append(0x4840d6, 200.0, 52.6, 5.1, 2400)
+    store.close()
+
+    track = store.track(0x4840d6, 0, 2 * day)
+
+    assert list(track['time']) == [200.0, day + 100.0, day + 200.0]
+    assert list(track['altitude']) == [2400.0, 2200.0, 2300.0]
@@ -0,0 +1,26 @@
+"""
+Decoder metrics tests.
+"""
+
+from lib import *
+
+
+def test_stages():
+    """
+    Every timed stage runs while decoding an extended squitter, and disabling puts them back.
+    """
+
+    metrics = Metrics()
+    metrics.enable()
+
+    try:
+        ADSBFrame("8D40621D58C382D690C8AC2863A7")
+        ADSBFrame("8D485020994409940838175B284F")
+    finally:
+        metrics.disable()
+
+    timed = set(dict(labels)['stage'] for name, labels in metrics.histograms)
+
+    assert timed == set(stage for stage, owner, attribute in Metrics.stages)
+    assert not FrameRecord.metrics.enabled
+    assert "timed_stage" not in repr(CompiledDescriptor.unpack_into)
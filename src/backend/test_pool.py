@@ -0,0 +1,57 @@
+"""
+Decode pool tests.
+"""
+
+from lib import *
+
+
+def test_bad_lengths():
+    """
+    Frames that aren't 7 or 14 bytes are counted as errors w/o reaching a worker.
+    """
+
+    frames = [
+        bytes.fromhex("8D4840D6202CC371C32CE0576098"),
+        bytes(20),
+        b"",
+        bytes.fromhex("8D40621D58C382D690C8AC2863A7"),
+        bytes(9)
+    ]
+
+    with DecodePool(workers=2, batch_frames=2) as pool:
+        decoded = list(pool.decode(frames))
+
+        assert pool.errors == 3
+
+    assert sorted(each['icao'] for each in decoded) == ["40621d", "4840d6"]
+
+
+class FailingDecoder(FrameDecoder):
+    """
+    Decoder that fails on short frames w/ an error the decoders don't raise themselves.
+    """
+
+    def __call__(self, frame):
+        if len(frame) == 7:
+            raise KeyError("short frame")
+
+        return FrameDecoder.__call__(self, frame)
+
+
+def test_decoder_errors():
+    """
+    Frames the decoder raises on are counted as errors w/o ending the worker.
+    """
+
+    frames = [
+        bytes.fromhex("8D4840D6202CC371C32CE0576098"),
+        bytes.fromhex("5D484FDEA248F5"),
+        bytes.fromhex("8D40621D58C382D690C8AC2863A7")
+    ]
+
+    with DecodePool(workers=1, batch_frames=2, decoder=FailingDecoder()) as pool:
+        decoded = list(pool.decode(frames))
+
+        assert pool.errors == 1
+
+    assert [each['icao'] for each in decoded] == ["4840d6", "40621d"]
@@ -0,0 +1,121 @@
+"""
+Push server tests.
+"""
+
+import asyncio
+import socket
+
+from lib import *
+from lib.synth import FrameEncoder
+
+
+def ident_frame(icao, callsign):
+    return ADSBFrame(FrameEncoder.extended_squitter(icao, FrameEncoder.ident(4, 3, callsign)))
+
+
+def altitude_frame(icao, altitude):
+    return ADSBFrame(FrameEncoder.extended_squitter(icao, FrameEncoder.position(11, altitude,
+        52.3, 4.8, 0)))
+
+
+def free_port():
+    """
+    A local port nothing is listening on.
+    """
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+
+        return sock.getsockname()[1]
+
+
+def test_close_ends_streams():
+    """
+    Closing the server ends the streams of connected clients.
+    """
+
+    async def run():
+        server = PushServer(Tracker(), port=free_port(), tick=60)
+        await server.start()
+
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        writer.write(b"GET /events HTTP/1.1\r\n\r\n")
+
+        # Wait for the first snapshot.
+        head = await reader.readuntil(b"event: snapshot\n")
+        assert head.startswith(b"HTTP/1.1 200 OK")
+        assert len(server.clients) == 1
+
+        await asyncio.wait_for(server.close(), 5)
+        await asyncio.wait_for(reader.read(), 5)
+
+        assert len(server.clients) == 0
+        writer.close()
+
+    asyncio.run(run())
+
+
+def test_deltas():
+    """
+    Deltas coalesce what changed between ticks, including cleared and removed aircraft.
+    """
+
+    now = [0.0]
+    tracker = Tracker(ttl=60, clock=lambda: now[0])
+    view = StateView(tracker)
+
+    tracker.update(ident_frame(0x4840d6, "KLM1023"))
+    tracker.update(altitude_frame(0x4840d6, 2100))
+    tracker.update(ident_frame(0x40621d, "EZY12"))
+
+    delta = view.update()
+
+    assert delta['tick'] == 1
+    assert delta['aircraft'] == {
+        "4840d6": {"ident": "KLM1023 ", "category": "medium 2 aircraft", "altitude": 2100},
+        "40621d": {"ident": "EZY12   ", "category": "medium 2 aircraft"}
+    }
+    assert view.update() is None
+
+    # Only the last of several changes goes out, and only for aircraft that changed.
+    now[0] = 1.0
+    tracker.update(altitude_frame(0x4840d6, 2200))
+    state = tracker.update(altitude_frame(0x4840d6, 2300))
+
+    assert view.update() == {"tick": 2, "aircraft": {"4840d6": {"altitude": 2300}}}
+
+    now[0] = 2.0
+    state.ident = None
+    state.last_seen = now[0]
+
+    assert view.update() == {"tick": 3, "aircraft": {"4840d6": {"ident": None}}}
+    assert "ident" not in view.snapshot()['aircraft']["4840d6"]
+
+    # Aircraft that expire are removed.
+    now[0] = 61.5
+    tracker.update(altitude_frame(0x4840d6, 2400))
+    tracker.expire(now[0])
+
+    assert view.update() == {"tick": 4, "aircraft": {"4840d6": {"altitude": 2400}},
+        "removed": ["40621d"]}
+
+
+def test_client_skips():
+    """
+    Clients that fall behind drop what's queued for a snapshot.
+    """
+
+    client = PushClient(queue_size=2)
+
+    client.push(1, b"one")
+    client.push(2, b"two")
+    assert client.skips == 0
+
+    client.push(3, b"three")
+
+    assert client.skips == 1
+    assert client.queue.qsize() == 1
+    assert client.queue.get_nowait() == (3, None)
+
+    client.push(4, b"four")
+    assert client.queue.get_nowait() == (4, b"four")
@@ -0,0 +1,118 @@
+"""
+Beast and AVR reader tests.
+"""
+
+from lib import *
+
+
+frames = [
+    bytes.fromhex("8D4840D6202CC371C32CE0576098"),
+    bytes.fromhex("5D484FDEA248F5"),
+    bytes.fromhex("8D40621D58C382D690C8AC2863A7")
+]
+
+
+def beast_message(frame, timestamp=0x1a1a, signal=0x1a):
+    """
+    Beast message for a frame, escaping 0x1a bytes.
+    """
+
+    msg_type = b"\x33" if len(frame) == 14 else b"\x32"
+    body = timestamp.to_bytes(6, 'big') + bytes([signal]) + frame
+
+    return b"\x1a" + msg_type + body.replace(b"\x1a", b"\x1a\x1a")
+
+
+def read(reader, data, chunk_size):
+    """
+    Frames as bytes from a reader fed data in chunks.
+    """
+
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+    return [(bytes(frame), timestamp, signal) for frame, timestamp, signal in
+        reader.frames(chunks)]
+
+
+def test_avr_malformed_lines():
+    """
+    Bad AVR lines are skipped and counted w/o ending the feed.
+    """
+
+    data = b"".join([
+        b"*" + frames[0].hex().encode() + b";\n",
+        b"@0123;\n",
+        b"@zzzzzzzzzzzz" + frames[1].hex().encode() + b";\n",
+        b"*8D4840;\n",
+        b"*not hex;\n",
+        b"no marker;\n",
+        b"@00000000abcd" + frames[1].hex().encode() + b";\n",
+        b"*" + frames[2].hex().encode() + b";\n"
+    ])
+
+    for chunk_size in [1, 7, len(data)]:
+        reader = AvrReader()
+
+        assert read(reader, data, chunk_size) == [(frames[0], None, None),
+            (frames[1], 0xabcd, None), (frames[2], None, None)]
+        assert reader.skipped == 5
+
+
+def test_beast_escapes_and_garbage():
+    """
+    Escaped bytes are undone and garbage between messages is skipped.
+    """
+
+    data = b"".join([
+        b"\x00\xff",
+        beast_message(frames[0]),
+        b"\x1a\x35garbage",
+        beast_message(frames[1], timestamp=5, signal=200),
+        b"\x1a\x34" + bytes(21),
+        beast_message(frames[2])
+    ])
+
+    for chunk_size in [1, 5, len(data)]:
+        reader = BeastReader()
+
+        assert read(reader, data, chunk_size) == [(frames[0], 0x1a1a, 0x1a),
+            (frames[1], 5, 200), (frames[2], 0x1a1a, 0x1a)]
+        assert reader.skipped == 1
+
+
+def test_beast_truncated():
+    """
+    A message cut off at the end of the feed is counted as skipped.
+    """
+
+    reader = BeastReader()
+    data = beast_message(frames[0]) + beast_message(frames[2])[:10]
+
+    assert read(reader, data, 4) == [(frames[0], 0x1a1a, 0x1a)]
+    assert reader.skipped == 1
+
+
+def test_hex_lines():
+    """
+    Hex line files w/ bad lines fall back to one line at a time.
+    """
+
+    data = b"\n".join([frame.hex().encode() for frame in frames]) + b"\nzz\nabc\n\r\n" + \
+        frames[0].hex().encode()
+
+    for chunk_size in [3, 20, len(data)]:
+        reader = HexLineReader()
+
+        assert [frame for frame, timestamp, signal in read(reader, data, chunk_size)] == \
+            frames + [frames[0]]
+        assert reader.skipped == 2
+
+    # Clean chunks convert in one go.
+    data = b"\r\n".join([frame.hex().upper().encode() for frame in frames * 50]) + b"\n"
+
+    for chunk_size in [7, 100, len(data)]:
+        reader = HexLineReader()
+
+        assert [frame for frame, timestamp, signal in read(reader, data, chunk_size)] == \
+            frames * 50
+        assert reader.skipped == 0
@@ -0,0 +1,48 @@
+"""
+Frame filter and subscription tests.
+"""
+
+from lib import *
+from lib.synth import FrameGenerator
+
+
+def test_filter_with_icao_index():
+    """
+    Filtered out DF11/17/18 frames still confirm the addresses of replies the filter wants.
+    """
+
+    frames = list(FrameGenerator(aircraft=20, seed=1).frames(3000))
+
+    unfiltered_index = IcaoIndex(ttl=3600)
+    filtered_index = IcaoIndex(ttl=3600)
+    frame_filter = FrameFilter(kinds=['surveillance'])
+
+    expected = []
+    got = []
+
+    for frame in frames:
+        decoded = ADSBFrame(frame, 0, unfiltered_index)
+
+        if decoded is not None and FrameFilter.kind(frame) == 'surveillance':
+            expected.append(decoded)
+
+        decoded = ADSBFrame(frame, 0, filtered_index, frame_filter)
+
+        if decoded is not None:
+            got.append(decoded)
+
+    assert len(expected) > 0
+    assert got == expected
+
+
+def test_filter_kinds():
+    """
+    Filters only pass the kinds and addresses asked for.
+    """
+
+    frame = "8D4840D6202CC371C32CE0576098"
+
+    assert ADSBFrame(frame, frame_filter=FrameFilter(kinds=['ident']))['ident'] == "KLM1023 "
+    assert ADSBFrame(frame, frame_filter=FrameFilter(kinds=['position'])) is None
+    assert ADSBFrame(frame, frame_filter=FrameFilter(icaos=['4840d6'])) is not None
+    assert ADSBFrame(frame, frame_filter=FrameFilter(icaos=['4840d7'])) is None
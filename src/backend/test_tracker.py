@@ -0,0 +1,52 @@
+"""
+Aircraft state tracker tests.
+"""
+
+from lib import *
+from lib.synth import FrameEncoder
+
+
+def position_frame(tc, altitude, cpr_format, icao=0x4840d6, lat=52.3, lon=4.8):
+    return FrameEncoder.extended_squitter(icao, FrameEncoder.position(tc, altitude, lat, lon,
+        cpr_format))
+
+
+def test_altitude_units():
+    """
+    GNSS altitudes in meters are kept in feet apart from barometric altitudes.
+    """
+
+    tracker = Tracker(clock=lambda: 0.0)
+
+    state = tracker.update(ADSBFrame(position_frame(20, 640, 0)), 1.0)
+    assert state.altitude is None
+    assert state.gnss_altitude == round(640 / 0.3048)
+
+    state = tracker.update(ADSBFrame(position_frame(11, 2100, 1)), 2.0)
+    assert state.altitude == 2100
+    assert state.gnss_altitude == round(640 / 0.3048)
+
+    state = tracker.update(ADSBFrame(position_frame(20, 700, 0)), 3.0)
+    assert state.altitude == 2100
+    assert state.gnss_altitude == round(700 / 0.3048)
+
+    assert state.lat is not None
+
+
+
+def test_history_times(tmp_path):
+    """
+    Positions are recorded to history at the time they were tracked.
+    """
+
+    store = TrackStore(str(tmp_path), clock=lambda: 1e9)
+    tracker = Tracker(history=store, clock=lambda: 0.0)
+
+    tracker.update(ADSBFrame(position_frame(11, 2100, 0)), 1000.0)
+    tracker.update(ADSBFrame(position_frame(11, 2125, 1)), 1001.0)
+    tracker.update(ADSBFrame(position_frame(11, 2150, 0)), 1002.0)
+
+    track = store.track(0x4840d6, 0, 2000)
+
+    assert list(track['time']) == [1001.0, 1002.0]
+    assert list(track['altitude']) == [2125.0, 2150.0]
@@ -0,0 +1,72 @@
+"""
+Airborne velocity tests.
+"""
+
+import math
+
+import pytest
+
+from lib import *
+from lib.synth import FrameEncoder
+
+
+def velocity_frame(me):
+    return FrameEncoder.extended_squitter(0x4840d6, me)
+
+
+def test_ground_speed():
+    """
+    Subtype 1 and 2 ground speeds, w/ supersonic ones in 4 kt units.
+    """
+
+    decoded = ADSBFrame("8D485020994409940838175B284F")
+
+    assert decoded['sub_type'] == 1
+    assert decoded['velocity_ew'] == -8 and decoded['velocity_ns'] == -159
+    assert decoded['ground_speed'] == pytest.approx(159.20113064925135)
+    assert decoded['track'] == pytest.approx(182.88037755284762)
+    assert decoded['vert_rate'] == -832
+    assert decoded['vert_rate_source'] == "gnss"
+
+    decoded = ADSBFrame(velocity_frame(FrameEncoder.velocity(-1200, 1600, 640, 2)))
+
+    assert decoded['sub_type'] == 2
+    assert decoded['velocity_ew'] == -1200 and decoded['velocity_ns'] == 1600
+    assert decoded['ground_speed'] == pytest.approx(2000)
+    assert decoded['track'] == pytest.approx(360 - math.degrees(math.atan2(3, 4)))
+    assert decoded['vert_rate'] == 640
+
+
+def test_tracks():
+    """
+    Tracks run clockwise from north in each quadrant.
+    """
+
+    for v_ew, v_ns, track in [(0, 100, 0), (100, 0, 90), (0, -100, 180), (-100, 0, 270),
+        (100, 100, 45), (100, -100, 135), (-100, -100, 225), (-100, 100, 315)]:
+        decoded = ADSBFrame(velocity_frame(FrameEncoder.velocity(v_ew, v_ns, 0)))
+
+        assert decoded['track'] == pytest.approx(track)
+
+    assert AirborneVelocity.speed_track(0, 0) == (0, None)
+
+
+def test_airspeed():
+    """
+    Subtype 3 and 4 headings and airspeeds, w/ supersonic ones in 4 kt units.
+    """
+
+    decoded = ADSBFrame("8DA05F219B06B6AF189400CBC33F")
+
+    assert decoded['sub_type'] == 3
+    assert decoded['heading'] == pytest.approx(243.984375)
+    assert decoded['airspeed'] == 375 and decoded['airspeed_type'] == "tas"
+    assert decoded['vert_rate'] == -2304
+    assert decoded['vert_rate_source'] == "barometric"
+
+    decoded = ADSBFrame(velocity_frame(FrameEncoder.airspeed(90, 2000, -64, 4, tas=False)))
+
+    assert decoded['sub_type'] == 4
+    assert decoded['heading'] == pytest.approx(90)
+    assert decoded['airspeed'] == 2000 and decoded['airspeed_type'] == "ias"
+    assert decoded['vert_rate'] == -64
@@ -0,0 +1,119 @@
+"""
+Wire encoding tests.
+"""
+
+import pytest
+
+from lib import *
+from lib.synth import FrameGenerator
+
+
+def tracked(frame_ct=3000):
+    """
+    A view of a tracker fed synthetic traffic.
+    """
+
+    tracker = Tracker(clock=lambda: 0.0)
+
+    for frame in FrameGenerator(aircraft=20, seed=1).frames(frame_ct):
+        decoded = ADSBFrame(frame)
+
+        if decoded is not None:
+            tracker.update(decoded)
+
+    return tracker, StateView(tracker)
+
+
+def assert_aircraft(decoded, encoded):
+    """
+    Aircraft decoded to the fields encoded, to the precision of each field.
+    """
+
+    assert decoded.keys() == encoded.keys()
+
+    for icao, fields in encoded.items():
+        assert decoded[icao].keys() == fields.keys()
+
+        for field, value in fields.items():
+            if type(value) is float:
+                assert decoded[icao][field] == pytest.approx(value)
+            else:
+                assert decoded[icao][field] == value
+
+
+def test_snapshot_round_trip():
+    """
+    Snapshots decode to what was encoded.
+    """
+
+    tracker, view = tracked()
+    view.update()
+    snapshot = view.snapshot()
+
+    message_type, decoded = WireCodec.decode(WireCodec.encode_snapshot(snapshot))
+
+    assert message_type == WireCodec.snapshot_type
+    assert decoded['tick'] == snapshot['tick']
+    assert len(snapshot['aircraft']) > 0
+    assert_aircraft(decoded['aircraft'], snapshot['aircraft'])
+
+    fields = set(field for each in decoded['aircraft'].values() for field in each)
+    assert {"ident", "category", "altitude", "lat", "lon"} <= fields
+
+
+def test_delta_round_trip():
+    """
+    Deltas carry only the changed fields and removed aircraft.
+    """
+
+    delta = {
+        "tick": 7,
+        "aircraft": {
+            "4840d6": {"squawk": "7700", "altitude": 38000, "vert_rate": -64},
+            "40621d": {"lat": 52.25721, "lon": 3.91937, "gnss_altitude": 38100}
+        },
+        "removed": ["485020", "a05f21"]
+    }
+
+    message = WireCodec.encode_delta(delta)
+    message_type, decoded = WireCodec.decode(message)
+
+    assert message_type == WireCodec.delta_type
+    assert decoded['tick'] == 7
+    assert decoded['removed'] == delta['removed']
+    assert_aircraft(decoded['aircraft'], delta['aircraft'])
+
+    # Cleared fields go out too.
+    delta['aircraft']['4840d6']['ident'] = None
+    delta['aircraft']['485020'] = {"track": None, "ground_speed": None}
+    delta['removed'] = ["a05f21"]
+
+    message_type, decoded = WireCodec.decode(WireCodec.encode_delta(delta))
+
+    assert decoded['removed'] == ["a05f21"]
+    assert_aircraft(decoded['aircraft'], delta['aircraft'])
+
+
+def test_frames_round_trip():
+    """
+    Frames of both lengths decode w/ their timestamps.
+    """
+
+    frames = [
+        (1.5, bytes.fromhex("8D4840D6202CC371C32CE0576098")),
+        (2.25, bytes.fromhex("5D484FDEA248F5"))
+    ]
+
+    message_type, decoded = WireCodec.decode(WireCodec.encode_frames(frames, 3))
+
+    assert message_type == WireCodec.frames_type
+    assert decoded == {"tick": 3, "frames": frames}
+
+
+def test_unknown_fields():
+    """
+    Fields the wire format doesn't carry raise.
+    """
+
+    with pytest.raises(ValueError):
+        WireCodec.encode_delta({"tick": 1, "aircraft": {"4840d6": {"heading": 90}}})